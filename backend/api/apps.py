@@ -0,0 +1,44 @@
+import os
+import sys
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+def _is_serving_process():
+    """False pour les commandes de gestion autres que runserver (et son processus parent d'autoreload)."""
+    argv = sys.argv
+    if len(argv) > 1 and os.path.basename(argv[0]) == 'manage.py':
+        if argv[1] != 'runserver':
+            return False
+        if '--noreload' not in argv and os.environ.get('RUN_MAIN') != 'true':
+            return False
+    return True
+
+
+class ApiConfig(AppConfig):
+    name = 'api'
+
+    def ready(self):
+        """
+        Branche les crochets de l'éditeur (événements, métriques), préchauffe les
+        caches (WARMUP_ON_STARTUP) et lance la surveillance des packs (PACK_WATCHER_ENABLED).
+        """
+        from editor import map_manager
+        from .events import publish_map_changed
+        from .metrics import record_fs
+        map_manager.set_hooks(publish=publish_map_changed, record_fs=record_fs)
+
+        warmup = getattr(settings, 'WARMUP_ON_STARTUP', False)
+        watcher = getattr(settings, 'PACK_WATCHER_ENABLED', False)
+        if not (warmup or watcher) or not _is_serving_process():
+            return
+        if warmup:
+            from .warmup import run_warmup
+            thumbnails = getattr(settings, 'WARMUP_THUMBNAILS', False)
+            for name, seconds, detail in run_warmup(thumbnails=thumbnails):
+                print(f"Warmup {name}: {seconds * 1000:.1f} ms ({detail})")
+        if watcher:
+            # Chaque PackChangeSet passe par invalidate_pack, qui publie l'événement `pack`
+            from editor.file_watcher import get_watcher
+            get_watcher().start()
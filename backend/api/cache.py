@@ -0,0 +1,100 @@
+"""
+Caches mémoire bornés (LRU) partagés par les vues et middlewares de l'API.
+
+Chaque cache est nommé et enregistré dans un registre de processus pour que
+ses compteurs (hits / misses / taille) puissent être consultés globalement.
+"""
+import threading
+from collections import OrderedDict
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class BoundedCache:
+    """LRU thread-safe borné en nombre d'entrées et en octets (valeurs bytes ou tuples)."""
+
+    def __init__(self, name, max_entries=1024, max_bytes=None):
+        """max_bytes : plafond sur la somme des tailles déclarées à set() (None = illimité)."""
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Valeur associée à key (rafraîchit sa position LRU) ou default."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, size=0):
+        """Insère / remplace une entrée ; size = poids en octets pour max_bytes."""
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._data[key] = (value, size)
+            self.current_bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def delete_where(self, predicate):
+        """Supprime les entrées dont la clé satisfait predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                _, size = self._data.pop(key)
+                self.current_bytes -= size
+
+    def clear(self):
+        """Vide le cache (compteurs conservés)."""
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Compteurs courants (dict)."""
+        with self._lock:
+            return {
+                'name': self.name,
+                'entries': len(self._data),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def get_cache(name, max_entries=1024, max_bytes=None):
+    """Get or create the named process-wide cache"""
+    with _registry_lock:
+        cache = _registry.get(name)
+        if cache is None:
+            cache = BoundedCache(name, max_entries=max_entries, max_bytes=max_bytes)
+            _registry[name] = cache
+        return cache
+
+
+def iter_caches():
+    """Caches enregistrés (pour métriques / diagnostics)."""
+    with _registry_lock:
+        return list(_registry.values())
@@ -0,0 +1,163 @@
+"""
+Bus d'événements en mémoire pour les notifications de changement (SSE).
+
+Les producteurs (invalidation de pack, écritures de `MapManager`) publient
+depuis n'importe quel thread ; chaque client SSE est un abonné dont la file
+asyncio est alimentée via `loop.call_soon_threadsafe`. Les derniers
+événements sont gardés dans un tampon circulaire pour que le navigateur
+reprenne après une reconnexion (`Last-Event-ID`).
+
+Les identifiants sont `<époque>-<n>` : l'époque (pid + heure de démarrage)
+change à chaque redémarrage du processus, le compteur `n` repartant de 1. Un
+`Last-Event-ID` d'une autre époque (ou trop ancien pour le tampon) ne peut
+pas être rejoué : le client reçoit un événement `resync` et doit tout
+recharger.
+
+Le bus est propre au processus : avec plusieurs workers, un événement n'est vu
+que par les clients connectés au worker qui l'a produit (suffisant pour un
+serveur ASGI mono-processus ; au-delà il faut un relais externe).
+"""
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+HISTORY_SIZE = 1000
+QUEUE_SIZE = 256
+
+
+def parse_event_id(value):
+    """(époque, n) d'un identifiant `<époque>-<n>`, None s'il est invalide."""
+    epoch, sep, n = (value or '').rpartition('-')
+    if not sep or not epoch or not n.isdigit():
+        return None
+    return epoch, int(n)
+
+
+class Subscription:
+    """Abonnement d'un client : file asyncio alimentée par le bus."""
+
+    def __init__(self, bus, loop, types=None):
+        self.bus = bus
+        self.loop = loop
+        self.types = frozenset(types) if types else None
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event):
+        return self.types is None or event['type'] in self.types
+
+    def _put(self, event):
+        # Exécuté dans la boucle du client
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Client trop lent : on le déconnecte, il reprendra via Last-Event-ID
+            self.overflowed = True
+
+    async def get(self, timeout=None):
+        """Prochain événement, ou None après `timeout` secondes sans événement."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """Diffusion d'événements {id, type, time, …} à tous les abonnés."""
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self.epoch = f'{os.getpid():x}{time.time_ns() // 1000:x}'
+        self._ids = itertools.count(1)
+        self._last_n = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+
+    def publish(self, event_type, **data):
+        """Publie un événement (thread-safe) ; retourne l'événement complet."""
+        with self._lock:
+            self._last_n = next(self._ids)
+            event = {'id': f'{self.epoch}-{self._last_n}', 'type': event_type, 'time': time.time(), **data}
+            self._history.append((self._last_n, event))
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            if sub.wants(event):
+                try:
+                    sub.loop.call_soon_threadsafe(sub._put, event)
+                except RuntimeError:
+                    # Boucle fermée : client parti sans se désabonner
+                    self.unsubscribe(sub)
+        return event
+
+    def _missed(self, last_event_id, wants):
+        """
+        Événements après last_event_id (appelé sous verrou). Époque inconnue,
+        identifiant invalide ou déjà sorti du tampon : un seul événement
+        `resync` positionné sur le dernier id publié.
+        """
+        if last_event_id is None:
+            return []
+        parsed = parse_event_id(last_event_id)
+        if parsed is not None and parsed[0] == self.epoch and parsed[1] <= self._last_n:
+            oldest = self._history[0][0] if self._history else self._last_n + 1
+            if parsed[1] >= oldest - 1:
+                return [e for n, e in self._history if n > parsed[1] and wants(e)]
+        return [{'id': f'{self.epoch}-{self._last_n}', 'type': 'resync', 'time': time.time()}]
+
+    def subscribe(self, types=None, last_event_id=None):
+        """
+        Abonne la boucle asyncio courante ; retourne (abonnement, événements
+        manqués depuis last_event_id à rejouer d'abord).
+        """
+        sub = Subscription(self, asyncio.get_running_loop(), types)
+        with self._lock:
+            self._subscribers.add(sub)
+            missed = self._missed(last_event_id, sub.wants)
+        return sub, missed
+
+    def replay(self, types=None, last_event_id=None):
+        """
+        Sans abonnement : (événements depuis last_event_id, id du dernier
+        événement publié) ; utilisé par le flux en mode WSGI.
+        """
+        types = frozenset(types) if types else None
+        with self._lock:
+            missed = self._missed(last_event_id, lambda e: types is None or e['type'] in types)
+            last_id = f'{self.epoch}-{self._last_n}'
+        return missed, last_id
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+_bus = EventBus()
+
+
+def get_event_bus():
+    """Bus d'événements du processus."""
+    return _bus
+
+
+def publish_pack_changed(pack_id):
+    """Événement `pack` : id et nouvelle version (empreinte), None si le pack a disparu."""
+    from .parsers.asset_indexer import AssetIndexer
+    from .parsers.pack_fingerprint import pack_fingerprint
+    pack_dir = AssetIndexer.find_pack_dir(pack_id)
+    version = pack_fingerprint(pack_dir) if pack_dir is not None else None
+    return _bus.publish('pack', packId=pack_id, version=version, deleted=version is None)
+
+
+def publish_map_changed(username, map_id, version, action):
+    """Événement `map` : action 'created' / 'updated' / 'deleted' et version du fichier."""
+    return _bus.publish('map', username=username, mapId=map_id, version=version, action=action)
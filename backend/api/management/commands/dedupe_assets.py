@@ -0,0 +1,44 @@
+"""
+Dédoublonne les images des packs existants dans le stockage adressé par contenu.
+
+Les uploads passent déjà par le stockage ; cette commande traite les packs
+copiés à la main ou antérieurs :
+  python manage.py dedupe_assets
+  python manage.py dedupe_assets --gc     # supprime aussi les blobs orphelins
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.pack_cache import invalidate_pack
+from api.parsers.asset_indexer import AssetIndexer
+from editor import blob_store
+
+
+class Command(BaseCommand):
+    help = "Lie les images des packs au stockage partagé (une copie disque par contenu)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--gc', action='store_true',
+            help='Supprimer ensuite les blobs qui ne sont plus référencés par aucun pack',
+        )
+
+    def handle(self, *args, **options):
+        if not blob_store.is_enabled():
+            raise CommandError('Stockage désactivé (activer avec BLOB_STORE_ENABLED=1)')
+        total_files = total_saved = 0
+        for pack_dir in AssetIndexer.iter_pack_dirs():
+            files, saved = blob_store.link_tree(pack_dir)
+            total_files += files
+            total_saved += saved
+            if files:
+                # Fichiers désormais liés : les hash exposés par /api/packs/<id>/assets changent
+                invalidate_pack(pack_dir.name)
+                self.stdout.write(f'{pack_dir.name:<40} {files:>6} images  {saved / 1024:>10.1f} KiB économisés')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_files} images liées, {total_saved / (1024 * 1024):.1f} MiB économisés'
+        ))
+        if options['gc']:
+            removed, freed = blob_store.collect_garbage()
+            self.stdout.write(self.style.SUCCESS(
+                f'{removed} blobs orphelins supprimés ({freed / (1024 * 1024):.1f} MiB)'
+            ))
@@ -0,0 +1,52 @@
+"""
+Exporte les cartes en flux (NDJSON ou ZIP), vers un fichier ou la sortie standard :
+  python manage.py export_maps --output maps.ndjson
+  python manage.py export_maps --format zip --output maps.zip --user temp --since 2025-01-01
+  python manage.py export_maps --exclude-images > maps.ndjson
+"""
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from editor.map_export import FORMATS, MapExporter
+
+
+class Command(BaseCommand):
+    help = "Exporte les cartes (toutes ou filtrées) en NDJSON ou ZIP, à mémoire constante"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='ndjson', help="Format d'export")
+        parser.add_argument('--output', '-o', help='Fichier de sortie (défaut : sortie standard)')
+        parser.add_argument('--user', action='append', help='Limiter à cet utilisateur (répétable)')
+        parser.add_argument('--since', help='Cartes modifiées depuis cette date ISO')
+        parser.add_argument('--until', help="Cartes modifiées jusqu'à cette date ISO")
+        parser.add_argument('--exclude-images', action='store_true', help='Retirer les captures (data URL)')
+
+    def handle(self, *args, **options):
+        try:
+            exporter = MapExporter(
+                users=options['user'],
+                since=options['since'],
+                until=options['until'],
+                exclude_images=options['exclude_images'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = options['output']
+        if output:
+            tmp = f'{output}.tmp'
+            with open(tmp, 'wb') as f:
+                for chunk in exporter.stream(options['format']):
+                    f.write(chunk)
+            os.replace(tmp, output)
+        else:
+            for chunk in exporter.stream(options['format']):
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+
+        # Le résumé va sur stderr pour ne pas corrompre un export sur la sortie standard
+        self.stderr.write(self.style.SUCCESS(
+            f"{exporter.exported} carte(s) exportée(s), {exporter.errors} illisible(s)"
+        ))
@@ -0,0 +1,58 @@
+"""
+Importe des cartes en masse depuis un NDJSON ou un ZIP (par ex. un export) :
+  python manage.py import_maps maps.ndjson
+  python manage.py import_maps maps.zip --user temp --on-conflict replace --validate strict --json
+"""
+import zipfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.map_validation import map_validator
+from editor import json_codec
+from editor.map_import import ON_CONFLICT, VALIDATE_MODES, MapImporter
+
+
+class Command(BaseCommand):
+    help = "Importe des cartes (NDJSON ou ZIP) en parallèle, avec validation et écriture par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier NDJSON ou ZIP')
+        parser.add_argument('--user', default='temp', help="Utilisateur des cartes sans utilisateur")
+        parser.add_argument('--on-conflict', choices=ON_CONFLICT, default='skip', help='Carte déjà existante')
+        parser.add_argument('--validate', choices=VALIDATE_MODES, default='report', help='Validation des assets')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'MAP_IMPORT_WORKERS', 8))
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'MAP_IMPORT_BATCH_SIZE', 200))
+        parser.add_argument('--json', action='store_true', help='Résultat complet en JSON sur la sortie standard')
+
+    def handle(self, *args, **options):
+        try:
+            importer = MapImporter(
+                default_user=options['user'],
+                on_conflict=options['on_conflict'],
+                validate=options['validate'],
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                validator=map_validator() if options['validate'] != 'off' else None,
+            )
+            with open(options['path'], 'rb') as f:
+                result = importer.import_file(f)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json_codec.dumps(result, pretty=True).decode('utf-8'))
+            return
+        for item in result['results']:
+            if item['status'] == 'error':
+                self.stdout.write(self.style.ERROR(f"{item['source']}: {item['error']}"))
+            elif item['status'] == 'invalid':
+                report = item['validation']
+                self.stdout.write(self.style.WARNING(
+                    f"{item['source']} ({item['username']}/{item['id']}): refusée, "
+                    f"{len(report['missing'])} référence(s) cassée(s), {len(report['overMax'])} max dépassé(s)"
+                ))
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} créée(s), {result['replaced']} remplacée(s), {result['skipped']} ignorée(s), "
+            f"{result['invalid']} refusée(s), {result['errors']} erreur(s)"
+        ))
@@ -0,0 +1,25 @@
+"""
+Met à jour l'index inverse pack / asset -> cartes (cartes copiées ou modifiées
+hors API) :
+  python manage.py index_map_usage
+  python manage.py index_map_usage --rebuild
+"""
+from django.core.management.base import BaseCommand
+
+from editor import map_usage_index
+
+
+class Command(BaseCommand):
+    help = "Synchronise l'index des utilisations d'assets par les cartes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Ré-indexer toutes les cartes')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            indexed, removed = map_usage_index.rebuild()
+        else:
+            indexed, removed = map_usage_index.sync()
+        self.stdout.write(self.style.SUCCESS(
+            f'{indexed} carte(s) indexée(s), {removed} retirée(s) ({map_usage_index.get_index_path()})'
+        ))
@@ -0,0 +1,90 @@
+"""
+Vérifie les références d'assets de toutes les cartes (packs supprimés ou
+renommés, limites `max` dépassées) :
+  python manage.py validate_maps
+  python manage.py validate_maps --user temp --workers 8 --json
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.map_validation import get_asset_catalog, validate_map
+from editor import json_codec
+from editor.map_manager import iter_map_files, read_map_file
+
+
+def _validate_file(map_file, catalog):
+    try:
+        return validate_map(read_map_file(map_file), catalog), None
+    except Exception as e:
+        return None, str(e)
+
+
+class Command(BaseCommand):
+    help = "Valide les références d'assets de toutes les cartes (en parallèle)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', help='Limiter à cet utilisateur (répétable)')
+        parser.add_argument('--workers', type=int, default=8, help='Nombre de cartes validées en parallèle')
+        parser.add_argument('--json', action='store_true', help='Rapport complet en JSON sur la sortie standard')
+        parser.add_argument('--fail', action='store_true', help='Code de sortie non nul si une carte est invalide')
+
+    def handle(self, *args, **options):
+        users_dir = Path(settings.USERS_DIR)
+        users = options['user']
+        if not users:
+            users = sorted(
+                p.name for p in users_dir.iterdir() if p.is_dir() and not p.name.startswith('.')
+            ) if users_dir.exists() else []
+        jobs = [
+            (username, map_file)
+            for username in users
+            for map_file in sorted(iter_map_files(users_dir / username / 'maps'))
+        ]
+
+        # Catalogue rafraîchi une fois (parcours des packs), partagé (lecture seule) par les workers
+        catalog = get_asset_catalog()
+        catalog.refresh()
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            results = list(pool.map(lambda job: _validate_file(job[1], catalog), jobs))
+
+        report = []
+        invalid = errors = 0
+        for (username, map_file), (result, error) in zip(jobs, results):
+            entry = {'user': username, 'map': map_file.stem, 'file': str(map_file)}
+            if error is not None:
+                errors += 1
+                entry['error'] = error
+            else:
+                entry.update(result)
+                if not result['valid']:
+                    invalid += 1
+            report.append(entry)
+            if options['json'] or (error is None and result['valid']):
+                continue
+            if error is not None:
+                self.stdout.write(self.style.ERROR(f'{username}/{map_file.stem}: illisible ({error})'))
+                continue
+            self.stdout.write(self.style.WARNING(
+                f"{username}/{map_file.stem}: {len(result['missing'])} référence(s) cassée(s), "
+                f"{len(result['overMax'])} max dépassé(s)"
+            ))
+            for pack_id in result['missingPacks']:
+                self.stdout.write(f'    pack absent : {pack_id}')
+            for item in result['missing']:
+                self.stdout.write(f"    {item['layer']}[{item['index']}] {item['asset']}")
+            for item in result['overMax']:
+                self.stdout.write(
+                    f"    {item['pack']}/{item['category']}/{item['asset']} : {item['count']} > max {item['max']}"
+                )
+
+        if options['json']:
+            self.stdout.write(json_codec.dumps(report).decode('utf-8'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(jobs)} carte(s) vérifiée(s) : {invalid} invalide(s), {errors} illisible(s)'
+            ))
+        if options['fail'] and (invalid or errors):
+            raise CommandError(f'{invalid} carte(s) invalide(s), {errors} illisible(s)')
@@ -0,0 +1,41 @@
+"""
+Préchauffe les caches (packs, index d'assets, vignettes, cartes récentes).
+
+À lancer après un déploiement, avant d'ouvrir le trafic :
+  python manage.py warmup
+  python manage.py warmup --recent-maps 200 --thumbnails
+
+Les caches en mémoire (réponses des packs, index de recherche) sont perdus à
+la fin de la commande : seuls l'index SQLite des packs, les vignettes et le
+cache disque de l'OS en profitent au serveur. Pour préchauffer la mémoire du
+serveur, utiliser WARMUP_ON_STARTUP=1.
+"""
+from django.core.management.base import BaseCommand
+
+from api.warmup import run_warmup
+
+
+class Command(BaseCommand):
+    help = (
+        "Pré-construit l'index des packs (SQLite) et lit les cartes récentes ; les caches en mémoire "
+        "sont perdus à la sortie (WARMUP_ON_STARTUP=1 pour chauffer le serveur). --thumbnails génère "
+        "aussi les vignettes manquantes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recent-maps', type=int, default=None,
+            help='Nombre de cartes récentes à pré-lire (défaut : settings.WARMUP_RECENT_MAPS)',
+        )
+        parser.add_argument(
+            '--thumbnails', action='store_true',
+            help='Générer les r_thumb.png manquants (écrit dans les dossiers des packs)',
+        )
+
+    def handle(self, *args, **options):
+        report = run_warmup(recent_maps=options['recent_maps'], thumbnails=options['thumbnails'])
+        total = 0.0
+        for name, seconds, detail in report:
+            total += seconds
+            self.stdout.write(f'{name:<12} {seconds * 1000:>9.1f} ms  {detail}')
+        self.stdout.write(self.style.SUCCESS(f'Warmup terminé en {total * 1000:.1f} ms'))
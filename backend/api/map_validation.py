@@ -0,0 +1,116 @@
+"""
+Validation des références d'assets d'une carte.
+
+Les éléments des couches (`layers.tiles`, `layers.objects`, …) référencent
+leur image par chemin (`asset`, ex. `Pack/01.tiles/37R.png/r_0.png`). Après la
+suppression d'un pack ou son ré-import sous un autre nom (suffixe `_1`), ces
+chemins ne pointent plus sur rien ; rien ne vérifiait non plus les limites
+`max=` des cfg de catégorie.
+
+`AssetCatalog` lit la table chemin -> asset (chemin principal, vignette,
+rotations) de l'index de recherche (`api.parsers.asset_search`) : une seule
+copie en mémoire, maintenue pack par pack par les invalidations de
+`pack_index`. `validate_map()` synchronise l'index (une requête de génération,
+sans parcours des packs) puis parcourt la carte une seule fois : une recherche
+de hash par élément, un compteur par asset, puis comparaison aux `max`.
+"""
+from collections import Counter
+
+from editor.utils import normalize_asset_path
+
+from .parsers.asset_search import get_search_index
+
+
+class AssetCatalog:
+    """Vue (pack, catégorie, asset, max) des chemins connus de l'index de recherche."""
+
+    def __init__(self, index=None):
+        self._index = index
+
+    @property
+    def index(self):
+        return self._index if self._index is not None else get_search_index()
+
+    def sync(self):
+        """Rattrape les packs invalidés depuis le dernier appel (sans parcours des packs)."""
+        self.index.sync()
+
+    def refresh(self, force=False):
+        """Parcourt les packs (empreintes) : voit aussi les modifications faites à la main."""
+        self.index.refresh(force=force)
+
+    def lookup(self, path):
+        """(pack, catégorie, asset, max) d'un chemin, ou None s'il est inconnu."""
+        doc = self.index.lookup_path(path)
+        if doc is None:
+            return None
+        return doc['packId'], doc['category'], doc['name'], doc['max']
+
+    def pack_ids(self):
+        return self.index.pack_ids()
+
+
+_catalog = AssetCatalog()
+
+
+def get_asset_catalog():
+    """Catalogue partagé du processus."""
+    return _catalog
+
+
+def map_validator():
+    """validate_map lié au catalogue global, synchronisé une fois (import en masse : MapImporter)."""
+    catalog = get_asset_catalog()
+    catalog.sync()
+    return lambda map_data: validate_map(map_data, catalog)
+
+
+def validate_map(map_data, catalog=None):
+    """
+    Vérifie les références d'assets d'une carte ; retourne un rapport :
+    {'valid', 'checked', 'missing': [...], 'missingPacks': [...], 'overMax': [...]}.
+    """
+    if catalog is None:
+        catalog = get_asset_catalog()
+        catalog.sync()
+    missing = []
+    counts = Counter()
+    limits = {}
+    checked = 0
+    layers = map_data.get('layers') if isinstance(map_data, dict) else None
+    for layer_name, elements in (layers.items() if isinstance(layers, dict) else ()):
+        if not isinstance(elements, list):
+            continue
+        for index, element in enumerate(elements):
+            if not isinstance(element, dict):
+                continue
+            asset = element.get('asset')
+            if not isinstance(asset, str) or not asset:
+                continue
+            checked += 1
+            path = normalize_asset_path(asset)
+            info = catalog.lookup(path)
+            if info is None:
+                missing.append({'layer': layer_name, 'index': index, 'id': element.get('id'), 'asset': asset})
+                continue
+            key = info[:3]
+            counts[key] += 1
+            if info[3] is not None:
+                limits[key] = info[3]
+
+    over_max = [
+        {'pack': key[0], 'category': key[1], 'asset': key[2], 'max': limit, 'count': counts[key]}
+        for key, limit in limits.items()
+        if counts[key] > limit
+    ]
+    known_packs = catalog.pack_ids()
+    missing_packs = sorted({
+        normalize_asset_path(m['asset']).split('/', 1)[0] for m in missing
+    } - known_packs)
+    return {
+        'valid': not missing and not over_max,
+        'checked': checked,
+        'missing': missing,
+        'missingPacks': missing_packs,
+        'overMax': over_max,
+    }
@@ -0,0 +1,182 @@
+"""
+Métriques de processus au format texte Prometheus (exposées sur /api/metrics).
+
+- latence par route (histogramme), taille des réponses, nombre de requêtes par
+  route / méthode / code HTTP (alimentés par `MetricsMiddleware`) ;
+- opérations fichiers (stat, listdir, open) et octets lus par composant
+  (`pack_parser`, `asset_view`, `map_manager`), via `record_fs()` ;
+- hits / misses des caches (`api.cache`, index de recherche, lru_cache).
+
+Les compteurs sont propres au processus : avec plusieurs workers, chaque
+worker expose les siens (agrégation côté scraper).
+"""
+import threading
+from collections import Counter
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_lock = threading.Lock()
+_requests = Counter()            # (route, method, status) -> count
+_latency = {}                    # (route, method) -> [bucket counts..., +Inf], sum
+_sizes = {}                      # (route, method) -> [bucket counts..., +Inf], sum
+_fs_ops = Counter()              # (component, op) -> count
+_fs_bytes = Counter()            # component -> bytes read
+
+
+def _observe(store, key, buckets, value):
+    entry = store.get(key)
+    if entry is None:
+        entry = store[key] = [[0] * (len(buckets) + 1), 0.0]
+    counts = entry[0]
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            counts[i] += 1
+            break
+    else:
+        counts[-1] += 1
+    entry[1] += value
+
+
+def record_request(route, method, status, duration, size):
+    """Enregistre une requête terminée (durée en secondes, taille en octets ou None)."""
+    with _lock:
+        _requests[(route, method, status)] += 1
+        _observe(_latency, (route, method), LATENCY_BUCKETS, duration)
+        if size is not None:
+            _observe(_sizes, (route, method), SIZE_BUCKETS, size)
+
+
+def record_fs(component, op, count=1, bytes_read=0):
+    """Comptabilise des opérations fichiers ('stat', 'listdir', 'open', 'write') d'un composant."""
+    with _lock:
+        if count:
+            _fs_ops[(component, op)] += count
+        if bytes_read:
+            _fs_bytes[component] += bytes_read
+
+
+def record_fs_counter(component, counter):
+    """Ajoute en une fois un Counter {op: n} (plus {'bytes_read': n}) collecté localement."""
+    with _lock:
+        for op, n in counter.items():
+            if op == 'bytes_read':
+                _fs_bytes[component] += n
+            elif n:
+                _fs_ops[(component, op)] += n
+
+
+def reset():
+    """Remet tous les compteurs à zéro (tests / benchmarks)."""
+    with _lock:
+        _requests.clear()
+        _latency.clear()
+        _sizes.clear()
+        _fs_ops.clear()
+        _fs_bytes.clear()
+
+
+def _esc(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_esc(v)}"' for k, v in labels.items()) + '}'
+
+
+def _histogram_lines(name, store, buckets):
+    lines = []
+    for (route, method), (counts, total) in sorted(store.items()):
+        cumulative = 0
+        for bound, n in zip(buckets + ('+Inf',), counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{_labels(route=route, method=method, le=bound)} {cumulative}')
+        lines.append(f'{name}_sum{_labels(route=route, method=method)} {total}')
+        lines.append(f'{name}_count{_labels(route=route, method=method)} {cumulative}')
+    return lines
+
+
+def _cache_stats():
+    """[(nom, hits, misses, entrées, octets)] de tous les caches connus."""
+    from .cache import iter_caches
+    from .parsers import pack_index
+    stats = []
+    for cache in iter_caches():
+        s = cache.stats()
+        stats.append((s['name'], s['hits'], s['misses'], s['entries'], s['bytes']))
+    index_stats = pack_index.stats()
+    stats.append(('static_pack_game_types', index_stats['static_hits'], index_stats['static_misses'],
+                  index_stats['static_entries'], None))
+    stats.append(('pack_index_packs', index_stats['pack_hits'], index_stats['pack_misses'], None, None))
+    from .parsers.asset_search import search_index_stats
+    search_stats = search_index_stats()
+    if search_stats is not None:
+        stats.append(('asset_search_packs', search_stats['hits'], search_stats['misses'],
+                      search_stats['packs'], None))
+    return stats
+
+
+def render_prometheus():
+    """Texte d'exposition Prometheus (version 0.0.4) de toutes les métriques."""
+    with _lock:
+        requests = sorted(_requests.items())
+        latency_lines = _histogram_lines('zproject_http_request_duration_seconds', _latency, LATENCY_BUCKETS)
+        size_lines = _histogram_lines('zproject_http_response_size_bytes', _sizes, SIZE_BUCKETS)
+        fs_ops = sorted(_fs_ops.items())
+        fs_bytes = sorted(_fs_bytes.items())
+
+    lines = [
+        '# HELP zproject_http_requests_total HTTP requests by route, method and status.',
+        '# TYPE zproject_http_requests_total counter',
+    ]
+    for (route, method, status), n in requests:
+        lines.append(f'zproject_http_requests_total{_labels(route=route, method=method, status=status)} {n}')
+    lines += [
+        '# HELP zproject_http_request_duration_seconds Request latency by route.',
+        '# TYPE zproject_http_request_duration_seconds histogram',
+    ] + latency_lines
+    lines += [
+        '# HELP zproject_http_response_size_bytes Response body size (as sent) by route.',
+        '# TYPE zproject_http_response_size_bytes histogram',
+    ] + size_lines
+    lines += [
+        '# HELP zproject_fs_operations_total Filesystem operations by component.',
+        '# TYPE zproject_fs_operations_total counter',
+    ]
+    for (component, op), n in fs_ops:
+        lines.append(f'zproject_fs_operations_total{_labels(component=component, op=op)} {n}')
+    lines += [
+        '# HELP zproject_fs_read_bytes_total Bytes read from disk by component.',
+        '# TYPE zproject_fs_read_bytes_total counter',
+    ]
+    for component, n in fs_bytes:
+        lines.append(f'zproject_fs_read_bytes_total{_labels(component=component)} {n}')
+
+    cache_stats = _cache_stats()
+    lines += [
+        '# HELP zproject_cache_hits_total Cache hits.',
+        '# TYPE zproject_cache_hits_total counter',
+    ]
+    lines += [f'zproject_cache_hits_total{_labels(cache=name)} {hits}' for name, hits, _, _, _ in cache_stats]
+    lines += [
+        '# HELP zproject_cache_misses_total Cache misses.',
+        '# TYPE zproject_cache_misses_total counter',
+    ]
+    lines += [f'zproject_cache_misses_total{_labels(cache=name)} {misses}' for name, _, misses, _, _ in cache_stats]
+    lines += [
+        '# HELP zproject_cache_entries Current number of cache entries.',
+        '# TYPE zproject_cache_entries gauge',
+    ]
+    lines += [
+        f'zproject_cache_entries{_labels(cache=name)} {entries}'
+        for name, _, _, entries, _ in cache_stats if entries is not None
+    ]
+    lines += [
+        '# HELP zproject_cache_bytes Current cache size in bytes.',
+        '# TYPE zproject_cache_bytes gauge',
+    ]
+    lines += [
+        f'zproject_cache_bytes{_labels(cache=name)} {size}'
+        for name, _, _, _, size in cache_stats if size is not None
+    ]
+    return '\n'.join(lines) + '\n'
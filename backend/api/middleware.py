@@ -0,0 +1,135 @@
+"""
+Middlewares de l'API.
+
+`CompressionMiddleware` compresse les réponses JSON de `/api/` en brotli (si le
+paquet `brotli` est installé) ou gzip selon `Accept-Encoding`. Quand la vue
+fournit un ETag (version du contenu : empreinte de pack, stat de carte…), le
+corps compressé est gardé en cache sous (chemin, ETag, type de contenu,
+encodage) : une réponse inchangée n'est compressée qu'une fois. Le type de
+contenu distingue les représentations négociées d'une même ressource (JSON ou
+conteneur compact d'une carte, même ETag). Le flux `text/event-stream` n'est
+jamais compressé (le client le lit au fil de l'eau).
+
+`MetricsMiddleware` mesure latence, code HTTP et taille de chaque réponse
+par route (voir `api.metrics`, exposé sur `/api/metrics`).
+"""
+import gzip
+import re
+import time
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+from .cache import get_cache
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+UNCOMPRESSIBLE_TYPES = ('text/event-stream',)
+_ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def parse_accept_encoding(header):
+    """Retourne {encodage: q} depuis un en-tête Accept-Encoding."""
+    codings = {}
+    for part in (header or '').split(','):
+        m = _ACCEPT_ENCODING_RE.fullmatch(part)
+        if not m:
+            continue
+        try:
+            q = float(m.group(2)) if m.group(2) is not None else 1.0
+        except ValueError:
+            continue
+        codings[m.group(1).lower()] = q
+    return codings
+
+
+def choose_encoding(header):
+    """Meilleur encodage supporté ('br', 'gzip') ou None."""
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*', 0)
+    supported = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best, best_q = None, 0
+    for coding in supported:
+        q = codings.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress_body(body, encoding):
+    """Compresse des octets avec l'encodage demandé (sortie déterministe)."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+    return gzip.compress(body, compresslevel=getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), mtime=0)
+
+
+class CompressionMiddleware:
+    """Compression négociée des réponses JSON de l'API, avec cache des corps compressés."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.cache = get_cache(
+            'compressed_responses',
+            max_entries=4096,
+            max_bytes=getattr(settings, 'COMPRESSION_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+        )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not request.path.startswith('/api/'):
+            return response
+        if response.streaming or response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith(UNCOMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.min_size:
+            return response
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        etag = response.get('ETag')
+        key = (request.get_full_path(), etag, content_type, encoding) if etag else None
+        compressed = self.cache.get(key) if key else None
+        if compressed is None:
+            compressed = compress_body(response.content, encoding)
+            if key:
+                self.cache.set(key, compressed, size=len(compressed))
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if etag and not etag.startswith('W/'):
+            # Même règle que GZipMiddleware : la représentation compressée n'est
+            # pas identique octet à octet, l'ETag devient faible.
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class MetricsMiddleware:
+    """Alimente `api.metrics` : à placer en tête de MIDDLEWARE pour mesurer la requête complète."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        # Motif de route (« api/packs/<str:pack_id>/ ») et non le chemin : cardinalité bornée
+        route = match.route if match is not None and match.route else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        metrics.record_request(route, request.method, response.status_code, duration, size)
+        return response
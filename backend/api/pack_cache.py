@@ -0,0 +1,171 @@
+"""
+Cache des réponses pré-rendues des endpoints packs (liste, assets d'un pack).
+
+Le corps JSON est rendu une seule fois (`editor.json_codec`) puis
+gardé en octets avec son ETag, sous une clé qui inclut la version du pack
+(`pack_fingerprint`). Une requête « chaude » ne fait ni parsing ni
+sérialisation : quelques `stat` pour recalculer l'empreinte, puis une lecture
+de dictionnaire. `invalidate_pack()` est appelé par les uploaders et la
+suppression de pack pour les changements que l'empreinte ne voit pas
+(ex. réécriture d'un `r_90.png`) ; la génération de `pack_index` entre dans
+les clés pour qu'une invalidation faite par un autre worker soit vue aussi.
+"""
+import hashlib
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+
+from editor import json_codec
+
+from .cache import get_cache
+from .parsers import pack_index
+from .parsers.asset_indexer import AssetIndexer
+from .parsers.editor_game_types import resolve_pack_game_type
+from .parsers.pack_fingerprint import pack_fingerprint, pack_tree_fingerprint
+from .parsers.pack_parser import PackParser
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag'])
+
+_LIST_KEY = 'list'
+
+
+def _cache():
+    return get_cache('pack_responses', max_entries=512, max_bytes=128 * 1024 * 1024)
+
+
+def _render(data, version):
+    body = json_codec.dumps(data)
+    return CachedResponse(body, f'"{version}"')
+
+
+def format_pack_assets(pack_info):
+    """
+    Assets d'un pack groupés par catégorie, au format attendu par le frontend.
+    
+    `hash` : sha256 de l'image quand elle est liée au stockage partagé
+    (servie aussi par /api/blobs/<hash>), sinon None.
+    """
+    from editor.blob_store import digest_for_path
+    assets_dir = Path(settings.ASSETS_DIR)
+    formatted_assets = {}
+    for category_name, category_data in pack_info['categories'].items():
+        formatted_assets[category_name] = [
+            {
+                'name': asset['name'],
+                'path': asset['path'],
+                'thumbnail': asset.get('thumbnail'),
+                'rotations': asset.get('rotations', {}),
+                'max': asset.get('max'),
+                'pair': asset.get('pair'),
+                'category': category_name,
+                'hash': digest_for_path(assets_dir / asset['path']),
+            }
+            for asset in category_data['assets']
+        ]
+    return formatted_assets
+
+
+def get_pack_assets_response(pack_id):
+    """CachedResponse des assets d'un pack, ou None si le pack est introuvable / vide."""
+    pack_dir = AssetIndexer.find_pack_dir(pack_id)
+    if pack_dir is None:
+        return None
+    version = pack_fingerprint(pack_dir)
+    if version is None:
+        return None
+    # Génération partagée : une invalidation dans un autre worker change la clé
+    version = f'{version}-{pack_index.pack_generation(pack_id)}'
+    key = ('assets', pack_id, version)
+    cache = _cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    pack_info = pack_index.get_pack(pack_dir)
+    if not pack_info['categories']:
+        return None
+    cached = _render(format_pack_assets(pack_info), version)
+    # Une seule version par pack en cache : on retire les anciennes
+    cache.delete_where(lambda k: k[0] == 'assets' and k[1] == pack_id)
+    cache.set(key, cached, size=len(cached.body))
+    return cached
+
+
+def get_pack_manifest_response(pack_id):
+    """
+    CachedResponse du manifeste de synchronisation d'un pack (sha256 et taille
+    par fichier), ou None si le pack est introuvable. Versionné par l'empreinte
+    complète de l'arborescence : la réécriture d'une image change la version.
+    """
+    from editor.pack_sync import build_pack_manifest
+    pack_dir = AssetIndexer.find_pack_dir(pack_id)
+    if pack_dir is None:
+        return None
+    version = pack_tree_fingerprint(pack_dir)
+    if version is None:
+        return None
+    key = ('manifest', pack_id, version)
+    cache = _cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    manifest = build_pack_manifest(pack_dir)
+    if manifest['version'] != version:
+        # Modifié pendant le calcul : ne pas mettre en cache un mélange
+        return _render(manifest, manifest['version'])
+    cached = _render(manifest, version)
+    cache.delete_where(lambda k: k[0] == 'manifest' and k[1] == pack_id)
+    cache.set(key, cached, size=len(cached.body))
+    return cached
+
+
+def get_pack_list_response():
+    """CachedResponse de la liste des packs (id, nom, image, align, type de jeu)."""
+    pack_dirs = list(AssetIndexer.iter_pack_dirs())
+    h = hashlib.blake2b(digest_size=8)
+    h.update(f'{pack_index.generation()};'.encode())
+    for pack_dir in pack_dirs:
+        h.update(f'{pack_dir}:{pack_fingerprint(pack_dir)};'.encode('utf-8', 'surrogateescape'))
+    version = h.hexdigest()
+    key = (_LIST_KEY, version)
+    cache = _cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    pack_data = []
+    for pack_dir in pack_dirs:
+        try:
+            # Liste : cfg racine seulement, aucun asset n'est lu
+            pack = PackParser(pack_dir).parse_pack(PackParser.DEPTH_META)
+        except Exception as e:
+            print(f"Error indexing pack {pack_dir.name}: {e}")
+            continue
+        pack_data.append({
+            'id': pack['id'],
+            'name': pack['name'],
+            'image': pack.get('image'),
+            'align': pack.get('align', 25),
+            'gameType': resolve_pack_game_type(pack)
+        })
+    cached = _render(pack_data, version)
+    cache.delete_where(lambda k: k[0] == _LIST_KEY)
+    cache.set(key, cached, size=len(cached.body))
+    return cached
+
+
+def invalidate_pack(pack_id):
+    """
+    Oublie les réponses en cache d'un pack (et la liste) ; périme son entrée
+    dans l'index partagé (tous les workers), prévient l'index de recherche (et
+    donc la validation des cartes) et
+    publie un événement `pack` (flux SSE).
+    """
+    pack_index.invalidate(pack_id)
+    _cache().delete_where(lambda k: k[0] == _LIST_KEY or (k[0] in ('assets', 'manifest') and k[1] == pack_id))
+    from .parsers.asset_search import get_search_index
+    get_search_index().invalidate(pack_id)
+    from .events import publish_pack_changed
+    publish_pack_changed(pack_id)
@@ -9,30 +9,13 @@ class AssetIndexer:
     """Index all packs in assets directory"""
     
     @staticmethod
-    def index_all_packs():
-        """Index all packs in the assets directory (and legacy bgmapeditor_tiles)"""
-        packs = []
-        
-        # Check assets directory first (new location)
-        assets_dir = Path(settings.ASSETS_DIR)
-        if assets_dir.exists():
-            for item in assets_dir.iterdir():
-                if item.is_dir() and not item.name.startswith('.'):
-                    # Vérifier que le dossier existe vraiment
-                    if not item.exists():
-                        continue
-                    if item.name.startswith('G-Zombicide-') or (item / 'cfg').exists():
-                        try:
-                            parser = PackParser(item)
-                            pack_info = parser.parse_pack()
-                            packs.append(pack_info)
-                        except Exception as e:
-                            print(f"Error indexing pack {item.name}: {e}")
-        
-        # Also check legacy bgmapeditor_tiles directory
-        tiles_dir = Path(settings.BG_MAPEDITOR_TILES_DIR)
-        if tiles_dir.exists():
-            for item in tiles_dir.iterdir():
+    def iter_pack_dirs():
+        """Yield pack directories (assets first, then legacy bgmapeditor_tiles, ids dédoublonnés)"""
+        seen = set()
+        for root in (Path(settings.ASSETS_DIR), Path(settings.BG_MAPEDITOR_TILES_DIR)):
+            if not root.exists():
+                continue
+            for item in root.iterdir():
                 if item.is_dir() and not item.name.startswith('.'):
                     # Vérifier que le dossier existe vraiment
                     if not item.exists():
@@ -40,33 +23,53 @@ class AssetIndexer:
                     # Check if it looks like a pack directory
                     if item.name.startswith('G-Zombicide-') or (item / 'cfg').exists():
                         # Skip if already found in assets
-                        if not any(p['id'] == item.name for p in packs):
-                            try:
-                                parser = PackParser(item)
-                                pack_info = parser.parse_pack()
-                                packs.append(pack_info)
-                            except Exception as e:
-                                print(f"Error indexing pack {item.name}: {e}")
-        
+                        if item.name in seen:
+                            continue
+                        seen.add(item.name)
+                        yield item
+    
+    @staticmethod
+    def find_pack_dir(pack_id):
+        """Return the directory of a pack (assets first, then legacy) or None"""
+        for root in (Path(settings.ASSETS_DIR), Path(settings.BG_MAPEDITOR_TILES_DIR)):
+            pack_dir = root / pack_id
+            if pack_dir.exists():
+                return pack_dir
+        return None
+    
+    @staticmethod
+    def get_pack(pack_id, depth=PackParser.DEPTH_FULL):
+        """Parse a single pack by id at the given depth (PackParser.DEPTH_*), or None"""
+        pack_dir = AssetIndexer.find_pack_dir(pack_id)
+        if pack_dir is None:
+            return None
+        if depth == PackParser.DEPTH_FULL:
+            from .pack_index import get_pack
+            return get_pack(pack_dir)
+        return PackParser(pack_dir).parse_pack(depth)
+    
+    @staticmethod
+    def index_all_packs(depth=PackParser.DEPTH_FULL):
+        """Index all packs in the assets directory (and legacy bgmapeditor_tiles)"""
+        packs = []
+        for item in AssetIndexer.iter_pack_dirs():
+            try:
+                parser = PackParser(item)
+                pack_info = parser.parse_pack(depth)
+                packs.append(pack_info)
+            except Exception as e:
+                print(f"Error indexing pack {item.name}: {e}")
         return packs
     
     @staticmethod
     def get_pack_assets(pack_id):
         """Get assets for a specific pack"""
-        # Try assets directory first
-        assets_dir = Path(settings.ASSETS_DIR)
-        pack_dir = assets_dir / pack_id
-        
-        if not pack_dir.exists():
-            # Try legacy directory
-            tiles_dir = Path(settings.BG_MAPEDITOR_TILES_DIR)
-            pack_dir = tiles_dir / pack_id
-        
-        if not pack_dir.exists():
+        pack_dir = AssetIndexer.find_pack_dir(pack_id)
+        if pack_dir is None:
             return {}
         
-        parser = PackParser(pack_dir)
-        pack_info = parser.parse_pack()
+        from .pack_index import get_pack
+        pack_info = get_pack(pack_dir)
         
         # Return assets organized by category
         assets_by_category = {}
@@ -0,0 +1,520 @@
+"""
+Recherche floue d'assets tous packs confondus (index trigrammes en mémoire).
+
+Chaque asset (nom, catégorie, nom du pack) est découpé en mots, et chaque mot
+en trigrammes « à la pg_trgm » (`"  mot "`). L'index inversé associe à chaque
+trigramme un masque de bits (entier Python, bit = id d'asset) : intersections,
+filtres et comptage des trigrammes communs sont des opérations sur entiers
+faites en C, quel que soit le nombre d'assets concernés. Les ids d'un pack sont
+contigus, ce qui permet d'ajouter ou de retirer un pack par décalage de bits.
+
+L'index est construit depuis la sortie de `PackParser` (la même que
+`AssetIndexer`) par `refresh()`, qui parcourt les packs (empreintes) : au
+premier usage, au préchauffage, ou après une invalidation globale. Ensuite,
+une recherche ne fait qu'une requête sur la génération de `pack_index` ; les
+packs invalidés depuis (`invalidate_pack()` : uploaders, suppression, watcher,
+quel que soit le worker) sont relus un par un. Une modification faite à la
+main dans ASSETS_DIR, sans watcher, n'est vue qu'après une invalidation.
+
+L'index tient aussi la table chemin -> asset (chemin principal, vignette,
+rotations) de `lookup_path()`, utilisée par la validation des cartes
+(`api.map_validation`).
+"""
+import bisect
+import math
+import re
+import threading
+import unicodedata
+
+from .asset_indexer import AssetIndexer
+from .editor_game_types import resolve_pack_game_type
+from . import pack_index
+from .pack_fingerprint import pack_fingerprint
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_IMAGE_EXT_RE = re.compile(r'\.(png|jpe?g)$', re.IGNORECASE)
+
+# Seuil de similarité : part minimale des trigrammes de la requête présents dans l'asset
+MIN_SIMILARITY = 0.6
+
+
+def normalize_text(text):
+    """Minuscules, sans accents ni extension image."""
+    if not text:
+        return ''
+    text = _IMAGE_EXT_RE.sub('', str(text))
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.lower()
+
+
+def word_trigrams(word, complete=True):
+    """Trigrammes d'un mot, préfixé de deux espaces (et suffixé d'un si complet)."""
+    padded = f'  {word} ' if complete else f'  {word}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def text_trigrams(text, partial_last=False):
+    """Trigrammes de tous les mots d'un texte normalisé."""
+    words = _WORD_RE.findall(text)
+    grams = set()
+    for i, word in enumerate(words):
+        complete = not (partial_last and i == len(words) - 1)
+        grams |= word_trigrams(word, complete)
+    return grams
+
+
+class AssetSearchIndex:
+    """Index trigrammes des assets de tous les packs, rafraîchi par pack."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}           # doc_id -> dict asset (+ champs de recherche)
+        self._postings = {}       # trigramme -> masque des ids
+        self._name_postings = {}  # trigramme du nom seul -> masque des ids
+        self._by_game_type = {}   # type de jeu -> masque des ids
+        self._by_category = {}    # id de catégorie (minuscules) -> masque des ids
+        self._live = 0            # masque de tous les ids présents
+        self._order = None        # ids triés par (nom, id), recalculé à la demande
+        self._names = None
+        self._rank = None
+        self._pack_docs = {}      # pack_id -> range(doc_id) contigu
+        self._paths = {}          # chemin (principal, vignette, rotation) -> doc
+        self._pack_fingerprints = {}
+        self._next_id = 0
+        self._generation = None   # génération de pack_index vue au dernier sync (None : à construire)
+        self._dirty_packs = set()
+        # Packs réutilisés tels quels (hit) / re-parsés (miss) lors des rafraîchissements
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def invalidate(self, pack_id=None):
+        """Force la relecture d'un pack (ou de tous) à la prochaine recherche."""
+        with self._lock:
+            if pack_id is None:
+                self._generation = None
+                self._pack_fingerprints.clear()
+            else:
+                self._dirty_packs.add(pack_id)
+
+    def refresh(self, force=False):
+        """Parcourt les packs : re-parse les packs modifiés, retire les packs disparus."""
+        with self._lock:
+            generation = pack_index.generation()
+            if force:
+                self._pack_fingerprints.clear()
+            generations = pack_index.pack_generations()
+            seen = set()
+            for pack_dir in AssetIndexer.iter_pack_dirs():
+                pack_id = pack_dir.name
+                seen.add(pack_id)
+                fingerprint = pack_fingerprint(pack_dir)
+                if fingerprint is not None:
+                    fingerprint = f'{fingerprint}-{generations.get(pack_id, 0)}'
+                if (
+                    pack_id not in self._dirty_packs
+                    and fingerprint is not None
+                    and self._pack_fingerprints.get(pack_id) == fingerprint
+                ):
+                    self.hits += 1
+                    continue
+                self._index_pack(pack_dir, fingerprint)
+            for pack_id in list(self._pack_docs):
+                if pack_id not in seen:
+                    self._remove_pack(pack_id)
+                    self._pack_fingerprints.pop(pack_id, None)
+            self._dirty_packs.clear()
+            self._generation = generation
+
+    def sync(self):
+        """
+        Met l'index à jour sans parcourir les packs : construction complète au
+        premier appel (ou après une invalidation globale), sinon relecture des
+        seuls packs invalidés depuis le dernier appel.
+        """
+        with self._lock:
+            if self._generation is None:
+                self.refresh()
+                return
+            generation = pack_index.generation()
+            if generation == self._generation and not self._dirty_packs:
+                return
+            generation, pack_ids, full = pack_index.changes_since(self._generation)
+            if full:
+                self.refresh()
+                return
+            for pack_id in pack_ids | self._dirty_packs:
+                pack_dir = AssetIndexer.find_pack_dir(pack_id)
+                if pack_dir is None or not pack_dir.is_dir():
+                    self._remove_pack(pack_id)
+                    self._pack_fingerprints.pop(pack_id, None)
+                    continue
+                fingerprint = pack_fingerprint(pack_dir)
+                if fingerprint is not None:
+                    fingerprint = f'{fingerprint}-{pack_index.pack_generation(pack_id)}'
+                self._index_pack(pack_dir, fingerprint)
+            self._dirty_packs.clear()
+            self._generation = generation
+
+    def _index_pack(self, pack_dir, fingerprint):
+        self.misses += 1
+        try:
+            pack_info = pack_index.get_pack(pack_dir)
+        except Exception as e:
+            print(f"Error indexing pack {pack_dir.name} for search: {e}")
+            return
+        self._replace_pack(pack_info)
+        self._pack_fingerprints[pack_dir.name] = fingerprint
+
+    @staticmethod
+    def _clear_bits(index, keys, clear):
+        for key in keys:
+            mask = index.get(key, 0) & clear
+            if mask:
+                index[key] = mask
+            else:
+                index.pop(key, None)
+
+    def _remove_pack(self, pack_id):
+        doc_ids = self._pack_docs.pop(pack_id, None)
+        if not doc_ids:
+            return
+        clear = ~(((1 << len(doc_ids)) - 1) << doc_ids.start)
+        grams, name_grams, game_types, categories = set(), set(), set(), set()
+        for doc_id in doc_ids:
+            doc = self._docs.pop(doc_id)
+            for path in self._doc_paths(doc):
+                if self._paths.get(path) is doc:
+                    del self._paths[path]
+            grams |= doc['_grams']
+            name_grams |= doc['_name_grams']
+            game_types.add(doc['gameType'])
+            categories.add(doc['category'].lower())
+        self._clear_bits(self._postings, grams, clear)
+        self._clear_bits(self._name_postings, name_grams, clear)
+        self._clear_bits(self._by_game_type, game_types, clear)
+        self._clear_bits(self._by_category, categories, clear)
+        self._live &= clear
+        self._order = None
+        # Ids libérés jamais réutilisés : on renumérote quand les trous dominent
+        if self._next_id > 2 * len(self._docs) + 4096:
+            self._compact()
+
+    def _compact(self):
+        """Renumérote tous les assets de 0 (masques reconstruits)."""
+        packs = [[self._docs[doc_id] for doc_id in ids] for ids in self._pack_docs.values()]
+        for index in (self._postings, self._name_postings, self._by_game_type, self._by_category):
+            index.clear()
+        self._docs.clear()
+        self._pack_docs.clear()
+        self._paths.clear()
+        self._live = 0
+        self._next_id = 0
+        for docs in packs:
+            self._add_docs(docs[0]['packId'], docs)
+
+    def _add_docs(self, pack_id, docs):
+        """Ajoute les assets d'un pack sous des ids contigus ; masques construits localement puis décalés."""
+        base = self._next_id
+        self._next_id += len(docs)
+        local = {}
+        local_names = {}
+        local_game_types = {}
+        local_categories = {}
+        for i, doc in enumerate(docs):
+            bit = 1 << i
+            for gram in doc['_grams']:
+                local[gram] = local.get(gram, 0) | bit
+            for gram in doc['_name_grams']:
+                local_names[gram] = local_names.get(gram, 0) | bit
+            local_game_types[doc['gameType']] = local_game_types.get(doc['gameType'], 0) | bit
+            category = doc['category'].lower()
+            local_categories[category] = local_categories.get(category, 0) | bit
+            self._docs[base + i] = doc
+            for path in self._doc_paths(doc):
+                self._paths[path] = doc
+        for index, masks in (
+            (self._postings, local),
+            (self._name_postings, local_names),
+            (self._by_game_type, local_game_types),
+            (self._by_category, local_categories),
+        ):
+            for key, mask in masks.items():
+                index[key] = index.get(key, 0) | (mask << base)
+        self._live |= ((1 << len(docs)) - 1) << base
+        self._pack_docs[pack_id] = range(base, base + len(docs))
+        self._order = None
+
+    @staticmethod
+    def _doc_paths(doc):
+        yield doc['path']
+        if doc['thumbnail']:
+            yield doc['thumbnail']
+        yield from doc['rotations'].values()
+
+    def _replace_pack(self, pack_info):
+        pack_id = pack_info['id']
+        self._remove_pack(pack_id)
+        pack_name = pack_info.get('name') or pack_id
+        game_type = resolve_pack_game_type(pack_info)
+        pack_grams = text_trigrams(normalize_text(f'{pack_id} {pack_name}'))
+        docs = []
+        for category_name, category_data in pack_info['categories'].items():
+            context_grams = pack_grams | text_trigrams(
+                normalize_text(f"{category_name} {category_data.get('name', '')}")
+            )
+            for asset in category_data['assets']:
+                name_text = normalize_text(asset['name'])
+                name_grams = text_trigrams(name_text)
+                docs.append({
+                    'name': asset['name'],
+                    'path': asset['path'],
+                    'thumbnail': asset.get('thumbnail'),
+                    'rotations': asset.get('rotations', {}),
+                    'max': asset.get('max'),
+                    'pair': asset.get('pair'),
+                    'category': category_name,
+                    'packId': pack_id,
+                    'packName': pack_name,
+                    'gameType': game_type,
+                    '_name': name_text,
+                    '_grams': name_grams | context_grams,
+                    '_name_grams': name_grams,
+                })
+        if docs:
+            self._add_docs(pack_id, docs)
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def _ordered(self):
+        """Ids triés par (nom, id) et rang de chaque id ; recalculés après un changement de pack."""
+        if self._order is None:
+            docs = self._docs
+            self._order = sorted(docs, key=lambda doc_id: (docs[doc_id]['_name'], doc_id))
+            self._names = [docs[doc_id]['_name'] for doc_id in self._order]
+            self._rank = {doc_id: i for i, doc_id in enumerate(self._order)}
+        return self._order
+
+    @staticmethod
+    def _ids(mask):
+        """Ids des bits à 1 d'un masque (recherche de '1' dans sa forme binaire inversée)."""
+        bits = format(mask, 'b')[::-1]
+        ids = []
+        i = bits.find('1')
+        while i != -1:
+            ids.append(i)
+            i = bits.find('1', i + 1)
+        return ids
+
+    def _first_by_name(self, mask, needed):
+        """Les `needed` premiers ids du masque dans l'ordre (nom, id)."""
+        if needed <= 0 or not mask:
+            return []
+        order = self._ordered()
+        count = mask.bit_count()
+        # Masque dense : parcours de l'ordre global (~needed * N / count tests
+        # d'un caractère) ; masque creux : extraction des ids puis tri
+        if count * count > needed * len(order):
+            bits = format(mask, 'b')[::-1]
+            size = len(bits)
+            out = []
+            for doc_id in order:
+                if doc_id < size and bits[doc_id] == '1':
+                    out.append(doc_id)
+                    if len(out) == needed:
+                        break
+            return out
+        return sorted(self._ids(mask), key=self._rank.__getitem__)[:needed]
+
+    def search(self, query, game_type=None, category=None, limit=50):
+        """
+        Retourne les assets les mieux classés pour `query`.
+
+        Le score combine la similarité trigrammes (part des trigrammes de la
+        requête présents) et des bonus sur le nom d'asset (égalité +2, préfixe
+        +1, sous-chaîne +0.5) ; à score égal, ordre des noms. Les niveaux de
+        score sont disjoints : on les parcourt du meilleur au moins bon et on
+        s'arrête dès `limit` résultats.
+          1. nom commençant par la requête (plage de la liste triée des noms) ;
+          2. nom contenant la requête (masques des trigrammes internes du nom) ;
+          3. tous les trigrammes (ET des masques, les plus rares d'abord) ;
+          4. au moins MIN_SIMILARITY des trigrammes (compteurs en tranches de
+             bits sur les masques), par nombre de trigrammes décroissant.
+        Pour une requête sans trigramme interne (mots de moins de 3 caractères),
+        le bonus sous-chaîne n'est accordé qu'aux préfixes.
+        Filtres optionnels : type de jeu, id de catégorie.
+        """
+        self.sync()
+        q = normalize_text(query).strip()
+        q_grams = text_trigrams(q, partial_last=True)
+        if not q_grams or limit <= 0:
+            return []
+        category = (category or '').strip().lower() or None
+        game_type = (game_type or '').strip().lower() or None
+        if game_type == 'all':
+            game_type = None
+
+        with self._lock:
+            postings = self._postings
+            docs = self._docs
+            allowed = self._live
+            if game_type:
+                allowed &= self._by_game_type.get(game_type, 0)
+            if category:
+                allowed &= self._by_category.get(category, 0)
+            if not allowed:
+                return []
+
+            masks = {g: postings.get(g, 0) & allowed for g in q_grams}
+            grams = sorted(q_grams, key=lambda g: masks[g].bit_count())
+            n = len(grams)
+            min_match = max(1, math.ceil(MIN_SIMILARITY * n))
+            scored = []         # (score, doc_id), dans l'ordre final
+            taken = 0
+
+            # 1. Préfixe du nom ; le nom exact trie avant ses prolongements
+            order = self._ordered()
+            names = self._names
+            allowed_bits = format(allowed, 'b')[::-1] if allowed != self._live else None
+            for i in range(bisect.bisect_left(names, q), len(names)):
+                name = names[i]
+                if not name.startswith(q):
+                    break
+                doc_id = order[i]
+                if allowed_bits is not None and (doc_id >= len(allowed_bits) or allowed_bits[doc_id] != '1'):
+                    continue
+                scored.append((3.0 if name == q else 2.0, doc_id))
+                taken |= 1 << doc_id
+                if len(scored) == limit:
+                    break
+
+            # Tous les trigrammes : ET des masques, les plus rares d'abord
+            exact = masks[grams[0]]
+            for gram in grams[1:]:
+                if not exact:
+                    break
+                exact &= masks[gram]
+            exact &= ~taken
+
+            # 2. Sous-chaîne du nom (candidats : noms contenant les trigrammes internes)
+            inner = {w[i:i + 3] for w in _WORD_RE.findall(q) for i in range(len(w) - 2)}
+            if len(scored) < limit and inner:
+                contains = allowed & ~taken
+                for gram in sorted(inner, key=lambda g: self._name_postings.get(g, 0).bit_count()):
+                    if not contains:
+                        break
+                    contains &= self._name_postings.get(gram, 0)
+                substring = []
+                for doc_id in self._ids(contains):
+                    doc = docs[doc_id]
+                    if q not in doc['_name']:
+                        continue
+                    if exact >> doc_id & 1:
+                        score = 1.0
+                    else:
+                        matched = sum(1 for g in grams if g in doc['_grams'])
+                        if matched < min_match:
+                            continue
+                        score = matched / n
+                    substring.append((score + 0.5, doc_id))
+                substring.sort(key=lambda item: (-item[0], self._rank[item[1]]))
+                for item in substring[:limit - len(scored)]:
+                    scored.append(item)
+                    taken |= 1 << item[1]
+                exact &= ~taken
+
+            # 3. Tous les trigrammes
+            if len(scored) < limit:
+                for doc_id in self._first_by_name(exact, limit - len(scored)):
+                    scored.append((1.0, doc_id))
+                    taken |= 1 << doc_id
+
+            # 4. Similarité partielle : compteur binaire par tranches de bits
+            # (planes[i] = bit i du nombre de trigrammes de chaque asset)
+            if len(scored) < limit and min_match < n:
+                remaining = ~(exact | taken)
+                planes = []
+                for gram in grams:
+                    carry = masks[gram] & remaining
+                    i = 0
+                    while carry:
+                        if i == len(planes):
+                            planes.append(carry)
+                            break
+                        plane = planes[i]
+                        planes[i] = plane ^ carry
+                        carry &= plane
+                        i += 1
+                candidates = allowed & remaining
+                for matched in range(n - 1, min_match - 1, -1):
+                    if matched >> len(planes):
+                        continue
+                    level = candidates
+                    for i, plane in enumerate(planes):
+                        level &= plane if matched >> i & 1 else ~plane
+                        if not level:
+                            break
+                    for doc_id in self._first_by_name(level, limit - len(scored)):
+                        scored.append((matched / n, doc_id))
+                    if len(scored) >= limit:
+                        break
+
+            results = []
+            for score, doc_id in scored[:limit]:
+                doc = docs[doc_id]
+                entry = {k: v for k, v in doc.items() if not k.startswith('_')}
+                entry['score'] = round(score, 4)
+                results.append(entry)
+            return results
+
+    def lookup_path(self, path):
+        """
+        Asset (dict interne, ne pas modifier) d'un chemin principal, de vignette
+        ou de rotation, None s'il est inconnu. Sans `sync()` : l'appelant
+        synchronise une fois avant une série de recherches.
+        """
+        return self._paths.get(path)
+
+    def pack_ids(self):
+        """Ids des packs indexés (y compris sans asset)."""
+        with self._lock:
+            return set(self._pack_fingerprints)
+
+    def stats(self):
+        """Compteurs de l'index (packs, assets, hits / misses de rafraîchissement)."""
+        with self._lock:
+            return {
+                'packs': len(self._pack_docs),
+                'assets': len(self._docs),
+                'trigrams': len(self._postings),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Global index instance
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Get or create the global asset search index"""
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = AssetSearchIndex()
+    return _search_index
+
+
+def search_index_stats():
+    """Statistiques de l'index global s'il a déjà été créé, sinon None."""
+    if _search_index is None:
+        return None
+    return _search_index.stats()
@@ -1,4 +1,5 @@
 """Types de jeu reconnus par l'éditeur (filtres UI, cfg racine, meta)."""
+import json
 
 ALLOWED_EDITOR_GAME_TYPES = frozenset({
     'classic', 'modern', 'fantasy', 'western', 'scifi', 'night',
@@ -13,3 +14,50 @@ def normalize_editor_game_type(raw):
     if not g or g == 'all' or g not in ALLOWED_EDITOR_GAME_TYPES:
         return None
     return g
+
+
+def _read_static_index(index_path):
+    """Table { packId: gameType } lue depuis un `packs-index.json` ({} si absent / invalide)."""
+    try:
+        if not index_path.exists():
+            return {}
+        with open(index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f) or {}
+        packs = data.get('packs') or []
+        if not isinstance(packs, list):
+            return {}
+        m = {}
+        for p in packs:
+            if not isinstance(p, dict):
+                continue
+            pid = p.get('id')
+            gt = p.get('gameType')
+            if isinstance(pid, str) and isinstance(gt, str) and pid and gt:
+                m[pid] = gt
+        return m
+    except Exception:
+        return {}
+
+
+def load_static_pack_game_types():
+    """
+    Source de vérité partagée avec le build statique: `packs-index.json`.
+    Retourne un dict { packId: gameType }, relu quand le fichier change
+    (table partagée entre processus, voir `pack_index`).
+    """
+    from .pack_index import static_game_types
+    return static_game_types(_read_static_index)
+
+
+def resolve_pack_game_type(pack):
+    """
+    Résout le type de jeu d'un pack.
+    Priorité: info du pack (cfg racine / meta) puis mapping du static index.
+    """
+    try:
+        gt = pack.get('gameType')
+        if isinstance(gt, str) and gt:
+            return gt
+    except Exception:
+        pass
+    return load_static_pack_game_types().get(pack.get('id'))
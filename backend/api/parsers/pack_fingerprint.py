@@ -0,0 +1,102 @@
+"""
+Empreinte légère d'un pack (détection de changement sans re-parser).
+
+L'empreinte combine les mtimes/tailles du dossier pack, du cfg racine, de
+chaque dossier catégorie et de son cfg, et de chaque dossier d'asset
+(`01.tiles/6V.png/`) : ajouter / supprimer / renommer un asset modifie le
+mtime du dossier catégorie, ajouter ou supprimer une rotation ou une
+vignette celui du dossier d'asset, éditer `max=` ou `pairs=` modifie le cfg.
+Coût : un listing par catégorie et un `stat` par dossier d'asset, aucune
+lecture de fichier.
+"""
+import hashlib
+import os
+
+
+def _stat_key(path):
+    """(mtime_ns, size) d'un chemin, ou None s'il n'existe pas."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def pack_fingerprint(pack_dir):
+    """
+    Retourne une empreinte hexadécimale courte du pack, ou None si le dossier
+    n'existe plus.
+    """
+    pack_dir = os.fspath(pack_dir)
+    root_key = _stat_key(pack_dir)
+    if root_key is None:
+        return None
+
+    h = hashlib.blake2b(digest_size=8)
+    h.update(repr(root_key).encode())
+    h.update(repr(_stat_key(os.path.join(pack_dir, 'cfg'))).encode())
+    h.update(repr(_stat_key(os.path.join(pack_dir, 'editor_pack_meta.json'))).encode())
+    try:
+        with os.scandir(pack_dir) as it:
+            entries = sorted(
+                (e for e in it if not e.name.startswith('.') and e.is_dir()),
+                key=lambda e: e.name,
+            )
+    except OSError:
+        return None
+    for entry in entries:
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        h.update(entry.name.encode('utf-8', 'surrogateescape'))
+        h.update(repr((st.st_mtime_ns, st.st_size)).encode())
+        h.update(repr(_stat_key(os.path.join(entry.path, 'cfg'))).encode())
+        # Dossiers d'asset (rotations r_<angle>.png, vignette r_thumb.png)
+        try:
+            with os.scandir(entry.path) as it:
+                asset_dirs = sorted((e for e in it if not e.name.startswith('.') and e.is_dir()),
+                                    key=lambda e: e.name)
+        except OSError:
+            continue
+        for asset_dir in asset_dirs:
+            try:
+                st = asset_dir.stat()
+            except OSError:
+                continue
+            h.update(asset_dir.name.encode('utf-8', 'surrogateescape'))
+            h.update(repr((st.st_mtime_ns, st.st_size)).encode())
+    return h.hexdigest()
+
+
+def pack_tree_fingerprint(pack_dir):
+    """
+    Empreinte complète d'un pack : chemin relatif, mtime et taille de chaque
+    fichier et dossier (hors fichiers cachés). Plus coûteuse que
+    `pack_fingerprint` (un stat par fichier) mais voit aussi la réécriture d'une
+    image ; utilisée par les builds statiques. None si le dossier n'existe plus.
+    """
+    pack_dir = os.fspath(pack_dir)
+    if _stat_key(pack_dir) is None:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(pack_dir, rel_dir)) as it:
+                entries = sorted((e for e in it if not e.name.startswith('.')), key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            try:
+                st = entry.stat()
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            h.update(rel_path.encode('utf-8', 'surrogateescape'))
+            h.update(repr((is_dir, st.st_mtime_ns, st.st_size)).encode())
+            if is_dir:
+                stack.append(rel_path)
+    return h.hexdigest()
@@ -0,0 +1,266 @@
+"""
+Index des packs partagé entre processus (SQLite, `PACK_INDEX_PATH`).
+
+Sous gunicorn / uvicorn, chaque worker parsait les packs et relisait
+`packs-index.json` pour son propre compte, et `invalidate_pack()` ne
+prévenait que le worker qui l'appelait. Cet index garde sur disque :
+  - le résultat de `PackParser.parse_pack()` (DEPTH_FULL) de chaque pack,
+    avec l'empreinte (`pack_fingerprint`) pour laquelle il est valable ;
+  - la table pack -> type de jeu du build statique, avec la version du
+    fichier dont elle est issue ;
+  - un compteur de génération global, et la génération de chaque pack,
+    incrémentés par `invalidate()`.
+
+Une entrée périmée est reparsée hors transaction (aucun verrou d'écriture
+tenu pendant le parsing), puis enregistrée par un seul `INSERT … ON CONFLICT
+DO UPDATE … WHERE` : l'écriture n'a lieu que si la génération du pack n'a pas
+changé depuis la lecture (une invalidation pendant le parsing n'est pas
+écrasée) et si un autre processus n'a pas déjà enregistré cette empreinte.
+Les lectures ne sont jamais bloquées (mode WAL).
+Les caches mémoire des workers (`api.pack_cache`, index de recherche,
+catalogue de validation) incluent la génération dans leur clé ou comparent
+`generation()` : une seule requête pour savoir s'ils sont périmés, puis
+`changes_since()` pour savoir quels packs relire.
+
+En cas d'erreur SQLite (disque en lecture seule…), repli sur un parsing
+direct, comme avant.
+"""
+import sqlite3
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+from editor import json_codec
+
+from .pack_fingerprint import pack_fingerprint
+from .pack_parser import PackParser
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS packs (
+    pack_id TEXT PRIMARY KEY,
+    pack_dir TEXT,
+    fingerprint TEXT,
+    generation INTEGER NOT NULL DEFAULT 0,
+    data BLOB
+);
+CREATE TABLE IF NOT EXISTS static_game_types (pack_id TEXT PRIMARY KEY, game_type TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+_static_memo = {}       # chemin de l'index -> (version du fichier, {packId: gameType})
+# Compteurs du processus : parse lu dans l'index (hit) / reconstruit (miss), idem pour la table statique
+_stats = {'pack_hits': 0, 'pack_misses': 0, 'static_hits': 0, 'static_misses': 0}
+
+
+def get_index_path():
+    """Fichier SQLite (settings.PACK_INDEX_PATH, défaut MEDIA_ROOT/pack_index.sqlite3)."""
+    return Path(getattr(settings, 'PACK_INDEX_PATH', None) or Path(settings.MEDIA_ROOT) / 'pack_index.sqlite3')
+
+
+def _connect():
+    """Connexion du thread courant (réutilisée : les vérifications de génération sont fréquentes)."""
+    path = get_index_path()
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        with _init_lock:
+            if path not in _initialized:
+                path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+            if path not in _initialized:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(_SCHEMA)
+                _initialized.add(path)
+        conns[path] = conn
+    return conn
+
+
+class _Write:
+    """Transaction d'écriture exclusive (un seul constructeur à la fois, tous processus confondus)."""
+
+    def __enter__(self):
+        self.conn = _connect()
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+def _bump(conn):
+    gen = generation(conn) + 1
+    conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('generation', ?)", (str(gen),))
+    return gen
+
+
+def generation(conn=None):
+    """Compteur global, incrémenté à chaque invalidation (vérification de fraîcheur en une requête)."""
+    try:
+        row = (conn or _connect()).execute("SELECT value FROM state WHERE key = 'generation'").fetchone()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error reading pack index generation: {e}")
+        return 0
+    return int(row[0]) if row else 0
+
+
+def pack_generations():
+    """{pack_id: génération} des packs invalidés au moins une fois."""
+    try:
+        return dict(_connect().execute('SELECT pack_id, generation FROM packs'))
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error reading pack index generations: {e}")
+        return {}
+
+
+def pack_generation(pack_id):
+    """Génération d'un pack (0 s'il n'a jamais été invalidé)."""
+    try:
+        row = _connect().execute('SELECT generation FROM packs WHERE pack_id = ?', (pack_id,)).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error reading pack index generation: {e}")
+        return 0
+    return row[0] if row else 0
+
+
+def changes_since(since):
+    """
+    (génération, {pack_id invalidés depuis `since`}, full) ; full : une
+    invalidation globale a eu lieu depuis `since` (tout relire).
+    En cas d'erreur SQLite : (None, set(), True).
+    """
+    try:
+        conn = _connect()
+        gen = generation(conn)
+        row = conn.execute("SELECT value FROM state WHERE key = 'full_generation'").fetchone()
+        pack_ids = {r[0] for r in conn.execute('SELECT pack_id FROM packs WHERE generation > ?', (since,))}
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error reading pack index changes: {e}")
+        return None, set(), True
+    return gen, pack_ids, bool(row and int(row[0]) > since)
+
+
+def _decode_pack(data):
+    """JSON -> résultat de parse_pack (les angles des rotations redeviennent des entiers)."""
+    pack_info = json_codec.loads(data)
+    for category in pack_info.get('categories', {}).values():
+        for asset in category.get('assets', ()):
+            if asset.get('rotations'):
+                asset['rotations'] = {int(angle): path for angle, path in asset['rotations'].items()}
+    return pack_info
+
+
+def get_pack(pack_dir):
+    """
+    Résultat de `PackParser(pack_dir).parse_pack()` (DEPTH_FULL), lu dans
+    l'index partagé si l'empreinte du pack n'a pas changé, sinon reparsé
+    (hors transaction) et enregistré par compare-and-set sur la génération.
+    """
+    pack_dir = Path(pack_dir)
+    pack_id = pack_dir.name
+    fingerprint = pack_fingerprint(pack_dir)
+    try:
+        conn = _connect()
+        row = conn.execute(
+            'SELECT pack_dir, fingerprint, data, generation FROM packs WHERE pack_id = ?', (pack_id,)
+        ).fetchone()
+        if fingerprint is not None and row and row[2] is not None and row[:2] == (str(pack_dir), fingerprint):
+            _stats['pack_hits'] += 1
+            return _decode_pack(row[2])
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error using shared pack index for {pack_id}: {e}")
+        return PackParser(pack_dir).parse_pack()
+
+    _stats['pack_misses'] += 1
+    pack_info = PackParser(pack_dir).parse_pack()
+    if fingerprint is None or pack_fingerprint(pack_dir) != fingerprint:
+        # Pack modifié pendant le parsing : résultat rendu mais pas enregistré
+        return pack_info
+    try:
+        conn.execute(
+            'INSERT INTO packs (pack_id, pack_dir, fingerprint, data) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (pack_id) DO UPDATE SET pack_dir = excluded.pack_dir, '
+            'fingerprint = excluded.fingerprint, data = excluded.data '
+            'WHERE packs.generation = ? '
+            'AND (packs.fingerprint IS NOT excluded.fingerprint OR packs.pack_dir IS NOT excluded.pack_dir)',
+            (pack_id, str(pack_dir), fingerprint, json_codec.dumps(pack_info), row[3] if row else 0),
+        )
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error storing pack {pack_id} in shared pack index: {e}")
+    return pack_info
+
+
+def invalidate(pack_id=None):
+    """Périme l'entrée d'un pack (ou de tous) pour tous les processus ; retourne la nouvelle génération."""
+    try:
+        with _Write() as conn:
+            gen = _bump(conn)
+            if pack_id is None:
+                conn.execute('UPDATE packs SET fingerprint = NULL, data = NULL, generation = ?', (gen,))
+                conn.execute("DELETE FROM state WHERE key = 'static_version'")
+                conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('full_generation', ?)", (str(gen),))
+            else:
+                conn.execute(
+                    'INSERT INTO packs (pack_id, generation) VALUES (?, ?) '
+                    'ON CONFLICT (pack_id) DO UPDATE SET fingerprint = NULL, data = NULL, '
+                    'generation = excluded.generation',
+                    (pack_id, gen),
+                )
+            return gen
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error invalidating shared pack index: {e}")
+        return None
+
+
+def stats():
+    """Compteurs du processus et nombre d'entrées de la table statique en mémoire (métriques)."""
+    result = dict(_stats)
+    result['static_entries'] = sum(len(mapping) for _, mapping in _static_memo.values())
+    return result
+
+
+def _static_index_version(index_path):
+    try:
+        st = index_path.stat()
+    except OSError:
+        return 'missing'
+    return f'{st.st_mtime_ns:x}-{st.st_size:x}'
+
+
+def static_game_types(reader):
+    """
+    {packId: gameType} du build statique (`packs-index.json`), relu par un
+    seul processus quand le fichier change ; reader(path) -> dict lit le fichier.
+    """
+    index_path = Path(settings.BASE_DIR) / 'packs-index.json'
+    version = _static_index_version(index_path)
+    memo = _static_memo.get(index_path)
+    if memo is not None and memo[0] == version:
+        _stats['static_hits'] += 1
+        return memo[1]
+    _stats['static_misses'] += 1
+    try:
+        conn = _connect()
+        row = conn.execute("SELECT value FROM state WHERE key = 'static_version'").fetchone()
+        if not row or row[0] != version:
+            # Lecture du fichier hors transaction ; écriture si personne ne l'a faite entre-temps
+            mapping = reader(index_path)
+            with _Write() as conn:
+                row = conn.execute("SELECT value FROM state WHERE key = 'static_version'").fetchone()
+                if not row or row[0] != version:
+                    conn.execute('DELETE FROM static_game_types')
+                    conn.executemany('INSERT INTO static_game_types VALUES (?, ?)', mapping.items())
+                    conn.execute(
+                        "INSERT OR REPLACE INTO state (key, value) VALUES ('static_version', ?)", (version,)
+                    )
+        mapping = dict(conn.execute('SELECT pack_id, game_type FROM static_game_types'))
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error using shared pack index for static game types: {e}")
+        mapping = reader(index_path)
+    _static_memo[index_path] = (version, mapping)
+    return mapping
@@ -4,55 +4,104 @@ Parser for Zombicide Mapeditor pack files (cfg format)
 import json
 import os
 import re
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 from django.conf import settings
 
 from .editor_game_types import normalize_editor_game_type
+from ..metrics import record_fs_counter
 
+_CATEGORY_RE = re.compile(r'^\d+[\.\d]')
 
-def get_base_dir(pack_dir):
-    """Get the base directory for relative paths"""
+
+@lru_cache(maxsize=1024)
+def _pack_location(pack_dir, assets_dir, tiles_dir):
+    """
+    (dossier de base, préfixe posix du pack relatif à ce dossier) — résolu une
+    seule fois par chemin de pack et configuration.
+    """
     pack_path = Path(pack_dir).resolve()
-    assets_path = Path(settings.ASSETS_DIR).resolve()
-    tiles_path = Path(settings.BG_MAPEDITOR_TILES_DIR).resolve()
+    assets_path = Path(assets_dir).resolve()
+    tiles_path = Path(tiles_dir).resolve()
     
-    try:
-        # Python 3.9+ has is_relative_to
-        if hasattr(pack_path, 'is_relative_to'):
-            if pack_path.is_relative_to(assets_path):
-                return assets_path
-            if pack_path.is_relative_to(tiles_path):
-                return tiles_path
-        else:
-            # Fallback for older Python
-            try:
-                pack_path.relative_to(assets_path)
-                return assets_path
-            except ValueError:
-                try:
-                    pack_path.relative_to(tiles_path)
-                    return tiles_path
-                except ValueError:
-                    pass
-    except Exception:
-        pass
+    base_dir = tiles_path  # Default to tiles for backward compatibility
+    if pack_path.is_relative_to(assets_path):
+        base_dir = assets_path
+    elif pack_path.is_relative_to(tiles_path):
+        base_dir = tiles_path
     
-    # Default to tiles for backward compatibility
-    return tiles_path
+    try:
+        rel_pack = Path(pack_dir).relative_to(base_dir)
+    except ValueError:
+        # Chemin relatif ou via lien symbolique : on passe par le chemin résolu
+        try:
+            rel_pack = pack_path.relative_to(base_dir)
+        except ValueError:
+            rel_pack = Path(os.path.relpath(pack_path, base_dir))
+    prefix = rel_pack.as_posix()
+    return base_dir, ('' if prefix == '.' else prefix + '/')
+
+
+def get_base_dir(pack_dir):
+    """Get the base directory for relative paths"""
+    return _pack_location(os.fspath(pack_dir), os.fspath(settings.ASSETS_DIR),
+                          os.fspath(settings.BG_MAPEDITOR_TILES_DIR))[0]
+
+
+def _scan_dir(path):
+    """Entrées d'un dossier (un seul appel système de listage), [] si illisible."""
+    try:
+        with os.scandir(path) as it:
+            return list(it)
+    except OSError:
+        return []
+
+
+def _existing_names(entries):
+    """Noms présents (liens symboliques cassés exclus, comme Path.exists)."""
+    return {e.name for e in entries if not e.is_symlink() or os.path.exists(e.path)}
 
 
 class PackParser:
     """Parse Mapeditor pack structure and cfg files"""
     
+    ROTATION_ANGLES = (0, 90, 180, 270)
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+    
+    # Profondeurs de parse : chaque appelant ne paie que ce qu'il lit
+    DEPTH_META = 'meta'               # cfg racine (+ meta JSON) : id, nom, image, align, gameType
+    DEPTH_CATEGORIES = 'categories'   # + cfg de chaque catégorie, sans lister les assets
+    DEPTH_FULL = 'full'               # + assets (rotations, vignettes, max, pairs)
+    DEPTHS = (DEPTH_META, DEPTH_CATEGORIES, DEPTH_FULL)
+    
     def __init__(self, pack_dir):
         """pack_dir : chemin dossier racine du pack (contient au minimum cfg ou catégories)."""
         self.pack_dir = Path(pack_dir)
         self.pack_id = self.pack_dir.name
-        # Determine base directory for relative paths
-        self.base_dir = get_base_dir(pack_dir)
+        # Determine base directory for relative paths (mis en cache par chemin de pack)
+        self.base_dir, self._rel_prefix = _pack_location(
+            os.fspath(pack_dir), os.fspath(settings.ASSETS_DIR),
+            os.fspath(settings.BG_MAPEDITOR_TILES_DIR),
+        )
+        # Opérations disque du parse en cours (stat / listdir / open / octets), cf. api.metrics
+        self._fs = Counter()
+    
+    def _list(self, path):
+        self._fs['listdir'] += 1
+        return _scan_dir(path)
+    
+    def parse_pack(self, depth=DEPTH_FULL):
+        """
+        Parse a complete pack and return its structure
+        
+        depth : DEPTH_META (`categories` reste vide), DEPTH_CATEGORIES
+        (catégories sans clé `assets`) ou DEPTH_FULL (défaut).
         
-    def parse_pack(self):
-        """Parse a complete pack and return its structure"""
+        Chaque dossier est lu une seule fois (`os.scandir`) : présence des cfg,
+        rotations et vignettes sont déduites des listings, les chemins relatifs
+        sont construits par concaténation de chaînes.
+        """
         pack_info = {
             'id': self.pack_id,
             'name': self.pack_id,
@@ -61,10 +110,13 @@ class PackParser:
             'categories': {}
         }
         
+        pack_path = os.fspath(self.pack_dir)
+        entries = self._list(pack_path)
+        names = _existing_names(entries)
+        
         # Parse root cfg
-        root_cfg = self.pack_dir / 'cfg'
-        if root_cfg.exists():
-            root_data = self._parse_cfg_file(root_cfg)
+        if 'cfg' in names:
+            root_data = self._parse_cfg_file(os.path.join(pack_path, 'cfg'))
             pack_info['name'] = root_data.get('name', self.pack_id)
             pack_info['image'] = root_data.get('image', 'guillotine.png')
             pack_info['align'] = int(root_data.get('align', 25))
@@ -75,164 +127,135 @@ class PackParser:
                 if gt:
                     pack_info['gameType'] = gt
                     break
-
+        
         # Legacy : meta JSON seulement si le cfg ne définit pas encore le type
-        if 'gameType' not in pack_info:
-            meta_path = self.pack_dir / 'editor_pack_meta.json'
-            if meta_path.exists():
-                try:
-                    with open(meta_path, encoding='utf-8') as mf:
-                        meta = json.load(mf)
-                    gt = meta.get('gameType') if isinstance(meta, dict) else None
-                    gt = normalize_editor_game_type(gt)
-                    if gt:
-                        pack_info['gameType'] = gt
-                except Exception:
-                    pass
+        if 'gameType' not in pack_info and 'editor_pack_meta.json' in names:
+            try:
+                with open(os.path.join(pack_path, 'editor_pack_meta.json'), encoding='utf-8') as mf:
+                    meta = json.load(mf)
+                    self._fs['open'] += 1
+                    self._fs['bytes_read'] += mf.tell()
+                gt = meta.get('gameType') if isinstance(meta, dict) else None
+                gt = normalize_editor_game_type(gt)
+                if gt:
+                    pack_info['gameType'] = gt
+            except Exception:
+                pass
+        
+        if depth not in self.DEPTHS:
+            raise ValueError(f"Unknown parse depth: {depth}")
         
         # Find and parse category directories
-        for item in self.pack_dir.iterdir():
-            if item.is_dir() and not item.name.startswith('.'):
-                # Check if it's a category directory (starts with number followed by dot)
-                # This matches: 01.tiles, 02.doors, 04.1.objectives, 05.1.survivors, 01B.vaults, etc.
-                if re.match(r'^\d+[\.\d]', item.name):
-                    category_name = item.name
-                    category_data = self._parse_category(item, category_name)
-                    if category_data:
-                        pack_info['categories'][category_name] = category_data
+        for entry in entries if depth != self.DEPTH_META else ():
+            # Check if it's a category directory (starts with number followed by dot)
+            # This matches: 01.tiles, 02.doors, 04.1.objectives, 05.1.survivors, 01B.vaults, etc.
+            if not entry.name.startswith('.') and _CATEGORY_RE.match(entry.name) and entry.is_dir():
+                category_name = entry.name
+                category_data = self._parse_category(entry.path, category_name, depth == self.DEPTH_FULL)
+                if category_data:
+                    pack_info['categories'][category_name] = category_data
         
+        record_fs_counter('pack_parser', self._fs)
+        self._fs = Counter()
         return pack_info
     
-    def _parse_category(self, category_dir, category_name):
+    def _parse_category(self, category_dir, category_name, with_assets=True):
         """Parse a category directory (e.g., 01.tiles)"""
-        category_cfg = category_dir / 'cfg'
-        if not category_cfg.exists():
+        cfg_path = os.path.join(category_dir, 'cfg')
+        if with_assets:
+            entries = self._list(category_dir)
+            has_cfg = 'cfg' in _existing_names(entries)
+        else:
+            # Sans assets : un stat suffit, pas de listing
+            self._fs['stat'] += 1
+            has_cfg = os.path.exists(cfg_path)
+        if not has_cfg:
             return None
         
-        cfg_data = self._parse_cfg_file(category_cfg)
-        assets = self._scan_category_assets(category_dir, cfg_data)
-        
-        return {
+        cfg_data = self._parse_cfg_file(cfg_path)
+        category = {
             'name': cfg_data.get('name', category_name),
             'z_index': int(cfg_data.get('z-index', 0)),
             'align': int(cfg_data.get('align', 0)),
             'max': cfg_data.get('max', ''),
             'pairs': cfg_data.get('pairs', ''),
-            'assets': assets
         }
+        if with_assets:
+            category['assets'] = self._scan_category_assets(category_dir, category_name, entries, cfg_data)
+        return category
     
-    def _scan_category_assets(self, category_dir, cfg_data):
-        """Scan category directory for assets"""
+    def _scan_category_assets(self, category_dir, category_name, entries, cfg_data):
+        """Scan category directory for assets (listing déjà lu)"""
         assets = []
         max_dict = self._parse_max_string(cfg_data.get('max', ''))
         pairs_dict = self._parse_pairs_string(cfg_data.get('pairs', ''))
+        # Chemins relatifs (slashes avant) construits par préfixe
+        prefix = f'{self._rel_prefix}{category_name}/'
+        # Listings des sous-dossiers, lus au plus une fois chacun
+        subdirs = {e.name: e for e in entries if e.is_dir()}
+        listings = {}
         
-        # Scan for image files and directories
-        for item in category_dir.iterdir():
-            if item.is_file() and item.suffix.lower() in ['.png', '.jpg', '.jpeg']:
-                asset_name = item.name
-                # Normalize path to use forward slashes for URLs
-                rel_path = item.relative_to(self.base_dir)
-                asset_path = str(rel_path).replace('\\', '/')
-                
-                # Check for rotations
-                rotations = self._find_rotations(item)
-                thumbnail = self._find_thumbnail(item)
-                
+        def names_in(name):
+            if name not in listings:
+                entry = subdirs.get(name)
+                listings[name] = _existing_names(self._list(entry.path)) if entry is not None else set()
+            return listings[name]
+        
+        for entry in entries:
+            asset_name = entry.name
+            if entry.is_file():
+                if os.path.splitext(asset_name)[1].lower() not in self.IMAGE_EXTENSIONS:
+                    continue
+                # Rotations / vignette dans le dossier homonyme (sans extension)
+                stem = Path(asset_name).stem
+                sub_names = names_in(stem)
+                sub_prefix = f'{prefix}{stem}/'
                 assets.append({
                     'name': asset_name,
-                    'path': asset_path,
-                    'thumbnail': thumbnail,
-                    'rotations': rotations,
+                    'path': prefix + asset_name,
+                    'thumbnail': sub_prefix + 'r_thumb.png' if 'r_thumb.png' in sub_names else None,
+                    'rotations': self._rotations(sub_names, sub_prefix),
                     'max': max_dict.get(asset_name, None),
                     'pair': pairs_dict.get(asset_name, None)
                 })
-            elif item.is_dir() and not item.name.startswith('.'):
+            elif asset_name in subdirs and not asset_name.startswith('.'):
                 # Asset with rotations in subdirectory (e.g., 10V.png/ contains r_0.png, r_thumb.png, etc.)
-                asset_name = item.name
-                main_image = item / 'r_0.png'
-                if main_image.exists():
-                    # Normalize path to use forward slashes for URLs
-                    rel_path = main_image.relative_to(self.base_dir)
-                    asset_path = str(rel_path).replace('\\', '/')
-                    rotations = self._find_rotations_in_dir(item)
-                    thumbnail = self._find_thumbnail_in_dir(item)
-                    
-                    assets.append({
-                        'name': asset_name,
-                        'path': asset_path,
-                        'thumbnail': thumbnail,
-                        'rotations': rotations,
-                        'max': max_dict.get(asset_name, None),
-                        'pair': pairs_dict.get(asset_name, None)
-                    })
+                sub_names = names_in(asset_name)
+                if 'r_0.png' not in sub_names:
+                    continue
+                sub_prefix = f'{prefix}{asset_name}/'
+                assets.append({
+                    'name': asset_name,
+                    'path': sub_prefix + 'r_0.png',
+                    'thumbnail': sub_prefix + 'r_thumb.png' if 'r_thumb.png' in sub_names else None,
+                    'rotations': self._rotations(sub_names, sub_prefix),
+                    'max': max_dict.get(asset_name, None),
+                    'pair': pairs_dict.get(asset_name, None)
+                })
         
         return assets
     
-    def _find_rotations(self, image_path):
-        """Find rotation images for an asset"""
-        rotations = {}
-        base_path = image_path.parent / image_path.stem
-        
-        for angle in [0, 90, 180, 270]:
-            rot_file = base_path / f'r_{angle}.png'
-            if rot_file.exists():
-                # Normalize path to use forward slashes for URLs
-                rel_path = rot_file.relative_to(self.base_dir)
-                rotations[angle] = str(rel_path).replace('\\', '/')
-        
-        return rotations
-    
-    def _find_rotations_in_dir(self, asset_dir):
-        """Find rotation images in asset directory"""
+    def _rotations(self, names, prefix):
+        """{angle: chemin} des r_<angle>.png présents dans un listing"""
         rotations = {}
-        for angle in [0, 90, 180, 270]:
-            rot_file = asset_dir / f'r_{angle}.png'
-            if rot_file.exists():
-                # Normalize path to use forward slashes for URLs
-                rel_path = rot_file.relative_to(self.base_dir)
-                rotations[angle] = str(rel_path).replace('\\', '/')
+        for angle in self.ROTATION_ANGLES:
+            file_name = f'r_{angle}.png'
+            if file_name in names:
+                rotations[angle] = prefix + file_name
         return rotations
     
-    def _find_thumbnail(self, image_path):
-        """Find thumbnail for an asset"""
-        base_path = image_path.parent / image_path.stem
-        thumb_file = base_path / 'r_thumb.png'
-        if thumb_file.exists():
-            # Normalize path to use forward slashes for URLs
-            rel_path = thumb_file.relative_to(self.base_dir)
-            return str(rel_path).replace('\\', '/')
-        
-        # Check in subdirectory
-        asset_dir = image_path.parent / image_path.stem
-        if asset_dir.is_dir():
-            thumb_file = asset_dir / 'r_thumb.png'
-            if thumb_file.exists():
-                # Normalize path to use forward slashes for URLs
-                rel_path = thumb_file.relative_to(self.base_dir)
-                return str(rel_path).replace('\\', '/')
-        
-        return None
-    
-    def _find_thumbnail_in_dir(self, asset_dir):
-        """Find thumbnail in asset directory"""
-        thumb_file = asset_dir / 'r_thumb.png'
-        if thumb_file.exists():
-            # Normalize path to use forward slashes for URLs
-            rel_path = thumb_file.relative_to(self.base_dir)
-            return str(rel_path).replace('\\', '/')
-        return None
-    
     def _parse_cfg_file(self, cfg_path):
         """Parse a cfg file and return a dict"""
         data = {}
         try:
             with open(cfg_path, 'r', encoding='utf-8') as f:
+                self._fs['open'] += 1
                 for line in f:
                     line = line.strip()
                     if '=' in line and not line.startswith('#'):
                         key, value = line.split('=', 1)
                         data[key.strip()] = value.strip()
+                self._fs['bytes_read'] += f.tell()
         except Exception as e:
             print(f"Error parsing cfg file {cfg_path}: {e}")
         return data
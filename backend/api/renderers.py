@@ -0,0 +1,71 @@
+"""
+Renderers / parsers DRF spécifiques à l'éditeur.
+
+`FastJSONRenderer` et `FastJSONParser` remplacent ceux de DRF en passant par
+`editor.json_codec` (orjson si disponible, sinon stdlib).
+
+`CompactMapRenderer` et `CompactMapParser` exposent le conteneur carte compact
+(`editor.map_codec`) sous le type `application/x-zombicide-map`, sélectionné
+par l'en-tête `Accept` (lecture) ou `Content-Type` (écriture).
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from editor import json_codec
+from editor.map_codec import MEDIA_TYPE as COMPACT_MAP_MEDIA_TYPE, MapCodecError, decode_map, encode_map
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer DRF sérialisé via json_codec (repli sur DRF pour l'affichage indenté / types exotiques)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return json_codec.dumps(data)
+        except (TypeError, ValueError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser DRF désérialisé via json_codec."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return json_codec.loads(stream.read() if stream is not None else b'')
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class CompactMapRenderer(BaseRenderer):
+    """Rend une carte en conteneur compact ; les autres payloads (erreurs) restent en JSON."""
+
+    media_type = COMPACT_MAP_MEDIA_TYPE
+    format = 'zmap'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and isinstance(data.get('layers'), dict):
+            return encode_map(data)
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return json_codec.dumps(data)
+
+
+class CompactMapParser(BaseParser):
+    """Décode un corps de requête au format carte compact."""
+
+    media_type = COMPACT_MAP_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return decode_map(stream.read())
+        except (MapCodecError, ValueError) as e:
+            raise ParseError(f'Compact map parse error - {e}')
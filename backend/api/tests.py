@@ -0,0 +1,361 @@
+import base64
+import gzip
+import shutil
+import subprocess
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+
+class MetricsViewTests(SimpleTestCase):
+    def setUp(self):
+        self.media = Path(tempfile.mkdtemp(prefix='zmetrics'))
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media,
+            BASE_DIR=self.media,
+            PACK_INDEX_PATH=self.media / 'pack_index.sqlite3',
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_metrics_exposes_cache_stats(self):
+        from .parsers.editor_game_types import load_static_pack_game_types
+        load_static_pack_game_types()
+        load_static_pack_game_types()
+
+        response = self.client.get('/api/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('zproject_cache_hits_total{cache="static_pack_game_types"}', body)
+        self.assertIn('zproject_cache_misses_total{cache="pack_index_packs"}', body)
+        self.assertNotIn(' None', body)
+
+
+class PackIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.media = Path(tempfile.mkdtemp(prefix='zpackindex'))
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        overrides = override_settings(PACK_INDEX_PATH=self.media / 'pack_index.sqlite3')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.pack_dir = self.media / 'P1'
+        (self.pack_dir / '01.tiles' / '1V.png').mkdir(parents=True)
+        (self.pack_dir / '01.tiles' / '1V.png' / 'r_0.png').write_bytes(b'png')
+
+    def _stored(self):
+        from .parsers import pack_index
+        return pack_index._connect().execute("SELECT data FROM packs WHERE pack_id = 'P1'").fetchone()
+
+    def test_parse_result_is_stored(self):
+        from .parsers import pack_index
+        first = pack_index.get_pack(self.pack_dir)
+        self.assertIsNotNone(self._stored()[0])
+        with mock.patch.object(pack_index.PackParser, 'parse_pack') as parse:
+            self.assertEqual(pack_index.get_pack(self.pack_dir), first)
+        parse.assert_not_called()
+
+    def test_invalidation_during_parse_is_kept(self):
+        from .parsers import pack_index
+        parse_pack = pack_index.PackParser.parse_pack
+
+        def parse_then_invalidate(parser):
+            result = parse_pack(parser)
+            pack_index.invalidate('P1')
+            return result
+
+        with mock.patch.object(pack_index.PackParser, 'parse_pack', parse_then_invalidate):
+            pack_index.get_pack(self.pack_dir)
+        self.assertIsNone(self._stored()[0])
+
+
+class MapCodecTests(SimpleTestCase):
+    def _map(self):
+        return {
+            'name': 'Carte',
+            'pack': None,
+            'grid': {'width': 10, 'height': 10, 'tileSize': 32},
+            'layers': {
+                'tiles': [
+                    {'id': f'tile_17766069{30129 + i * 731}_{i:09d}', 'x': 32 * (i % 5), 'y': 32 * (i // 5),
+                     'asset': f'G-Zombicide-BP/01.tiles/{i % 3}V.png/r_0.png', 'rotation': 90 * (i % 4)}
+                    for i in range(12)
+                ] + [
+                    {'id': 'custom', 'x': -5, 'y': 2 ** 40, 'asset': 'a.png', 'rotation': 0},
+                    {'id': 'tile_1_0z', 'x': 1.5, 'y': 0, 'asset': 'a.png', 'rotation': 0},
+                ],
+                'objects': [],
+                'notes': 'libre',
+            },
+            'mission': {'mapImageDataUrl': 'data:image/png;base64,' + base64.b64encode(b'\x89PNG' * 50).decode()},
+            'metadata': {'created': '2026-04-19T16:18:46.865566', 'author': 'temp'},
+        }
+
+    def test_round_trip(self):
+        from editor.map_codec import decode_map, encode_map
+        map_data = self._map()
+        decoded = decode_map(encode_map(map_data))
+        self.assertEqual(decoded, map_data)
+        self.assertEqual(list(decoded), list(map_data))
+
+    def test_round_trip_small_and_layerless_maps(self):
+        from editor.map_codec import decode_map, encode_map
+        for map_data in (
+            {'name': 'vide'},
+            {'name': 'null', 'layers': None},
+            {'name': 'un', 'layers': {'tiles': [{'id': 'tile_1776606930129_8h7rcyw5y', 'x': 1, 'y': 2}]}},
+        ):
+            self.assertEqual(decode_map(encode_map(map_data)), map_data)
+
+    def test_header_without_layers(self):
+        from editor.map_codec import decode_map_header, encode_map
+        header = decode_map_header(encode_map(self._map()))
+        self.assertNotIn('layers', header)
+        self.assertEqual(header['name'], 'Carte')
+        self.assertIsNone(header['mission']['mapImageDataUrl'])
+
+    def test_smaller_than_zlib_json(self):
+        from editor import json_codec
+        from editor.map_codec import encode_map
+        map_data = self._map()
+        del map_data['mission']
+        self.assertLess(len(encode_map(map_data)), len(zlib.compress(json_codec.dumps(map_data), 6)))
+
+    def test_truncated_container(self):
+        from editor.map_codec import MapCodecError, decode_map, encode_map
+        data = encode_map(self._map())
+        with self.assertRaises(MapCodecError):
+            decode_map(data[:len(data) // 2])
+
+
+class MapHistoryDeltaTests(SimpleTestCase):
+    def _map(self, n=12):
+        return {
+            'name': 'Carte',
+            'layers': {
+                'tiles': [{'id': f'tile_{i}', 'x': i, 'y': 0, 'asset': f'P/01.tiles/{i}V.png'} for i in range(n)],
+                'objects': [],
+            },
+            'metadata': {'author': 'temp', 'modified': '2026-01-01T00:00:00'},
+        }
+
+    def test_identical_maps_give_empty_delta(self):
+        from editor.map_history import compute_delta
+        self.assertEqual(compute_delta(self._map(), self._map()), {})
+
+    def test_round_trip(self):
+        from editor.map_history import apply_delta, compute_delta
+        old = self._map()
+        new = self._map()
+        new['name'] = 'Renommée'
+        del new['metadata']['modified']
+        new['mission'] = {'title': 'Nouvelle'}
+        tiles = new['layers']['tiles']
+        tiles[3] = dict(tiles[3], x=99)
+        del tiles[7]
+        tiles.insert(0, {'id': 'tile_new', 'x': -1, 'y': -1, 'asset': 'P/01.tiles/0R.png'})
+        tiles.append({'id': 'tile_end', 'x': 50, 'y': 50, 'asset': 'P/01.tiles/1R.png'})
+
+        delta = compute_delta(old, new)
+        self.assertEqual(apply_delta(old, delta), new)
+        self.assertEqual(old, self._map())
+        # Liste longue : copies de blocs de l'ancienne liste, pas la couche entière
+        ops = delta['p']['layers']['p']['tiles']['l']
+        self.assertTrue(any(op[0] == 'c' for op in ops))
+        self.assertLess(sum(len(op[1]) for op in ops if op[0] == 'i'), 4)
+
+    def test_short_lists_and_type_changes_are_replaced(self):
+        from editor.map_history import apply_delta, compute_delta
+        old = {'a': [1, 2], 'b': {'x': 1}, 'c': 'text'}
+        new = {'a': [2, 1], 'b': [1], 'c': {'y': 2}}
+        delta = compute_delta(old, new)
+        self.assertEqual(delta, {'s': new})
+        self.assertEqual(apply_delta(old, delta), new)
+
+
+class MapHistoryLockTests(SimpleTestCase):
+    def setUp(self):
+        self.media = Path(tempfile.mkdtemp(prefix='zhistory'))
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        overrides = override_settings(USERS_DIR=self.media / 'users')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_lock_excludes_other_processes(self):
+        from editor import map_history
+        if map_history.fcntl is None:
+            self.skipTest('flock unavailable')
+        lock_path = map_history.get_history_dir('temp', 'm1') / '.lock'
+        with map_history._lock('temp', 'm1'):
+            self.assertTrue(lock_path.exists())
+            probe = subprocess.run(
+                [sys.executable, '-c',
+                 'import fcntl, sys\n'
+                 'f = open(sys.argv[1], "a")\n'
+                 'try:\n'
+                 '    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)\n'
+                 'except BlockingIOError:\n'
+                 '    sys.exit(3)\n',
+                 str(lock_path)],
+            )
+            self.assertEqual(probe.returncode, 3)
+
+    def test_record_after_delete(self):
+        from editor import map_history
+        map_history.record_revision('temp', 'm1', {'name': 'a'})
+        map_history.delete_history('temp', 'm1')
+        self.assertFalse(map_history.get_history_dir('temp', 'm1').exists())
+        entry = map_history.record_revision('temp', 'm1', {'name': 'b'})
+        self.assertEqual((entry['rev'], entry['kind']), (1, 'snapshot'))
+        self.assertEqual(map_history.get_revision('temp', 'm1', 1), {'name': 'b'})
+
+
+class AssetCatalogTests(SimpleTestCase):
+    def _pack(self, pack_id):
+        tile = f'{pack_id}/01.tiles/1V.png'
+        return {
+            'id': pack_id,
+            'gameType': 'base',
+            'categories': {'01.tiles': {'name': 'Tiles', 'assets': [{
+                'name': '1V.png', 'path': f'{tile}/r_0.png', 'thumbnail': f'{tile}/r_thumb.png',
+                'rotations': {'90': f'{tile}/r_90.png'}, 'max': 1,
+            }]}},
+        }
+
+    def test_lookup_from_search_index(self):
+        from .map_validation import AssetCatalog
+        from .parsers.asset_search import AssetSearchIndex
+        index = AssetSearchIndex()
+        catalog = AssetCatalog(index)
+        index._replace_pack(self._pack('P1'))
+        index._replace_pack(self._pack('P2'))
+
+        expected = ('P1', '01.tiles', '1V.png', 1)
+        for path in ('P1/01.tiles/1V.png/r_0.png', 'P1/01.tiles/1V.png/r_thumb.png', 'P1/01.tiles/1V.png/r_90.png'):
+            self.assertEqual(catalog.lookup(path), expected)
+
+        index._remove_pack('P1')
+        index._compact()
+        self.assertIsNone(catalog.lookup('P1/01.tiles/1V.png/r_90.png'))
+        self.assertEqual(catalog.lookup('P2/01.tiles/1V.png/r_90.png')[0], 'P2')
+
+
+class ChunkedUploadLockTests(SimpleTestCase):
+    def setUp(self):
+        self.media = Path(tempfile.mkdtemp(prefix='zupload'))
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        overrides = override_settings(CHUNKED_UPLOAD_DIR=self.media / 'uploads')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_lock_excludes_other_processes(self):
+        import io
+        from editor import chunked_upload
+        if chunked_upload.fcntl is None:
+            self.skipTest('flock unavailable')
+        manager = chunked_upload.ChunkedUploadManager
+        upload_id = manager.create('pack.zip', 4)['id']
+        session_dir = manager.get_upload_root() / upload_id
+        with chunked_upload._lock(upload_id, session_dir):
+            probe = subprocess.run(
+                [sys.executable, '-c',
+                 'import fcntl, os, sys\n'
+                 'fd = os.open(sys.argv[1], os.O_RDONLY)\n'
+                 'try:\n'
+                 '    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)\n'
+                 'except BlockingIOError:\n'
+                 '    sys.exit(3)\n',
+                 str(session_dir)],
+            )
+            self.assertEqual(probe.returncode, 3)
+        self.assertEqual(manager.put_chunk(upload_id, 0, io.BytesIO(b'abcd'), 4)['offset'], 4)
+        manager.abort(upload_id)
+        with self.assertRaises(FileNotFoundError):
+            manager.put_chunk(upload_id, 4, io.BytesIO(b'x'), 1)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def _middleware(self, responses):
+        from .cache import get_cache
+        from .middleware import CompressionMiddleware
+        get_cache('compressed_responses').clear()
+        return CompressionMiddleware(lambda request: responses.pop(0))
+
+    def _get(self, middleware, path='/api/maps/m1/'):
+        request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING='gzip')
+        return middleware(request)
+
+    def test_cache_key_includes_content_type(self):
+        json_body = b'{"layers": [' + b'1, ' * 2000 + b'1]}'
+        text_body = b'layers ' * 2000
+        json_response = HttpResponse(json_body, content_type='application/json')
+        text_response = HttpResponse(text_body, content_type='text/plain')
+        for response in (json_response, text_response):
+            response['ETag'] = '"v1"'
+        middleware = self._middleware([json_response, text_response])
+
+        first = self._get(middleware)
+        second = self._get(middleware)
+
+        self.assertEqual(gzip.decompress(first.content), json_body)
+        self.assertEqual(gzip.decompress(second.content), text_body)
+
+    def test_event_stream_is_not_compressed(self):
+        body = b'retry: 3000\n' + b'data: {}\n\n' * 500
+        middleware = self._middleware([HttpResponse(body, content_type='text/event-stream')])
+
+        response = self._get(middleware, '/api/events/')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, body)
+
+
+class EventBusTests(SimpleTestCase):
+    def test_ids_carry_process_epoch(self):
+        from .events import EventBus, parse_event_id
+        bus = EventBus()
+        event = bus.publish('map', mapId='m1')
+        self.assertEqual(parse_event_id(event['id']), (bus.epoch, 1))
+        self.assertNotEqual(EventBus().epoch, bus.epoch)
+
+    def test_replay_same_epoch(self):
+        from .events import EventBus
+        bus = EventBus()
+        first = bus.publish('map', mapId='m1')
+        bus.publish('pack', packId='p1')
+        third = bus.publish('map', mapId='m2')
+
+        missed, last_id = bus.replay(['map'], first['id'])
+
+        self.assertEqual([e['id'] for e in missed], [third['id']])
+        self.assertEqual(last_id, third['id'])
+
+    def test_unknown_epoch_requests_resync(self):
+        from .events import EventBus
+        old = EventBus()
+        old_event = old.publish('map', mapId='m1')
+        bus = EventBus()
+        bus.publish('map', mapId='m1')
+        latest = bus.publish('map', mapId='m2')
+
+        for last_event_id in (old_event['id'], '12', f'{bus.epoch}-99'):
+            missed, _ = bus.replay(['map'], last_event_id)
+            self.assertEqual([(e['type'], e['id']) for e in missed], [('resync', latest['id'])])
+
+    def test_evicted_id_requests_resync(self):
+        from .events import EventBus
+        bus = EventBus(history_size=2)
+        first = bus.publish('map', mapId='m1')
+        second = bus.publish('map', mapId='m2')
+        bus.publish('map', mapId='m3')
+        bus.publish('map', mapId='m4')
+
+        self.assertEqual([e['type'] for e in bus.replay(None, first['id'])[0]], ['resync'])
+        self.assertEqual(len(bus.replay(None, second['id'])[0]), 2)
@@ -1,21 +1,43 @@
 from django.urls import path
 from . import views
 
-# Les routes littérales packs/custom/, packs/upload-zip/, packs/uploaded/ DOIVENT être
+# Les routes littérales packs/custom/, packs/upload-zip/, packs/uploads/, packs/uploaded/ DOIVENT être
 # déclarées avant packs/<pack_id>/ sinon "upload-zip", "uploaded", "custom" sont pris pour des IDs.
+# De même assets/search/ doit précéder assets/<path:asset_path>.
 
 urlpatterns = [
     path('packs/', views.PackListView.as_view(), name='pack-list'),
     path('packs/custom/upload/', views.CustomPackUploadView.as_view(), name='custom-pack-upload'),
     path('packs/custom/', views.CustomPackListView.as_view(), name='custom-pack-list'),
     path('packs/upload-zip/', views.PackZipUploadView.as_view(), name='pack-zip-upload'),
+    path('packs/uploads/', views.PackUploadSessionListView.as_view(), name='pack-upload-sessions'),
+    path('packs/uploads/<str:upload_id>/', views.PackUploadSessionView.as_view(), name='pack-upload-session'),
+    path('packs/uploads/<str:upload_id>/finalize/', views.PackUploadFinalizeView.as_view(), name='pack-upload-finalize'),
     path('packs/uploaded/', views.UploadedPackListView.as_view(), name='uploaded-pack-list'),
     path('packs/uploaded/<str:pack_id>/', views.UploadedPackDeleteView.as_view(), name='uploaded-pack-delete'),
+    path('packs/<str:pack_id>/download', views.PackDownloadView.as_view(), name='pack-download'),
+    path('packs/<str:pack_id>/manifest/', views.PackManifestView.as_view(), name='pack-manifest'),
+    path('packs/<str:pack_id>/sync/', views.PackSyncView.as_view(), name='pack-sync'),
+    path('packs/<str:pack_id>/usage/', views.PackUsageView.as_view(), name='pack-usage'),
     path('packs/<str:pack_id>/assets/', views.PackAssetsView.as_view(), name='pack-assets'),
     path('packs/<str:pack_id>/', views.PackDetailView.as_view(), name='pack-detail'),
+    path('assets/search/', views.AssetSearchView.as_view(), name='asset-search'),
     path('assets/<path:asset_path>', views.AssetView.as_view(), name='asset'),
     path('users/', views.UserListView.as_view(), name='user-list'),
     path('users/<str:username>/maps/', views.UserMapsView.as_view(), name='user-maps'),
     path('users/<str:username>/maps/<str:map_id>/', views.MapDetailView.as_view(), name='map-detail'),
+    path('users/<str:username>/maps/<str:map_id>/validate/', views.MapValidationView.as_view(), name='map-validate'),
+    path('users/<str:username>/maps/<str:map_id>/history/', views.MapHistoryView.as_view(), name='map-history'),
+    path('users/<str:username>/maps/<str:map_id>/history/diff/', views.MapRevisionDiffView.as_view(), name='map-history-diff'),
+    path('users/<str:username>/maps/<str:map_id>/history/<int:rev>/', views.MapRevisionView.as_view(), name='map-revision'),
+    path('users/<str:username>/maps/<str:map_id>/tiles/', views.MapTilesView.as_view(), name='map-tiles'),
+    path('users/<str:username>/maps/<str:map_id>/tiles/<int:level>/<int:x>/<int:y>.png', views.MapTileView.as_view(), name='map-tile'),
     path('maps/public/', views.PublicMapsView.as_view(), name='public-maps'),
+    path('maps/export/', views.MapExportView.as_view(), name='map-export'),
+    path('maps/import/', views.MapImportView.as_view(), name='map-import'),
+    path('maps/usage/', views.MapUsageView.as_view(), name='map-usage'),
+    path('maps/validate/', views.MapDraftValidationView.as_view(), name='map-draft-validate'),
+    path('metrics', views.MetricsView.as_view(), name='metrics'),
+    path('events/', views.EventStreamView.as_view(), name='events'),
+    path('blobs/<str:digest>', views.BlobView.as_view(), name='blob'),
 ]
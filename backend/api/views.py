@@ -1,86 +1,92 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import FileResponse, Http404
+from rest_framework.settings import api_settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header, parse_etags
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.views import View
 import os
-import json
-from functools import lru_cache
+import zipfile
 from .parsers.asset_indexer import AssetIndexer
+from .parsers.editor_game_types import resolve_pack_game_type
+from .renderers import CompactMapParser, CompactMapRenderer
 from .serializers import PackSerializer
 
 
-@lru_cache(maxsize=1)
-def _load_pack_game_types_from_static_index():
+def _set_etag(response, version):
+    """Pose un ETag fort dérivé de la version du contenu (clé des caches de compression)."""
+    if version:
+        response['ETag'] = f'"{version}"'
+    return response
+
+
+def _etag_matches(request, etag):
     """
-    Source de vérité partagée avec le build statique: `packs-index.json`.
-    Retourne un dict { packId: gameType }.
+    Comparaison faible avec If-None-Match (`W/` ignoré des deux côtés) : la
+    compression réécrit l'ETag en `W/"…"` et le navigateur renvoie cette forme.
     """
-    try:
-        index_path = settings.BASE_DIR / 'packs-index.json'
-        if not index_path.exists():
-            return {}
-        with open(index_path, 'r', encoding='utf-8') as f:
-            data = json.load(f) or {}
-        packs = data.get('packs') or []
-        if not isinstance(packs, list):
-            return {}
-        m = {}
-        for p in packs:
-            if not isinstance(p, dict):
-                continue
-            pid = p.get('id')
-            gt = p.get('gameType')
-            if isinstance(pid, str) and isinstance(gt, str) and pid and gt:
-                m[pid] = gt
-        return m
-    except Exception:
-        return {}
-
-
-def _get_pack_game_type(pack):
+    if not etag:
+        return False
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if '*' in etags:
+        return True
+    etag = etag.removeprefix('W/')
+    return any(candidate.removeprefix('W/') == etag for candidate in etags)
+
+
+def _cached_json_response(request, cached):
+    """Réponse HTTP depuis un corps JSON pré-rendu (ETag, Content-Length, 304 si inchangé)."""
+    if _etag_matches(request, cached.etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(cached.body, content_type='application/json')
+        response['Content-Length'] = str(len(cached.body))
+    response['ETag'] = cached.etag
+    return response
+
+
+def _validate_before_save(request, map_data):
     """
-    Résout le type de jeu d'un pack.
-    Priorité: info du pack (si un jour l'indexeur le fournit) puis mapping du static index.
+    Validation optionnelle des assets à l'enregistrement (`?validate=1` ou
+    `?validate=strict`). Retourne (rapport ou None, réponse d'erreur ou None) :
+    en mode strict, une carte invalide est refusée (422) sans être écrite.
     """
-    try:
-        gt = pack.get('gameType')
-        if isinstance(gt, str) and gt:
-            return gt
-    except Exception:
-        pass
-    return _load_pack_game_types_from_static_index().get(pack.get('id'))
+    mode = request.query_params.get('validate')
+    if not mode or mode in ('0', 'false'):
+        return None, None
+    from .map_validation import validate_map
+    report = validate_map(map_data)
+    if mode == 'strict' and not report['valid']:
+        return report, Response(
+            {"error": "Map references missing assets or exceeds max counts", "validation": report},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return report, None
+
+
+def _set_validation_header(response, report):
+    """Résumé de validation en en-tête (le corps reste la carte enregistrée)."""
+    if report is not None:
+        response['X-Map-Validation'] = (
+            'valid' if report['valid']
+            else f"invalid; missing={len(report['missing'])}; over-max={len(report['overMax'])}"
+        )
+    return response
 
 
 class PackListView(APIView):
-    """Liste les packs disponibles (ré-indexation à chaque requête)."""
+    """Liste les packs disponibles (réponse pré-rendue, recalculée quand un pack change)."""
 
     def get(self, request):
         """List all available packs"""
         try:
-            # Always re-index to catch changes (file watcher will trigger this)
-            packs = AssetIndexer.index_all_packs()
-            # Serialize packs
-            pack_data = []
-            for pack in packs:
-                # Check if pack directory still exists
-                from pathlib import Path
-                from django.conf import settings
-                pack_dir_assets = Path(settings.ASSETS_DIR) / pack['id']
-                pack_dir_tiles = Path(settings.BG_MAPEDITOR_TILES_DIR) / pack['id']
-                if not pack_dir_assets.exists() and not pack_dir_tiles.exists():
-                    continue  # Skip deleted packs
-                
-                pack_data.append({
-                    'id': pack['id'],
-                    'name': pack['name'],
-                    'image': pack.get('image'),
-                    'align': pack.get('align', 25),
-                    'gameType': _get_pack_game_type(pack)
-                })
-            return Response(pack_data, status=status.HTTP_200_OK)
+            from .pack_cache import get_pack_list_response
+            return _cached_json_response(request, get_pack_list_response())
         except Exception as e:
             return Response(
                 {"error": str(e)},
@@ -94,8 +100,8 @@ class PackDetailView(APIView):
     def get(self, request, pack_id):
         """Get details of a specific pack"""
         try:
-            packs = AssetIndexer.index_all_packs()
-            pack = next((p for p in packs if p['id'] == pack_id), None)
+            from .parsers.pack_parser import PackParser
+            pack = AssetIndexer.get_pack(pack_id, PackParser.DEPTH_CATEGORIES)
             
             if not pack:
                 return Response(
@@ -108,7 +114,7 @@ class PackDetailView(APIView):
                 'name': pack['name'],
                 'image': pack.get('image'),
                 'align': pack.get('align', 25),
-                'gameType': _get_pack_game_type(pack),
+                'gameType': resolve_pack_game_type(pack),
                 'categories': list(pack['categories'].keys())
             }, status=status.HTTP_200_OK)
         except Exception as e:
@@ -124,30 +130,189 @@ class PackAssetsView(APIView):
     def get(self, request, pack_id):
         """Get assets for a specific pack, organized by category"""
         try:
-            assets_by_category = AssetIndexer.get_pack_assets(pack_id)
-            if not assets_by_category:
+            from .pack_cache import get_pack_assets_response
+            cached = get_pack_assets_response(pack_id)
+            if cached is None:
+                return Response(
+                    {"error": "Pack not found"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return _cached_json_response(request, cached)
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PackManifestView(APIView):
+    """Manifeste de synchronisation d'un pack : sha256 et taille de chaque fichier."""
+
+    def get(self, request, pack_id):
+        """Get the sync manifest of a pack (ETag / 304 par version d'arborescence)"""
+        try:
+            from .pack_cache import get_pack_manifest_response
+            cached = get_pack_manifest_response(pack_id)
+            if cached is None:
+                return Response(
+                    {"error": "Pack not found"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return _cached_json_response(request, cached)
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PackDownloadView(APIView):
+    """Téléchargement d'un pack en ZIP Mapeditor, généré en flux (aucun fichier temporaire)."""
+
+    def get(self, request, pack_id):
+        """Stream a ZIP of the pack (`<pack_id>/…`, PNG / JPG stockés sans compression)"""
+        try:
+            from editor.pack_sync import iter_pack_files
+            from editor.streaming_zip import iter_zip
+            from .parsers.pack_fingerprint import pack_tree_fingerprint
+            pack_dir = None if pack_id.startswith('.') else AssetIndexer.find_pack_dir(pack_id)
+            if pack_dir is None or not pack_dir.is_dir():
                 return Response(
                     {"error": "Pack not found"},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            etag = f'"{pack_tree_fingerprint(pack_dir)}"'
+            if _etag_matches(request, etag):
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+
+            entries = (
+                (f'{pack_dir.name}/{rel_path}', abs_path)
+                for rel_path, abs_path, _ in iter_pack_files(pack_dir)
+            )
+            response = StreamingHttpResponse(
+                (chunk for chunk in iter_zip(entries) if chunk),
+                content_type='application/zip'
+            )
+            response['Content-Disposition'] = content_disposition_header(True, f'{pack_dir.name}.zip')
+            response['ETag'] = etag
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PackSyncView(APIView):
+    """Mise à jour différentielle d'un pack (fichiers modifiés + suppressions, appliqués atomiquement)."""
+
+    def post(self, request, pack_id):
+        """
+        Apply a delta to a pack.
+        
+        multipart : `delta_zip` (ZIP des fichiers ajoutés / modifiés, chemins du
+        manifeste), `deleted` (liste JSON de chemins), `base_version` (version
+        du manifeste utilisé, 409 si le pack a changé depuis).
+        """
+        try:
+            from editor import json_codec
+            from editor.pack_sync import PackSyncConflict, apply_pack_delta
             
-            # Format assets for frontend
-            formatted_assets = {}
-            for category_name, assets in assets_by_category.items():
-                formatted_assets[category_name] = [
-                    {
-                        'name': asset['name'],
-                        'path': asset['path'],
-                        'thumbnail': asset.get('thumbnail'),
-                        'rotations': asset.get('rotations', {}),
-                        'max': asset.get('max'),
-                        'pair': asset.get('pair'),
-                        'category': category_name
-                    }
-                    for asset in assets
-                ]
+            delta_zip = request.FILES.get('delta_zip')
+            deleted = request.data.get('deleted') or []
+            if isinstance(deleted, str):
+                try:
+                    deleted = json_codec.loads(deleted)
+                except ValueError:
+                    deleted = None
+            if not isinstance(deleted, list) or not all(isinstance(p, str) for p in deleted):
+                return Response(
+                    {"error": "deleted must be a JSON list of paths"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if delta_zip is None and not deleted:
+                return Response(
+                    {"error": "delta_zip or deleted is required"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
-            return Response(formatted_assets, status=status.HTTP_200_OK)
+            result = apply_pack_delta(
+                pack_id, delta_zip, deleted, base_version=request.data.get('base_version') or None
+            )
+            return Response(result, status=status.HTTP_200_OK)
+        except FileNotFoundError:
+            return Response(
+                {"error": "Pack not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except PackSyncConflict as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
+        except (ValueError, zipfile.BadZipFile) as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PackUsageView(APIView):
+    """Cartes qui utilisent un pack (index inverse) : impact d'une suppression / d'un remplacement."""
+
+    def get(self, request, pack_id):
+        """List maps using a pack, with per-asset usage counts"""
+        try:
+            from editor import map_usage_index
+            maps = map_usage_index.maps_using_pack(pack_id)
+            return Response({
+                'packId': pack_id,
+                'maps': maps,
+                'assets': map_usage_index.asset_usage_stats(pack_id),
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AssetSearchView(APIView):
+    """Recherche floue d'assets dans tous les packs (index trigrammes)."""
+
+    def get(self, request):
+        """Search assets by name / category / pack (?q=&gameType=&category=&limit=)"""
+        try:
+            from .parsers.asset_search import get_search_index
+            query = request.query_params.get('q', '')
+            if not query.strip():
+                return Response(
+                    {"error": "q is required"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                limit = int(request.query_params.get('limit', 50))
+            except ValueError:
+                limit = 50
+            limit = max(1, min(limit, 200))
+            results = get_search_index().search(
+                query,
+                game_type=request.query_params.get('gameType'),
+                category=request.query_params.get('category'),
+                limit=limit,
+            )
+            return Response(
+                {"query": query, "count": len(results), "results": results},
+                status=status.HTTP_200_OK
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)},
@@ -161,6 +326,8 @@ class AssetView(APIView):
     def get(self, request, asset_path):
         """Stream binaire d'une image pack / tuile."""
         # Handle paths that already include directory name
+        from . import metrics
+        stat_calls = 1
         if asset_path.startswith('assets/'):
             asset_path = asset_path[7:]  # Remove 'assets/' prefix
             full_path = os.path.join(settings.ASSETS_DIR, asset_path)
@@ -170,15 +337,58 @@ class AssetView(APIView):
         else:
             # Try both directories - assets first, then bgmapeditor_tiles
             full_path = os.path.join(settings.ASSETS_DIR, asset_path)
-            if not os.path.exists(full_path) or not os.path.isfile(full_path):
+            if not os.path.isfile(full_path):
                 # Try legacy bgmapeditor_tiles directory
                 full_path = os.path.join(settings.BG_MAPEDITOR_TILES_DIR, asset_path)
+                stat_calls += 1
         
-        if os.path.exists(full_path) and os.path.isfile(full_path):
-            return FileResponse(open(full_path, 'rb'), content_type='image/png')
+        if os.path.isfile(full_path):
+            from editor.blob_store import digest_for_path
+            digest = digest_for_path(full_path)
+            if digest and _etag_matches(request, f'"{digest}"'):
+                response = HttpResponseNotModified()
+                response['ETag'] = f'"{digest}"'
+                metrics.record_fs('asset_view', 'stat', stat_calls + 1)
+                return response
+            response = FileResponse(open(full_path, 'rb'), content_type='image/png')
+            if digest:
+                # Fichier lié au stockage partagé : même contenu = même URL canonique
+                response['ETag'] = f'"{digest}"'
+                response['Link'] = f'</api/blobs/{digest}>; rel="canonical"'
+                stat_calls += 1
+            metrics.record_fs('asset_view', 'stat', stat_calls)
+            metrics.record_fs('asset_view', 'open', bytes_read=int(response.get('Content-Length') or 0))
+            return response
+        metrics.record_fs('asset_view', 'stat', stat_calls)
         raise Http404(f"Asset not found: {asset_path}")
 
 
+class BlobView(APIView):
+    """Sert une image du stockage adressé par contenu (URL immuable, cache navigateur permanent)."""
+
+    def get(self, request, digest):
+        """Stream binaire du blob `digest` (sha256)."""
+        from editor.blob_store import blob_path, is_valid_digest
+        if not is_valid_digest(digest):
+            raise Http404("Invalid blob digest")
+        path = blob_path(digest)
+        etag = f'"{digest}"'
+        if _etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                f = open(path, 'rb')
+            except OSError:
+                raise Http404(f"Blob not found: {digest}")
+            magic = f.read(4)
+            f.seek(0)
+            content_type = 'image/jpeg' if magic.startswith(b'\xff\xd8') else 'image/png'
+            response = FileResponse(f, content_type=content_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+
 class UserListView(APIView):
     """Utilisateurs « temporaires » (dossiers sous USERS_DIR)."""
 
@@ -219,6 +429,8 @@ class UserListView(APIView):
 class UserMapsView(APIView):
     """CRUD de liste : cartes JSON d'un utilisateur donné."""
 
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + [CompactMapParser]
+
     def get(self, request, username):
         """List all maps for a user"""
         try:
@@ -243,8 +455,11 @@ class UserMapsView(APIView):
             
             manager = MapManager(username)
             map_data = request.data
+            report, error_response = _validate_before_save(request, map_data)
+            if error_response is not None:
+                return error_response
             created_map = manager.create_map(map_data)
-            return Response(created_map, status=status.HTTP_201_CREATED)
+            return _set_validation_header(Response(created_map, status=status.HTTP_201_CREATED), report)
         except Exception as e:
             return Response(
                 {"error": str(e)},
@@ -255,13 +470,26 @@ class UserMapsView(APIView):
 class MapDetailView(APIView):
     """Lecture, mise à jour et suppression d'une carte JSON par id."""
 
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [CompactMapRenderer]
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + [CompactMapParser]
+
     def get(self, request, username, map_id):
-        """Get a specific map"""
+        """Get a specific map (JSON, ou conteneur compact si Accept: application/x-zombicide-map)"""
         try:
             from editor.map_manager import MapManager
             manager = MapManager(username)
-            map_data = manager.get_map(map_id)
-            return Response(map_data, status=status.HTTP_200_OK)
+            version = manager.get_map_version(map_id)
+            if isinstance(request.accepted_renderer, CompactMapRenderer):
+                response = HttpResponse(
+                    manager.get_map_compact(map_id),
+                    content_type=CompactMapRenderer.media_type
+                )
+                version = version and f"{version}-zmap"
+            else:
+                response = Response(manager.get_map(map_id), status=status.HTTP_200_OK)
+            _set_etag(response, version)
+            patch_vary_headers(response, ('Accept',))
+            return response
         except FileNotFoundError:
             return Response(
                 {"error": "Map not found"},
@@ -279,8 +507,11 @@ class MapDetailView(APIView):
             from editor.map_manager import MapManager
             manager = MapManager(username)
             map_data = request.data
+            report, error_response = _validate_before_save(request, map_data)
+            if error_response is not None:
+                return error_response
             updated_map = manager.update_map(map_id, map_data)
-            return Response(updated_map, status=status.HTTP_200_OK)
+            return _set_validation_header(Response(updated_map, status=status.HTTP_200_OK), report)
         except FileNotFoundError:
             return Response(
                 {"error": "Map not found"},
@@ -306,6 +537,294 @@ class MapDetailView(APIView):
             )
 
 
+class MapValidationView(APIView):
+    """Vérifie les références d'assets d'une carte enregistrée (chemins existants, limites max)."""
+
+    def get(self, request, username, map_id):
+        """Validate a stored map"""
+        try:
+            from editor.map_manager import MapManager
+            from .map_validation import validate_map
+            map_data = MapManager(username).get_map(map_id)
+            return Response(validate_map(map_data), status=status.HTTP_200_OK)
+        except FileNotFoundError:
+            return Response(
+                {"error": "Map not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MapHistoryView(APIView):
+    """Révisions serveur d'une carte (plus récentes d'abord)."""
+
+    def get(self, request, username, map_id):
+        """List the revisions of a map"""
+        try:
+            from editor import map_history
+            revisions = map_history.list_revisions(username, map_id)
+            return Response({
+                'mapId': map_id,
+                'revisions': revisions,
+                'size': sum(r['size'] for r in revisions),
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MapRevisionView(APIView):
+    """Carte complète telle qu'enregistrée à une révision donnée."""
+
+    def get(self, request, username, map_id, rev):
+        """Get a map at a revision"""
+        try:
+            from editor import map_history
+            return Response(map_history.get_revision(username, map_id, rev), status=status.HTTP_200_OK)
+        except FileNotFoundError:
+            return Response(
+                {"error": "Revision not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MapRevisionDiffView(APIView):
+    """Différences entre deux révisions (`?from=` et `?to=`, défaut : dernière révision)."""
+
+    def get(self, request, username, map_id):
+        """Diff two revisions of a map"""
+        try:
+            from editor import map_history
+            revisions = map_history.list_revisions(username, map_id)
+            if not revisions:
+                return Response(
+                    {"error": "Map has no history"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            try:
+                to_rev = int(request.query_params.get('to') or revisions[0]['rev'])
+                from_rev = int(request.query_params['from'])
+            except KeyError:
+                return Response(
+                    {"error": "from is required"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            except ValueError:
+                return Response(
+                    {"error": "from and to must be revision numbers"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(
+                map_history.diff_revisions(username, map_id, from_rev, to_rev),
+                status=status.HTTP_200_OK
+            )
+        except FileNotFoundError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MapTilesView(APIView):
+    """Description de la pyramide deep zoom d'une carte (niveaux, grilles de tuiles, emprise)."""
+
+    def get(self, request, username, map_id):
+        """Get the tile pyramid description of a map"""
+        try:
+            from editor import map_tiles
+            manifest = map_tiles.get_manifest(username, map_id)
+            return _set_etag(
+                Response(map_tiles.public_manifest(manifest), status=status.HTTP_200_OK),
+                manifest['hash']
+            )
+        except FileNotFoundError:
+            return Response(
+                {"error": "Map not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MapTileView(APIView):
+    """Tuile PNG 256 px d'une carte (rendue au premier accès, puis servie depuis le disque)."""
+
+    def get(self, request, username, map_id, level, x, y):
+        """Get one tile of the pyramid (transparente si vide)"""
+        try:
+            from editor import map_tiles
+            tile_hash, tile_file = map_tiles.get_tile(username, map_id, level, x, y)
+            etag = f'"{tile_hash or "empty"}"'
+            if _etag_matches(request, etag):
+                response = HttpResponseNotModified()
+            elif tile_file is None:
+                response = HttpResponse(map_tiles.empty_tile(), content_type='image/png')
+            else:
+                response = FileResponse(open(tile_file, 'rb'), content_type='image/png')
+            response['ETag'] = etag
+            return response
+        except (FileNotFoundError, IndexError):
+            return Response(
+                {"error": "Tile not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MapDraftValidationView(APIView):
+    """Vérifie les références d'assets d'une carte envoyée (sans l'enregistrer)."""
+
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + [CompactMapParser]
+
+    def post(self, request):
+        """Validate a map body (JSON ou compact)"""
+        try:
+            from .map_validation import validate_map
+            if not isinstance(request.data, dict):
+                return Response(
+                    {"error": "Map data must be an object"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(validate_map(request.data), status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MapUsageView(APIView):
+    """Statistiques d'utilisation des packs par les cartes ; `?asset=` : cartes utilisant un asset."""
+
+    def get(self, request):
+        """Usage per pack, or maps using one asset path"""
+        try:
+            from editor import map_usage_index
+            asset = request.query_params.get('asset')
+            if asset:
+                return Response({
+                    'asset': asset,
+                    'maps': map_usage_index.maps_using_asset(asset),
+                }, status=status.HTTP_200_OK)
+            return Response({"packs": map_usage_index.pack_usage_stats()}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MapExportView(APIView):
+    """
+    Export en flux de toutes les cartes (ou d'une sélection) en NDJSON ou ZIP.
+
+    Paramètres : `type` (ndjson par défaut, ou zip ; `format` est réservé
+    par DRF à la négociation de rendu), `user` (répétable),
+    `since` / `until` (dates ISO sur metadata.modified), `exclude_images=1`.
+    """
+
+    def get(self, request):
+        """Stream maps as NDJSON lines or a ZIP archive"""
+        try:
+            from editor.map_export import CONTENT_TYPES, MapExporter
+            fmt = request.query_params.get('type', 'ndjson')
+            if fmt not in CONTENT_TYPES:
+                return Response(
+                    {"error": f"Unknown export format: {fmt} (expected ndjson or zip)"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                exporter = MapExporter(
+                    users=request.query_params.getlist('user') or None,
+                    since=request.query_params.get('since'),
+                    until=request.query_params.get('until'),
+                    exclude_images=request.query_params.get('exclude_images') in ('1', 'true', 'yes'),
+                )
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            response = StreamingHttpResponse(exporter.stream(fmt), content_type=CONTENT_TYPES[fmt])
+            response['Content-Disposition'] = f'attachment; filename="maps.{fmt}"'
+            response['Cache-Control'] = 'no-store'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MapImportView(APIView):
+    """Import en masse de cartes (NDJSON ou ZIP) : validation parallèle, écriture par lots."""
+
+    def post(self, request):
+        """
+        Import many maps at once.
+
+        multipart : `file` (NDJSON ou ZIP, détecté par signature), `user`
+        (utilisateur par défaut), `on_conflict` (skip, replace ou new),
+        `validate` (off, report ou strict). Résultat par élément dans `results`.
+        """
+        try:
+            from editor.map_import import MapImporter
+            from .map_validation import map_validator
+
+            upload = request.FILES.get('file')
+            if not upload:
+                return Response(
+                    {"error": "file is required"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            options = request.query_params.copy()
+            options.update(request.data)
+            validate = options.get('validate') or 'report'
+            importer = MapImporter(
+                default_user=options.get('user') or 'temp',
+                on_conflict=options.get('on_conflict') or 'skip',
+                validate=validate,
+                workers=getattr(settings, 'MAP_IMPORT_WORKERS', 8),
+                batch_size=getattr(settings, 'MAP_IMPORT_BATCH_SIZE', 200),
+                validator=map_validator() if validate != 'off' else None,
+            )
+            result = importer.import_file(upload)
+            return Response(result, status=status.HTTP_200_OK)
+        except (ValueError, zipfile.BadZipFile) as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class PublicMapsView(APIView):
     """Agrège toutes les cartes de tous les utilisateurs (aperçu / galerie)."""
 
@@ -313,8 +832,9 @@ class PublicMapsView(APIView):
         """List all public maps (from all users)"""
         try:
             from editor.map_manager import MapManager
+            version = MapManager.public_maps_version()
             maps = MapManager.list_all_public_maps()
-            return Response({"maps": maps}, status=status.HTTP_200_OK)
+            return _set_etag(Response({"maps": maps}, status=status.HTTP_200_OK), version)
         except Exception as e:
             return Response(
                 {"error": str(e)},
@@ -376,7 +896,7 @@ class CustomPackUploadView(APIView):
 
 
 class CustomPackListView(APIView):
-    """Liste les packs du répertoire `packs/custom` (métadonnées via PackParser)."""
+    """Liste les packs du répertoire `packs/custom` (cfg racine seulement, via PackParser)."""
 
     def get(self, request):
         """List custom packs"""
@@ -394,7 +914,7 @@ class CustomPackListView(APIView):
                         try:
                             from api.parsers.pack_parser import PackParser
                             parser = PackParser(pack_dir)
-                            pack_info = parser.parse_pack()
+                            pack_info = parser.parse_pack(PackParser.DEPTH_META)
                             packs.append({
                                 'id': pack_info['id'],
                                 'name': pack_info['name'],
@@ -448,6 +968,146 @@ class PackZipUploadView(APIView):
             )
 
 
+class PackUploadSessionListView(APIView):
+    """Ouvre une session d'upload ZIP par morceaux (gros packs, reprise après coupure)."""
+
+    def post(self, request):
+        """Create an upload session (filename, size, game_type, replace_existing, sha256)"""
+        try:
+            from editor.chunked_upload import ChunkedUploadManager
+            size = request.data.get('size')
+            if size is None:
+                return Response(
+                    {"error": "size is required"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            result = ChunkedUploadManager.create(
+                request.data.get('filename'),
+                size,
+                game_type=request.data.get('game_type'),
+                replace_existing=request.data.get('replace_existing', False),
+                sha256=request.data.get('sha256'),
+            )
+            return Response(result, status=status.HTTP_201_CREATED)
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PackUploadSessionView(APIView):
+    """Session d'upload par morceaux : offset confirmé, envoi d'un morceau, abandon."""
+
+    def get(self, request, upload_id):
+        """Get the confirmed offset of an upload session"""
+        try:
+            from editor.chunked_upload import ChunkedUploadManager
+            return Response(ChunkedUploadManager.get_status(upload_id), status=status.HTTP_200_OK)
+        except FileNotFoundError:
+            return Response(
+                {"error": "Upload not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    def patch(self, request, upload_id):
+        """
+        Append a chunk (corps brut application/octet-stream).
+        
+        En-têtes : `Upload-Offset` (offset du morceau, doit égaler l'offset
+        confirmé, sinon 409 avec l'offset attendu) et `X-Chunk-SHA256`.
+        Le corps est lu en flux, sans passer par les parsers DRF.
+        """
+        try:
+            from editor.chunked_upload import ChunkedUploadManager, UploadOffsetMismatch
+            try:
+                offset = int(request.headers.get('Upload-Offset', ''))
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                return Response(
+                    {"error": "Upload-Offset and Content-Length headers are required"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            result = ChunkedUploadManager.put_chunk(
+                upload_id, offset, request.stream, length,
+                sha256=request.headers.get('X-Chunk-SHA256'),
+            )
+            return Response(result, status=status.HTTP_200_OK)
+        except FileNotFoundError:
+            return Response(
+                {"error": "Upload not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except UploadOffsetMismatch as e:
+            return Response(
+                {"error": str(e), "offset": e.expected},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    def delete(self, request, upload_id):
+        """Abort an upload session"""
+        try:
+            from editor.chunked_upload import ChunkedUploadManager
+            ChunkedUploadManager.abort(upload_id)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        except FileNotFoundError:
+            return Response(
+                {"error": "Upload not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PackUploadFinalizeView(APIView):
+    """Termine une session d'upload : import du ZIP complet (comme packs/upload-zip/)."""
+
+    def post(self, request, upload_id):
+        """Import the uploaded ZIP pack"""
+        try:
+            from editor.chunked_upload import ChunkedUploadManager
+            result = ChunkedUploadManager.finalize(upload_id)
+            return Response(result, status=status.HTTP_201_CREATED)
+        except FileNotFoundError:
+            return Response(
+                {"error": "Upload not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except (ValueError, zipfile.BadZipFile) as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class UploadedPackListView(APIView):
     """Liste les dossiers-pack présents sous le répertoire médias « assets »."""
 
@@ -464,6 +1124,71 @@ class UploadedPackListView(APIView):
             )
 
 
+class MetricsView(APIView):
+    """Métriques du processus au format texte Prometheus (latences, I/O disque, caches)."""
+
+    def get(self, request):
+        """Exposition Prometheus (text/plain; version=0.0.4)"""
+        from .metrics import render_prometheus
+        return HttpResponse(
+            render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+class EventStreamView(View):
+    """
+    Flux Server-Sent Events des changements (packs, cartes).
+
+    Vue Django asynchrone (DRF n'en gère pas) : à servir sous ASGI, chaque
+    client garde une connexion ouverte. Filtre optionnel `?types=pack,map` ;
+    reprise après reconnexion via l'en-tête `Last-Event-ID` (événement
+    `resync` si cet id vient d'un autre processus ou n'est plus rejouable).
+
+    Sous WSGI (`runserver`), un flux sans fin bloquerait un worker par
+    client : la réponse se limite aux événements en attente puis se ferme,
+    et le navigateur se reconnecte après `retry` (interrogation périodique).
+    """
+
+    async def get(self, request):
+        """Stream text/event-stream (événements `pack`, `map`, `resync`, commentaire de maintien)"""
+        from editor import json_codec
+        from .events import get_event_bus
+        types = [t for t in request.GET.get('types', '').split(',') if t] or None
+        last_event_id = request.headers.get('Last-Event-ID') or None
+        heartbeat = getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 15)
+
+        def format_event(event):
+            data = json_codec.dumps(event).decode('utf-8')
+            return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+        if not isinstance(request, ASGIRequest):
+            missed, last_id = get_event_bus().replay(types, last_event_id)
+            # Sans événement, `id:` seul positionne Last-Event-ID pour la reconnexion
+            body = ''.join(format_event(event) for event in missed) or f'id: {last_id}\n\n'
+            response = HttpResponse('retry: 3000\n\n' + body, content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            return response
+
+        async def stream():
+            sub, missed = get_event_bus().subscribe(types, last_event_id)
+            try:
+                # Délai de reconnexion conseillé au navigateur (ms)
+                yield 'retry: 3000\n\n'
+                for event in missed:
+                    yield format_event(event)
+                while not sub.overflowed:
+                    event = await sub.get(timeout=heartbeat)
+                    yield format_event(event) if event is not None else ': keep-alive\n\n'
+            finally:
+                sub.close()
+
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class UploadedPackDeleteView(APIView):
     """Supprime un pack uploadé (dossier sous ASSETS_DIR) par identifiant."""
 
@@ -481,6 +1206,8 @@ class UploadedPackDeleteView(APIView):
             if pack_dir.exists() and pack_dir.is_dir():
                 import shutil
                 shutil.rmtree(pack_dir)
+                from .pack_cache import invalidate_pack
+                invalidate_pack(pack_id)
                 return Response(status=status.HTTP_204_NO_CONTENT)
             else:
                 return Response(
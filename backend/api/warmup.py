@@ -0,0 +1,146 @@
+"""
+Préchauffage des caches de processus avant d'accepter du trafic.
+
+Après un déploiement ou un redémarrage, les premières requêtes paient le
+parsing des packs, la construction de l'index d'assets et des lectures disque à
+froid. `run_warmup()` fait ce travail d'avance, étape par étape :
+
+1. vignettes (seulement si demandé, `thumbnails=True`) : génère les
+   `r_thumb.png` manquants des assets à rotations — écrit dans les packs ;
+2. packs : liste des packs et assets de chaque pack (réponses pré-rendues de
+   `api.pack_cache`, types de jeu statiques) ;
+3. index d'assets : table de tous les chemins d'assets (index de recherche) ;
+4. cartes : version de toutes les cartes (stat) puis lecture des N cartes
+   modifiées le plus récemment (cache disque de l'OS).
+
+Seuls l'index SQLite des packs (`api.pack_index`), les vignettes et le
+cache disque de l'OS survivent au processus : les réponses pré-rendues et
+l'index de recherche sont des caches en mémoire, perdus à la fin de
+`manage.py warmup` (la commande ne chauffe donc que le disque). Pour chauffer
+le serveur lui-même, `WARMUP_ON_STARTUP` exécute le préchauffage dans
+`ApiConfig.ready()` de chaque processus servant.
+"""
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+_CATEGORY_RE = re.compile(r'^\d+[\.\d]')
+
+
+def generate_missing_thumbnails(pack_dir):
+    """Crée les r_thumb.png absents (depuis r_0.png) d'un pack ; retourne le nombre créé."""
+    from PIL import Image
+    from editor.pack_uploader import save_thumbnail
+    created = 0
+    for category_dir in Path(pack_dir).iterdir():
+        if not category_dir.is_dir() or not _CATEGORY_RE.match(category_dir.name):
+            continue
+        for asset_dir in category_dir.iterdir():
+            if not asset_dir.is_dir() or asset_dir.name.startswith('.'):
+                continue
+            main_image = asset_dir / 'r_0.png'
+            thumb_path = asset_dir / 'r_thumb.png'
+            if thumb_path.exists() or not main_image.exists():
+                continue
+            try:
+                with Image.open(main_image) as img:
+                    save_thumbnail(img.convert('RGBA'), thumb_path)
+                created += 1
+            except Exception as e:
+                print(f"Error generating thumbnail for {asset_dir}: {e}")
+    return created
+
+
+def _warm_thumbnails():
+    from .pack_cache import invalidate_pack
+    from .parsers.asset_indexer import AssetIndexer
+    total = 0
+    for pack_dir in AssetIndexer.iter_pack_dirs():
+        created = generate_missing_thumbnails(pack_dir)
+        if created:
+            invalidate_pack(pack_dir.name)
+            total += created
+    return f'{total} vignette(s) générée(s)'
+
+
+def _warm_packs():
+    from .pack_cache import get_pack_assets_response, get_pack_list_response
+    from .parsers.asset_indexer import AssetIndexer
+    from .parsers.editor_game_types import load_static_pack_game_types
+    load_static_pack_game_types()
+    get_pack_list_response()
+    count = 0
+    for pack_dir in AssetIndexer.iter_pack_dirs():
+        try:
+            if get_pack_assets_response(pack_dir.name) is not None:
+                count += 1
+        except Exception as e:
+            print(f"Error warming pack {pack_dir.name}: {e}")
+    return f'{count} pack(s)'
+
+
+def _warm_asset_index():
+    from .parsers.asset_search import get_search_index
+    index = get_search_index()
+    index.refresh(force=True)
+    stats = index.stats()
+    return f"{stats['assets']} asset(s) dans {stats['packs']} pack(s)"
+
+
+def _warm_maps(recent_maps):
+    from editor.map_manager import MapManager, iter_map_files, read_map_file
+    users_dir = Path(settings.USERS_DIR)
+    map_files = []
+    if users_dir.exists():
+        for user_dir in users_dir.iterdir():
+            maps_dir = user_dir / 'maps'
+            if maps_dir.is_dir():
+                map_files.extend(iter_map_files(maps_dir))
+    MapManager.public_maps_version()
+
+    def mtime(path):
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    recent = sorted(map_files, key=mtime, reverse=True)[:max(0, recent_maps)]
+    read = 0
+    for map_file in recent:
+        try:
+            read_map_file(map_file)
+            read += 1
+        except Exception as e:
+            print(f"Error reading map file {map_file}: {e}")
+    return f'{len(map_files)} carte(s), {read} lue(s)'
+
+
+def run_warmup(recent_maps=None, thumbnails=False):
+    """
+    Exécute toutes les étapes ; retourne [(étape, secondes, détail)].
+
+    Une étape en erreur est signalée dans son détail sans interrompre les
+    suivantes (un cache froid vaut mieux qu'un démarrage bloqué).
+    """
+    if recent_maps is None:
+        recent_maps = getattr(settings, 'WARMUP_RECENT_MAPS', 50)
+    steps = []
+    if thumbnails:
+        steps.append(('thumbnails', _warm_thumbnails))
+    steps += [
+        ('packs', _warm_packs),
+        ('asset_index', _warm_asset_index),
+        ('maps', lambda: _warm_maps(recent_maps)),
+    ]
+    report = []
+    for name, step in steps:
+        t0 = time.perf_counter()
+        try:
+            detail = step()
+        except Exception as e:
+            detail = f'erreur : {e}'
+            print(f"Warmup step {name} failed: {e}")
+        report.append((name, time.perf_counter() - t0, detail))
+    return report
@@ -0,0 +1,224 @@
+"""
+Stockage adressé par contenu des images de packs.
+
+Chaque image est rangée une seule fois sous `BLOB_STORE_DIR/<aa>/<sha256>`
+(aa = deux premiers caractères du hash). Les arborescences de packs gardent
+leurs chemins habituels, mais ces fichiers deviennent des liens physiques
+(hardlinks) vers le blob : une tuile réimprimée dans dix packs, ou les
+rotations copiées d'un asset non carré, n'occupent qu'une copie sur disque et
+sont servies sous une seule URL stable (`/api/blobs/<sha256>`, cache
+navigateur immuable).
+
+Règle importante : un fichier de pack lié ne doit jamais être réécrit en place
+(ce serait réécrire le blob partagé). Les écrivains passent par
+`replace_file()` / suppriment le fichier avant d'écrire. Un outil externe
+(éditeur d'images, copie manuelle) ne le sait pas : le stockage est donc
+désactivé par défaut (`BLOB_STORE_ENABLED=1` pour l'activer).
+
+Sans support des hardlinks (autre volume, système de fichiers FAT…), les
+fichiers restent de simples copies et le dédoublonnage est ignoré.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+BLOB_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+_CHUNK = 1024 * 1024
+_RESCAN_INTERVAL = 30.0
+
+
+def is_enabled():
+    """Dédoublonnage actif (settings.BLOB_STORE_ENABLED, défaut False)."""
+    return getattr(settings, 'BLOB_STORE_ENABLED', False)
+
+
+def get_store_dir():
+    """Racine du stockage (settings.BLOB_STORE_DIR, défaut MEDIA_ROOT/blobs)."""
+    return Path(getattr(settings, 'BLOB_STORE_DIR', None) or Path(settings.MEDIA_ROOT) / 'blobs')
+
+
+def hash_file(path):
+    """sha256 hexadécimal du contenu d'un fichier."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_valid_digest(digest):
+    return len(digest) == 64 and all(c in '0123456789abcdef' for c in digest)
+
+
+def blob_path(digest):
+    """Chemin du blob d'un hash (qu'il existe ou non)."""
+    return get_store_dir() / digest[:2] / digest
+
+
+def is_blob_candidate(path):
+    """Seules les images sont dédoublonnées (les cfg sont réécrits en place)."""
+    return Path(path).suffix.lower() in BLOB_EXTENSIONS
+
+
+class _InodeIndex:
+    """(st_dev, st_ino) -> hash des blobs, pour retrouver le hash d'un fichier lié sans le relire."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._root = None
+        self._scanned_at = None
+
+    def _scan(self, root):
+        index = {}
+        if root.exists():
+            for sub in root.iterdir():
+                if not sub.is_dir():
+                    continue
+                with os.scandir(sub) as it:
+                    for entry in it:
+                        if entry.is_file() and is_valid_digest(entry.name):
+                            st = entry.stat()
+                            index[(st.st_dev, st.st_ino)] = entry.name
+        self._index = index
+        self._root = root
+        self._scanned_at = time.monotonic()
+
+    def add(self, st, digest):
+        with self._lock:
+            self._index[(st.st_dev, st.st_ino)] = digest
+
+    def lookup(self, st):
+        root = get_store_dir()
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            if self._root != root:
+                self._scan(root)
+            digest = self._index.get(key)
+            if digest is None and time.monotonic() - self._scanned_at > _RESCAN_INTERVAL:
+                # Blobs créés par un autre processus depuis le dernier scan
+                self._scan(root)
+                digest = self._index.get(key)
+            return digest
+
+
+_inodes = _InodeIndex()
+
+
+def _atomic_copy(src, dest):
+    """Copie src vers dest via un fichier temporaire du même dossier puis rename."""
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as out, open(src, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK), b''):
+                out.write(chunk)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def store_file(path):
+    """Range le contenu de `path` dans le stockage (si absent) ; retourne son hash."""
+    digest = hash_file(path)
+    dest = blob_path(digest)
+    if not dest.exists():
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Lien direct quand c'est possible : aucune copie des octets
+            os.link(path, dest)
+        except FileExistsError:
+            pass
+        except OSError:
+            _atomic_copy(path, dest)
+    _inodes.add(dest.stat(), digest)
+    return digest
+
+
+def link_into_place(path):
+    """
+    Remplace `path` par un lien physique vers son blob ; retourne (hash, octets
+    économisés). Sans effet (0 octet) si le fichier est déjà lié ou si le
+    système de fichiers ne permet pas le lien.
+    """
+    path = Path(path)
+    digest = store_file(path)
+    dest = blob_path(digest)
+    st_path, st_blob = path.stat(), dest.stat()
+    if (st_path.st_dev, st_path.st_ino) == (st_blob.st_dev, st_blob.st_ino):
+        return digest, 0
+    tmp = path.with_name(f'.tmp-link-{os.getpid()}-{path.name}')
+    try:
+        os.link(dest, tmp)
+    except OSError:
+        return digest, 0
+    os.replace(tmp, path)
+    return digest, st_path.st_size
+
+
+def link_tree(root):
+    """Dédoublonne toutes les images d'une arborescence ; retourne (fichiers, octets économisés)."""
+    files = saved = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for name in filenames:
+            if name.startswith('.') or not is_blob_candidate(name):
+                continue
+            try:
+                _, freed = link_into_place(Path(dirpath) / name)
+            except OSError as e:
+                print(f"Error storing blob for {Path(dirpath) / name}: {e}")
+                continue
+            files += 1
+            saved += freed
+    return files, saved
+
+
+def replace_file(path):
+    """
+    À appeler avant de réécrire un fichier de pack : supprime le lien existant
+    pour que l'écriture crée un nouveau fichier au lieu de modifier le blob.
+    """
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def digest_for_path(path):
+    """Hash du blob auquel `path` est lié, ou None (fichier non lié / absent)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if st.st_nlink < 2:
+        return None
+    return _inodes.lookup(st)
+
+
+def collect_garbage():
+    """Supprime les blobs qui ne sont plus référencés par aucun pack ; retourne (blobs, octets)."""
+    root = get_store_dir()
+    removed = freed = 0
+    if not root.exists():
+        return removed, freed
+    for sub in root.iterdir():
+        if not sub.is_dir():
+            continue
+        for blob in sub.iterdir():
+            try:
+                st = blob.stat()
+            except OSError:
+                continue
+            stale_tmp = blob.name.startswith('.tmp-') and time.time() - st.st_mtime > 3600
+            if stale_tmp or (is_valid_digest(blob.name) and st.st_nlink == 1):
+                blob.unlink()
+                removed += 1
+                freed += st.st_size
+    return removed, freed
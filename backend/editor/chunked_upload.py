@@ -0,0 +1,267 @@
+"""
+Uploads de packs ZIP par morceaux, reprenables.
+
+Protocole (voir `api.views.PackUploadSessionView`) :
+  1. création : nom, taille totale, options d'import -> identifiant ;
+  2. envoi des morceaux dans l'ordre, chacun avec son offset et son sha256 ;
+     le corps de la requête est copié en flux vers le fichier de préparation,
+     jamais gardé en mémoire ;
+  3. après une coupure, le client relit l'offset confirmé et reprend de là ;
+  4. finalisation : le fichier complet passe par l'import ZIP existant
+     (`PackZipUploader.upload_and_extract`).
+
+Chaque session vit dans `CHUNKED_UPLOAD_DIR/<id>/` (`data` + `meta.json`) ;
+les sessions inactives depuis `CHUNKED_UPLOAD_EXPIRE_HOURS` sont supprimées.
+Morceaux, finalisation et abandon d'une même session sont sérialisés entre
+threads et entre workers (flock sur le dossier de la session).
+"""
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from . import json_codec
+from .pack_zip_uploader import PackZipUploader
+from .utils import ensure_directory
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+_COPY_BUFFER = 1024 * 1024
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class UploadOffsetMismatch(ValueError):
+    """Le morceau ne commence pas à l'offset confirmé côté serveur."""
+
+    def __init__(self, expected):
+        super().__init__(f"Chunk offset mismatch, expected {expected}")
+        self.expected = expected
+
+
+def _thread_lock(upload_id):
+    with _locks_guard:
+        lock = _locks.get(upload_id)
+        if lock is None:
+            lock = _locks[upload_id] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def _lock(upload_id, session_dir):
+    """
+    Verrou exclusif d'une session : threads du processus puis autres processus
+    (flock sur le dossier de la session). FileNotFoundError si la session a été
+    finalisée ou abandonnée pendant l'attente.
+    """
+    with _thread_lock(upload_id):
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(session_dir, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if not (session_dir / 'meta.json').exists():
+                raise FileNotFoundError(f"Upload not found: {upload_id}")
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class ChunkedUploadManager:
+    """Sessions d'upload par morceaux (création, morceaux, offset, finalisation)"""
+
+    @staticmethod
+    def get_upload_root():
+        """Dossier des sessions (settings.CHUNKED_UPLOAD_DIR, défaut MEDIA_ROOT/uploads)"""
+        return Path(getattr(settings, 'CHUNKED_UPLOAD_DIR', None) or Path(settings.MEDIA_ROOT) / 'uploads')
+
+    @staticmethod
+    def max_size():
+        return getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+
+    @staticmethod
+    def max_chunk_size():
+        return getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 * 1024)
+
+    @staticmethod
+    def _session_dir(upload_id):
+        if not _UPLOAD_ID_RE.match(upload_id or ''):
+            raise FileNotFoundError(f"Upload not found: {upload_id}")
+        session_dir = ChunkedUploadManager.get_upload_root() / upload_id
+        if not (session_dir / 'meta.json').exists():
+            raise FileNotFoundError(f"Upload not found: {upload_id}")
+        return session_dir
+
+    @staticmethod
+    def _write_meta(session_dir, meta):
+        tmp = session_dir / 'meta.json.tmp'
+        json_codec.dump_file(tmp, meta)
+        os.replace(tmp, session_dir / 'meta.json')
+
+    @staticmethod
+    def _status(meta):
+        return {
+            'id': meta['id'],
+            'filename': meta['filename'],
+            'size': meta['size'],
+            'offset': meta['offset'],
+            'complete': meta['offset'] == meta['size'],
+            'maxChunkSize': ChunkedUploadManager.max_chunk_size(),
+        }
+
+    @staticmethod
+    def create(filename, size, game_type=None, replace_existing=False, sha256=None):
+        """Ouvre une session ; retourne son état (offset 0)"""
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            raise ValueError("size must be an integer")
+        if size <= 0:
+            raise ValueError("size must be positive")
+        if size > ChunkedUploadManager.max_size():
+            raise ValueError(f"ZIP file too large (max {ChunkedUploadManager.max_size() / 1024 / 1024}MB)")
+        if sha256 is not None and not re.match(r'^[0-9a-f]{64}$', str(sha256).lower()):
+            raise ValueError("sha256 must be a hex digest")
+        ChunkedUploadManager.cleanup_expired()
+
+        upload_id = uuid.uuid4().hex
+        session_dir = ChunkedUploadManager.get_upload_root() / upload_id
+        ensure_directory(session_dir)
+        (session_dir / 'data').touch()
+        meta = {
+            'id': upload_id,
+            'filename': filename or 'pack.zip',
+            'size': size,
+            'offset': 0,
+            'sha256': sha256.lower() if sha256 else None,
+            'gameType': game_type or None,
+            'replaceExisting': bool(replace_existing),
+            'created': time.time(),
+            'updated': time.time(),
+        }
+        ChunkedUploadManager._write_meta(session_dir, meta)
+        return ChunkedUploadManager._status(meta)
+
+    @staticmethod
+    def get_status(upload_id):
+        """État d'une session : offset confirmé (reprise après coupure)"""
+        session_dir = ChunkedUploadManager._session_dir(upload_id)
+        return ChunkedUploadManager._status(json_codec.load_file(session_dir / 'meta.json'))
+
+    @staticmethod
+    def put_chunk(upload_id, offset, stream, length, sha256=None):
+        """
+        Écrit un morceau lu en flux depuis `stream` (`length` octets) à `offset`.
+
+        Le morceau n'est confirmé (offset avancé) que s'il est complet et que
+        son sha256 correspond ; sinon le fichier est ramené à l'offset précédent.
+        """
+        session_dir = ChunkedUploadManager._session_dir(upload_id)
+        if length is None or length <= 0:
+            raise ValueError("Chunk is empty or has no Content-Length")
+        if length > ChunkedUploadManager.max_chunk_size():
+            raise ValueError(f"Chunk too large (max {ChunkedUploadManager.max_chunk_size()} bytes)")
+        with _lock(upload_id, session_dir):
+            meta = json_codec.load_file(session_dir / 'meta.json')
+            if offset != meta['offset']:
+                raise UploadOffsetMismatch(meta['offset'])
+            if offset + length > meta['size']:
+                raise ValueError("Chunk goes past the declared upload size")
+
+            h = hashlib.sha256()
+            received = 0
+            with open(session_dir / 'data', 'r+b') as f:
+                f.seek(offset)
+                try:
+                    while received < length:
+                        buf = stream.read(min(_COPY_BUFFER, length - received))
+                        if not buf:
+                            break
+                        h.update(buf)
+                        f.write(buf)
+                        received += len(buf)
+                    if received != length:
+                        raise ValueError(f"Incomplete chunk ({received} of {length} bytes)")
+                    if sha256 and h.hexdigest() != sha256.lower():
+                        raise ValueError("Chunk checksum mismatch")
+                    f.flush()
+                    os.fsync(f.fileno())
+                except BaseException:
+                    # Coupure / morceau invalide : on repart de l'offset confirmé
+                    f.truncate(offset)
+                    raise
+
+            meta['offset'] = offset + length
+            meta['updated'] = time.time()
+            ChunkedUploadManager._write_meta(session_dir, meta)
+            return ChunkedUploadManager._status(meta)
+
+    @staticmethod
+    def finalize(upload_id):
+        """Importe le ZIP complet via PackZipUploader puis supprime la session"""
+        session_dir = ChunkedUploadManager._session_dir(upload_id)
+        with _lock(upload_id, session_dir):
+            meta = json_codec.load_file(session_dir / 'meta.json')
+            if meta['offset'] != meta['size']:
+                raise ValueError(f"Upload incomplete ({meta['offset']} of {meta['size']} bytes)")
+            data_path = session_dir / 'data'
+            if meta.get('sha256'):
+                from .blob_store import hash_file
+                if hash_file(data_path) != meta['sha256']:
+                    raise ValueError("Upload checksum mismatch")
+            with open(data_path, 'rb') as zip_file:
+                result = PackZipUploader.upload_and_extract(
+                    zip_file,
+                    replace_existing=meta['replaceExisting'],
+                    game_type=meta['gameType'],
+                    max_size=meta['size'],
+                )
+            shutil.rmtree(session_dir, ignore_errors=True)
+        with _locks_guard:
+            _locks.pop(upload_id, None)
+        return result
+
+    @staticmethod
+    def abort(upload_id):
+        """Abandonne une session et supprime son fichier"""
+        session_dir = ChunkedUploadManager._session_dir(upload_id)
+        with _lock(upload_id, session_dir):
+            shutil.rmtree(session_dir, ignore_errors=True)
+        with _locks_guard:
+            _locks.pop(upload_id, None)
+
+    @staticmethod
+    def cleanup_expired():
+        """Supprime les sessions inactives depuis CHUNKED_UPLOAD_EXPIRE_HOURS ; retourne leur nombre"""
+        root = ChunkedUploadManager.get_upload_root()
+        if not root.exists():
+            return 0
+        max_age = getattr(settings, 'CHUNKED_UPLOAD_EXPIRE_HOURS', 24) * 3600
+        now = time.time()
+        removed = 0
+        for session_dir in root.iterdir():
+            if not session_dir.is_dir():
+                continue
+            try:
+                # meta.json est réécrit à chaque morceau confirmé
+                age = now - (session_dir / 'meta.json').stat().st_mtime
+            except OSError:
+                age = now - session_dir.stat().st_mtime
+            if age > max_age:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                removed += 1
+        return removed
@@ -1,12 +1,38 @@
 """
 File watcher for detecting changes in bgmapeditor_tiles directory
+
+Les événements watchdog sont regroupés : après une période de calme
+(`PACK_WATCHER_QUIET_SECONDS`, ou au plus `PACK_WATCHER_MAX_DELAY_SECONDS`
+après le premier événement d'une rafale), chaque abonné reçoit un seul
+`PackChangeSet` par pack touché (catégories, chemins, nombre d'événements).
+Extraire un ZIP de 500 fichiers produit ainsi un appel par pack, pas 500.
+Les fichiers temporaires d'éditeurs / de téléchargement sont ignorés.
 """
 import os
+import re
+import threading
+import time
+from collections import namedtuple
 from pathlib import Path
 from django.conf import settings
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+# Résumé des changements d'un pack sur une rafale d'événements
+# (deleted : le dossier du pack n'existe plus au moment de la livraison)
+PackChangeSet = namedtuple('PackChangeSet', ['pack_id', 'categories', 'paths', 'events', 'deleted'])
+
+# Fichiers temporaires : swap vim, sauvegardes emacs/~, téléchargements partiels, métadonnées OS
+_TEMP_FILE_RE = re.compile(
+    r'(^\.|^~|~$|^#.*#$|\.(tmp|temp|part|partial|crdownload|swp|swo|swx)$|^Thumbs\.db$|^desktop\.ini$)',
+    re.IGNORECASE,
+)
+
+
+def is_temp_file(name):
+    """True pour les fichiers temporaires / cachés à ignorer."""
+    return bool(_TEMP_FILE_RE.search(name))
+
 
 class PackChangeHandler(FileSystemEventHandler):
     """Handle file system events for pack changes"""
@@ -25,6 +51,7 @@ class PackChangeHandler(FileSystemEventHandler):
             self._notify_change(event.src_path)
     
     def on_moved(self, event):
+        self._notify_change(event.src_path)
         self._notify_change(event.dest_path)
     
     def on_deleted(self, event):
@@ -39,14 +66,45 @@ class PackChangeHandler(FileSystemEventHandler):
                 print(f"Error in change callback: {e}")
 
 
+class _PendingPack:
+    """Accumulateur des événements d'un pack en attente de livraison."""
+    
+    __slots__ = ('categories', 'paths', 'events')
+    
+    def __init__(self):
+        self.categories = set()
+        self.paths = set()
+        self.events = 0
+
+
 class PackFileWatcher:
     """Watch for changes in bgmapeditor_tiles directory"""
     
-    def __init__(self):
-        """Observer inactif jusqu'à start() ; callbacks listés dans callbacks."""
+    def __init__(self, quiet_period=None, max_delay=None, invalidate_caches=True):
+        """
+        Observer inactif jusqu'à start() ; abonnés listés dans callbacks.
+        
+        quiet_period : délai sans événement avant livraison (s) ;
+        max_delay : délai maximal depuis le premier événement en attente (s) ;
+        invalidate_caches : invalider les caches de l'API (`invalidate_pack`)
+        pour chaque pack modifié.
+        """
+        if quiet_period is None:
+            quiet_period = getattr(settings, 'PACK_WATCHER_QUIET_SECONDS', 0.5)
+        if max_delay is None:
+            max_delay = getattr(settings, 'PACK_WATCHER_MAX_DELAY_SECONDS', 5.0)
+        self.quiet_period = quiet_period
+        self.max_delay = max(max_delay, quiet_period)
+        self.invalidate_caches = invalidate_caches
         self.observer = None
         self.watching = False
         self.callbacks = []
+        self.root = None
+        self._pending = {}            # pack_id -> _PendingPack
+        self._first_event = None
+        self._last_event = None
+        self._cond = threading.Condition()
+        self._flusher = None
     
     def start(self, callback=None):
         """Start watching the directory"""
@@ -57,15 +115,18 @@ class PackFileWatcher:
         assets_dir = Path(settings.ASSETS_DIR)
         if not assets_dir.exists():
             os.makedirs(assets_dir, exist_ok=True)
+        self.root = assets_dir
         
         if callback:
-            self.callbacks.append(callback)
+            self.add_callback(callback)
         
         event_handler = PackChangeHandler(self._handle_change)
         self.observer = Observer()
         self.observer.schedule(event_handler, str(assets_dir), recursive=True)
         self.observer.start()
         self.watching = True
+        self._flusher = threading.Thread(target=self._flush_loop, name='pack-watcher-flush', daemon=True)
+        self._flusher.start()
         print(f"Started watching {assets_dir}")
     
     def stop(self):
@@ -73,21 +134,95 @@ class PackFileWatcher:
         if self.observer and self.watching:
             self.observer.stop()
             self.observer.join()
-            self.watching = False
+            with self._cond:
+                self.watching = False
+                self._cond.notify_all()
+            if self._flusher:
+                self._flusher.join()
+                self._flusher = None
+            self.flush()
             print("Stopped watching")
     
     def _handle_change(self, path):
-        """Handle a file system change"""
-        for callback in self.callbacks:
-            try:
-                callback(path)
-            except Exception as e:
-                print(f"Error in change callback: {e}")
+        """Handle a file system change (mis en attente, livré groupé par pack)"""
+        root = self.root or Path(settings.ASSETS_DIR)
+        try:
+            parts = Path(path).relative_to(root).parts
+        except ValueError:
+            return
+        if not parts or any(is_temp_file(part) for part in parts):
+            return
+        if len(parts) == 1 and os.path.isfile(path):
+            # Fichier à la racine d'ASSETS_DIR, hors pack
+            return
+        pack_id = parts[0]
+        now = time.monotonic()
+        with self._cond:
+            pending = self._pending.get(pack_id)
+            if pending is None:
+                pending = self._pending[pack_id] = _PendingPack()
+            if len(parts) > 2:
+                pending.categories.add(parts[1])
+            pending.paths.add('/'.join(parts))
+            pending.events += 1
+            if self._first_event is None:
+                self._first_event = now
+            self._last_event = now
+            self._cond.notify_all()
+    
+    def _flush_loop(self):
+        """Thread de livraison : attend la fin d'une rafale puis appelle flush()."""
+        while True:
+            with self._cond:
+                while self.watching and self._first_event is None:
+                    self._cond.wait()
+                if not self.watching:
+                    return
+                now = time.monotonic()
+                deadline = min(self._last_event + self.quiet_period, self._first_event + self.max_delay)
+                if now < deadline:
+                    self._cond.wait(deadline - now)
+                    continue
+            self.flush()
+    
+    def flush(self):
+        """Livre immédiatement les changements en attente ; retourne les PackChangeSet livrés."""
+        with self._cond:
+            pending, self._pending = self._pending, {}
+            self._first_event = self._last_event = None
+        root = self.root or Path(settings.ASSETS_DIR)
+        change_sets = []
+        for pack_id, p in sorted(pending.items()):
+            change_sets.append(PackChangeSet(
+                pack_id=pack_id,
+                categories=frozenset(p.categories),
+                paths=frozenset(p.paths),
+                events=p.events,
+                deleted=not (root / pack_id).exists(),
+            ))
+        for change_set in change_sets:
+            if self.invalidate_caches:
+                try:
+                    from api.pack_cache import invalidate_pack
+                    invalidate_pack(change_set.pack_id)
+                except Exception as e:
+                    print(f"Error invalidating pack {change_set.pack_id}: {e}")
+            for callback in list(self.callbacks):
+                try:
+                    callback(change_set)
+                except Exception as e:
+                    print(f"Error in change callback: {e}")
+        return change_sets
     
     def add_callback(self, callback):
-        """Add a callback function to be called on changes"""
+        """Add a callback function called with one PackChangeSet per changed pack"""
         if callback not in self.callbacks:
             self.callbacks.append(callback)
+    
+    def remove_callback(self, callback):
+        """Remove a previously added callback"""
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
 
 
 # Global watcher instance
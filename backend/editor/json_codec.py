@@ -0,0 +1,70 @@
+"""
+Codec JSON partagé (MapManager, renderers DRF, scripts d'index).
+
+Utilise `orjson` s'il est installé (sérialisation / parsing en C, sortie UTF-8
+directe), sinon le module standard `json`. Les deux backends produisent le même
+JSON compact (séparateurs sans espaces, caractères non ASCII non échappés) ;
+`pretty=True` donne l'indentation à 2 espaces historique.
+
+Le backend peut être forcé via `settings.JSON_CODEC` (`'auto'` ou `'stdlib'`).
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+
+def _use_orjson():
+    if orjson is None:
+        return False
+    try:
+        from django.conf import settings
+        return getattr(settings, 'JSON_CODEC', 'auto') != 'stdlib'
+    except Exception:
+        return True
+
+
+def backend_name():
+    """Nom du backend actif ('orjson' ou 'stdlib')."""
+    return 'orjson' if _use_orjson() else 'stdlib'
+
+
+def dumps(obj, pretty=False):
+    """Sérialise obj en octets UTF-8 (compact par défaut)."""
+    if _use_orjson():
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # Types non gérés par orjson (entiers > 64 bits, objets exotiques) : repli stdlib
+            pass
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Désérialise des octets ou une chaîne JSON."""
+    if _use_orjson():
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return json.loads(data)
+
+
+def load_file(path):
+    """Lit et désérialise un fichier JSON."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump_file(path, obj, pretty=False):
+    """Sérialise obj dans un fichier (compact par défaut)."""
+    data = dumps(obj, pretty=pretty)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
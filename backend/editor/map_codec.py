@@ -0,0 +1,573 @@
+"""
+Encodage compact (binaire, versionné) des cartes.
+
+Les couches (`layers.tiles`, `layers.objects`, …) sont stockées en colonnes :
+chaque clé des éléments devient un tableau parallèle d'entiers (`x`, `y`,
+`rotation`) ou d'index dans une palette de chaînes partagée (`asset`, `type`).
+Les entiers sont écrits en varint zigzag, en différence avec l'élément
+précédent quand c'est plus court (coordonnées voisines). Les ids générés par
+le frontend (`tile_<Date.now()>_<aléatoire base36>`) sont découpés en trois
+colonnes : préfixe (palette), horodatage (différences) et suffixe (entier
+de largeur fixe).
+Les chemins d'assets répétés n'apparaissent donc qu'une fois par carte.
+Les data URLs base64 (capture `mission.mapImageDataUrl`) sont décodées et
+rangées en blobs binaires, compressés par zlib seulement si c'est nettement
+plus petit (une capture PNG/JPEG l'est déjà). La conversion est sans perte :
+ordre des clés, éléments atypiques (conservés tels quels) et valeurs inconnues
+compris.
+
+Taille mesurée (cartes de `maps/` sans capture, contre zlib niveau 6 du
+JSON compact) : `map_e05201dc88e4` (40 éléments) 1 431 -> 931 octets,
+`map_6a8e33dbdc1a` (11 éléments) 502 -> 282, 500 tuiles générées
+9 390 -> 5 134. Sur les petites cartes, l'essentiel du gain vient du
+dictionnaire deflate prédéfini (`_ZDICT`) ; à dictionnaire égal, les colonnes
+gagnent encore 10 à 20 % dès une dizaine d'éléments et font jeu égal en
+dessous (l'encodeur garde alors les couches en JSON, si c'est plus court).
+Avec la capture PNG de `map_2973a344f961`, le poids est celui de l'image,
+stockée en binaire plutôt qu'en base64 (1 851 041 octets de JSON,
+1 380 022 compacts). L'entête (nom, métadonnées) se lit sans décoder la
+capture (`decode_map_header`).
+
+Conteneur (varint : entier zigzag, 7 bits par octet) ::
+
+    b'ZMAP' | version u8 | varint taille | deflate brut(cœur, dictionnaire _ZDICT)
+    varint nb_blobs | (u8 codage | varint taille | octets) * nb_blobs
+
+    cœur = varint taille_entête | entête JSON | colonnes varint
+    entête = [carte, couches, palette, chemins des blobs]
+    codage = 0 (brut) ou 1 (zlib)
+
+`couches` vaut null quand elles sont restées dans la carte ; sinon chaque
+couche est [nom, valeur] ou [nom, nb, clés et types, éléments atypiques].
+Versions 1 et 2 (lecture seule) : tailles u32, 3 octets réservés après la
+version, cœur zlib à entête JSON objet, colonnes int32 / uint32 ; la version 1
+n'a pas l'octet de codage des blobs.
+"""
+import base64
+import binascii
+import re
+import struct
+import sys
+import zlib
+from array import array
+
+from . import json_codec
+
+MAGIC = b'ZMAP'
+FORMAT_VERSION = 3
+_READABLE_VERSIONS = (1, 2, 3)
+MEDIA_TYPE = 'application/x-zombicide-map'
+FILE_SUFFIX = '.zmap'
+
+_PREFIX = struct.Struct('<4sB3x')
+_U32 = struct.Struct('<I')
+_BLOB = struct.Struct('<BI')
+_BLOB_RAW = 0
+_BLOB_ZLIB = 1
+# Cœur des versions >= 3 : deflate brut (sans entête ni somme zlib)
+_RAW_DEFLATE = -15
+# Ids générés par le frontend : `tile_${Date.now()}_${Math.random().toString(36)…}`
+_GENERATED_ID_RE = re.compile(r'([A-Za-z]+)_([1-9][0-9]{0,17})_([0-9a-z]{1,12})')
+_BASE36 = '0123456789abcdefghijklmnopqrstuvwxyz'
+# Dictionnaire deflate prédéfini (versions >= 3) : clés et valeurs qu'ont toutes
+# les cartes de l'éditeur, pour que les petites cartes ne paient pas leur
+# première occurrence. Fait partie du format : ne jamais le modifier sans
+# changer de version.
+_ZDICT = (
+    b'"pack":null,"grid":{"width":10,"height":10,"tileSize":32},"layers":null,'
+    b'"gridOffsetX":-1854,"gridOffsetY":-1398,"mission":{"questCode":"","title":"",'
+    b'"authors":[],"difficulty":"","playerCount":"","estimatedDuration":"",'
+    b'"synopsis":"","objectives":[],"specialRules":[],"tilesUsed":[],'
+    b'"pageTheme":"classic","mapImageDataUrl":null},"metadata":{"created":"2026-'
+    b'T00:00:00.000000","modified":"2026-T00:00:00.000000","author":"temp"},"id":"map_'
+    b'[{"id":"tile_1776600000000_","x":0,"y":0,"asset":"G-Zombicide-/01.tiles/.png/r_0.png","rotation":0}]'
+    b'[{"type":"02.doors","asset":"G-Zombicide-/02.doors/.png/r_0.png","x":0,"y":0,"rotation":0,"id":"obj_1776600000000_"}]'
+    b'[["tiles",1,["id","g","x","d","y","d","asset","s","rotation","i"]],'
+    b'["objects",1,["type","s","asset","s","x","d","y","d","rotation","i","id","g"]]],'
+    b'["tile","G-Zombicide-/01.tiles/.png/r_0.png","obj","04.other tokens","G-Zombicide-/04.other tokens/'
+    b'[{"name":"'
+)
+
+
+class MapCodecError(ValueError):
+    """Conteneur compact invalide ou version non supportée."""
+
+
+def _column_kind(value):
+    """'i' pour un entier, 'g' pour un id généré, 's' pour une autre chaîne, None sinon."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return 'i'
+    if isinstance(value, str):
+        return 'g' if _GENERATED_ID_RE.fullmatch(value) else 's'
+    return None
+
+
+def _element_signature(element):
+    """Signature (clés ordonnées + type de colonne) d'un élément de couche."""
+    if not isinstance(element, dict):
+        return None
+    sig = []
+    for key, value in element.items():
+        kind = _column_kind(value)
+        if kind is None:
+            return None
+        sig.append((key, kind))
+    return tuple(sig)
+
+
+def _put_varint(out, value):
+    """Ajoute un entier signé à `out` (zigzag puis 7 bits par octet)."""
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varints(data, pos, count):
+    """Lit `count` entiers écrits par _put_varint ; retourne (liste, position suivante)."""
+    values = []
+    try:
+        for _ in range(count):
+            value = shift = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                value |= (byte & 0x7f) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            values.append(value >> 1 if not value & 1 else -(value >> 1) - 1)
+    except IndexError:
+        raise MapCodecError('truncated compact map')
+    return values, pos
+
+
+def _varint_column(values, delta=False):
+    """Colonne varint des valeurs, ou de leurs différences successives."""
+    col = bytearray()
+    previous = 0
+    for value in values:
+        _put_varint(col, value - previous)
+        if delta:
+            previous = value
+    return col
+
+
+def _int_column(values):
+    """(mode, octets) : valeurs brutes ('i') ou différences successives ('d'), la plus courte."""
+    plain = _varint_column(values)
+    delta = _varint_column(values, delta=True)
+    return ('d', delta) if len(delta) < len(plain) else ('i', plain)
+
+
+def _undelta(values):
+    total = 0
+    out = []
+    for value in values:
+        total += value
+        out.append(total)
+    return out
+
+
+def _suffix_width(length):
+    """Octets d'un suffixe base36 de `length` caractères stocké en entier."""
+    return ((36 ** length - 1).bit_length() + 7) // 8
+
+
+def _split_generated_id(value):
+    """'tile_1776606930129_8h7rcyw5y' -> ('tile', 1776606930129, '8h7rcyw5y')."""
+    prefix, stamp, suffix = _GENERATED_ID_RE.fullmatch(value).groups()
+    return prefix, int(stamp), suffix
+
+
+def _suffix_column(suffixes):
+    """Longueurs (varint) puis chaque suffixe en entier little-endian de largeur fixe."""
+    col = _varint_column([len(suffix) for suffix in suffixes])
+    for suffix in suffixes:
+        col += int(suffix, 36).to_bytes(_suffix_width(len(suffix)), 'little')
+    return col
+
+
+def _read_suffixes(data, pos, count):
+    lengths, pos = _read_varints(data, pos, count)
+    suffixes = []
+    for length in lengths:
+        width = _suffix_width(length)
+        if pos + width > len(data):
+            raise MapCodecError('truncated compact map')
+        number = int.from_bytes(data[pos:pos + width], 'little')
+        pos += width
+        digits = []
+        while number:
+            number, digit = divmod(number, 36)
+            digits.append(_BASE36[digit])
+        # Zéros de tête rétablis d'après la longueur
+        suffixes.append(''.join(reversed(digits)).rjust(length, '0'))
+    return suffixes, pos
+
+
+def _from_le_bytes(typecode, data):
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+
+def _split_data_url(value):
+    """Retourne (préfixe, octets) pour une data URL base64 canonique, sinon None."""
+    if not isinstance(value, str) or not value.startswith('data:'):
+        return None
+    head, sep, payload = value.partition(';base64,')
+    if not sep:
+        return None
+    try:
+        raw = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if base64.b64encode(raw).decode('ascii') != payload:
+        return None
+    return head + sep, raw
+
+
+def _extract_blobs(obj, path, out):
+    """Remplace les data URLs base64 par None et collecte (chemin, préfixe, octets)."""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if isinstance(value, str):
+                split = _split_data_url(value)
+                if split is not None:
+                    out.append((path + [key], split[0], split[1]))
+                    obj[key] = None
+            elif isinstance(value, (dict, list)):
+                _extract_blobs(value, path + [key], out)
+    elif isinstance(obj, list):
+        for i, value in enumerate(obj):
+            if isinstance(value, str):
+                split = _split_data_url(value)
+                if split is not None:
+                    out.append((path + [i], split[0], split[1]))
+                    obj[i] = None
+            elif isinstance(value, (dict, list)):
+                _extract_blobs(value, path + [i], out)
+
+
+def _deflate(header_doc, columns, level):
+    header_bytes = json_codec.dumps(header_doc)
+    core = bytearray()
+    _put_varint(core, len(header_bytes))
+    core += header_bytes
+    for col in columns:
+        core += col
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _RAW_DEFLATE, zdict=_ZDICT)
+    return compressor.compress(core) + compressor.flush()
+
+
+def encode_map(map_data, level=9):
+    """Encode un dict carte (forme JSON actuelle) en conteneur compact (bytes)."""
+    layers = map_data.get('layers')
+    columnar = isinstance(layers, dict)
+    # Les couches en colonnes laissent `layers: null` à leur place (ordre des clés)
+    header = {k: (None if k == 'layers' and columnar else v) for k, v in map_data.items()}
+    # Copie profonde : l'extraction des blobs remplace des valeurs en place
+    header = json_codec.loads(json_codec.dumps(header))
+    blobs = []
+    _extract_blobs(header, [], blobs)
+    blob_paths = [[path, prefix] for path, prefix, _ in blobs]
+
+    palette = []
+    palette_index = {}
+
+    def palette_column(values):
+        col = bytearray()
+        for value in values:
+            idx = palette_index.get(value)
+            if idx is None:
+                idx = palette_index[value] = len(palette)
+                palette.append(value)
+            _put_varint(col, idx)
+        return col
+
+    columns = []
+    layers_meta = None
+    if columnar:
+        layers_meta = []
+        for layer_name, elements in layers.items():
+            if not isinstance(elements, list) or not elements:
+                layers_meta.append([layer_name, elements])
+                continue
+            signatures = [_element_signature(e) for e in elements]
+            counts = {}
+            for sig in signatures:
+                if sig:
+                    counts[sig] = counts.get(sig, 0) + 1
+            template = max(counts, key=counts.get) if counts else None
+            rows = [elements[i] for i, sig in enumerate(signatures) if template and sig == template]
+            keys = []
+            for key, kind in (template or ()):
+                values = [element[key] for element in rows]
+                if kind == 'i':
+                    kind, col = _int_column(values)
+                    columns.append(col)
+                elif kind == 'g':
+                    parts = [_split_generated_id(value) for value in values]
+                    columns.append(palette_column([part[0] for part in parts]))
+                    columns.append(_varint_column([part[1] for part in parts], delta=True))
+                    columns.append(_suffix_column([part[2] for part in parts]))
+                else:
+                    columns.append(palette_column(values))
+                keys += [key, kind]
+            meta = [layer_name, len(elements), keys]
+            raw = {str(i): e for i, (e, sig) in enumerate(zip(elements, signatures)) if sig != template or not template}
+            if raw:
+                meta.append(raw)
+            layers_meta.append(meta)
+
+    compressed = _deflate([header, layers_meta, palette, blob_paths], columns, level)
+    if columnar and columns:
+        # Quelques éléments : la description des colonnes coûte plus que le JSON
+        # des couches, qui restent alors dans la carte
+        inline = dict(header, layers=layers)
+        inline_compressed = _deflate([inline, None, [], blob_paths], (), level)
+        if len(inline_compressed) <= len(compressed):
+            compressed = inline_compressed
+
+    return _pack_container(compressed, blobs, level)
+
+
+def _pack_container(compressed, blobs, level):
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _put_varint(out, len(compressed))
+    out += compressed
+    _put_varint(out, len(blobs))
+    for _, _, blob in blobs:
+        # Image déjà compressée : zlib ne gagne rien, le blob reste brut
+        packed = zlib.compress(blob, level)
+        if len(packed) < len(blob) * 0.95:
+            out.append(_BLOB_ZLIB)
+            blob = packed
+        else:
+            out.append(_BLOB_RAW)
+        _put_varint(out, len(blob))
+        out += blob
+    return bytes(out)
+
+
+def is_compact(data):
+    """True si `data` commence par l'en-tête du conteneur compact."""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:4]) == MAGIC
+
+
+def _read_prefix(data):
+    """Vérifie l'en-tête ; retourne (version, taille du cœur compressé, position du cœur)."""
+    if len(data) < 5:
+        raise MapCodecError('truncated compact map')
+    if bytes(data[:4]) != MAGIC:
+        raise MapCodecError('not a compact map container')
+    version = data[4]
+    if version not in _READABLE_VERSIONS:
+        raise MapCodecError(f'unsupported compact map version {version}')
+    if version >= 3:
+        (clen,), pos = _read_varints(data, 5, 1)
+        return version, clen, pos
+    if len(data) < _PREFIX.size + 4:
+        raise MapCodecError('truncated compact map')
+    (clen,) = _U32.unpack_from(data, _PREFIX.size)
+    return version, clen, _PREFIX.size + 4
+
+
+def _decompressobj(version):
+    if version >= 3:
+        return zlib.decompressobj(_RAW_DEFLATE, zdict=_ZDICT)
+    return zlib.decompressobj()
+
+
+def _header_span(version, core):
+    """(début, fin) de l'entête JSON dans le cœur ; MapCodecError s'il est incomplet."""
+    if version >= 3:
+        (hlen,), pos = _read_varints(core, 0, 1)
+    else:
+        if len(core) < 4:
+            raise MapCodecError('truncated compact map')
+        (hlen,) = _U32.unpack_from(core, 0)
+        pos = 4
+    if len(core) < pos + hlen:
+        raise MapCodecError('truncated compact map')
+    return pos, pos + hlen
+
+
+def decode_map_header(data):
+    """
+    Champs hors couches d'un conteneur compact (nom, métadonnées, mission…),
+    sans décoder les colonnes ni les blobs : les data URLs extraites valent None.
+    `data` peut n'être qu'un préfixe du fichier tant qu'il contient l'entête.
+    """
+    data = memoryview(data)
+    version, clen, pos = _read_prefix(data)
+    # Décompression partielle : on s'arrête dès que l'entête JSON est disponible
+    decomp = _decompressobj(version)
+    core = b''
+    compressed = data[pos:pos + clen]
+    step = 64 * 1024
+    offset = 0
+    try:
+        while True:
+            try:
+                start, end = _header_span(version, core)
+                break
+            except MapCodecError:
+                if offset >= len(compressed):
+                    raise
+            core += decomp.decompress(compressed[offset:offset + step])
+            offset += step
+    except zlib.error as e:
+        raise MapCodecError(f'corrupted compact map: {e}')
+    header_doc = json_codec.loads(core[start:end])
+    if version < 3:
+        return header_doc['map']
+    header, layers_meta = header_doc[0], header_doc[1]
+    if layers_meta is None and not isinstance(header.get('layers'), dict):
+        return header
+    return {k: v for k, v in header.items() if k != 'layers'}
+
+
+def _decode_layers(layers_meta, palette, core, cpos):
+    """Couches d'un cœur version 3 (colonnes varint)."""
+    layers = {}
+    for meta in layers_meta:
+        if len(meta) == 2:
+            layers[meta[0]] = meta[1]
+            continue
+        name, count, keys = meta[:3]
+        raw = meta[3] if len(meta) > 3 else {}
+        n_rows = count - len(raw)
+        cols = []
+        for key, kind in zip(keys[::2], keys[1::2]):
+            values, cpos = _read_varints(core, cpos, n_rows)
+            if kind == 'd':
+                values = _undelta(values)
+            elif kind == 's':
+                values = [palette[i] for i in values]
+            elif kind == 'g':
+                stamps, cpos = _read_varints(core, cpos, n_rows)
+                suffixes, cpos = _read_suffixes(core, cpos, n_rows)
+                values = [
+                    f'{palette[p]}_{stamp}_{suffix}'
+                    for p, stamp, suffix in zip(values, _undelta(stamps), suffixes)
+                ]
+            cols.append((key, values))
+        layers[name] = _merge_rows(count, raw, cols)
+    return layers
+
+
+def _decode_layers_v2(header_doc, core, cpos):
+    """Couches d'un cœur version 1 ou 2 (colonnes int32 / uint32)."""
+    palette = header_doc['palette']
+    layers = {}
+    for meta in header_doc['layers']:
+        if 'value' in meta:
+            layers[meta['name']] = meta['value']
+            continue
+        n_rows = meta['rows']
+        cols = []
+        for key, kind in meta['keys']:
+            size = 4 * n_rows
+            arr = _from_le_bytes('i' if kind == 'i' else 'I', core[cpos:cpos + size])
+            cpos += size
+            if kind == 's':
+                arr = [palette[i] for i in arr]
+            cols.append((key, arr))
+        layers[meta['name']] = _merge_rows(meta['count'], meta['raw'], cols)
+    return layers
+
+
+def _merge_rows(count, raw, cols):
+    """Éléments d'une couche : lignes des colonnes, éléments atypiques à leur index."""
+    elements = []
+    row = 0
+    for i in range(count):
+        if str(i) in raw:
+            elements.append(raw[str(i)])
+            continue
+        elements.append({key: col[row] for key, col in cols})
+        row += 1
+    return elements
+
+
+def _restore_blobs(header, blob_paths, blobs):
+    for (path, prefix), raw in zip(blob_paths, blobs):
+        target = header
+        for step in path[:-1]:
+            target = target[step]
+        target[path[-1]] = prefix + base64.b64encode(raw).decode('ascii')
+
+
+def decode_map(data):
+    """Décode un conteneur compact vers le dict carte JSON d'origine."""
+    data = memoryview(data)
+    version, clen, pos = _read_prefix(data)
+    try:
+        decomp = _decompressobj(version)
+        core = decomp.decompress(data[pos:pos + clen]) + decomp.flush()
+    except zlib.error as e:
+        raise MapCodecError(f'corrupted compact map: {e}')
+    if pos + clen > len(data):
+        raise MapCodecError('truncated compact map')
+    pos += clen
+    if version >= 3:
+        (n_blobs,), pos = _read_varints(data, pos, 1)
+    else:
+        (n_blobs,) = _U32.unpack_from(data, pos)
+        pos += 4
+    blobs = []
+    for _ in range(n_blobs):
+        if version == 1:
+            codec = _BLOB_RAW
+            (blen,) = _U32.unpack_from(data, pos)
+            pos += 4
+        elif version == 2:
+            codec, blen = _BLOB.unpack_from(data, pos)
+            pos += _BLOB.size
+        else:
+            if pos >= len(data):
+                raise MapCodecError('truncated compact map')
+            codec = data[pos]
+            (blen,), pos = _read_varints(data, pos + 1, 1)
+        if pos + blen > len(data):
+            raise MapCodecError('truncated compact map')
+        blob = bytes(data[pos:pos + blen])
+        pos += blen
+        if codec == _BLOB_ZLIB:
+            try:
+                blob = zlib.decompress(blob)
+            except zlib.error as e:
+                raise MapCodecError(f'corrupted compact map: {e}')
+        elif codec != _BLOB_RAW:
+            raise MapCodecError(f'unknown blob encoding {codec}')
+        blobs.append(blob)
+
+    start, cpos = _header_span(version, core)
+    header_doc = json_codec.loads(core[start:cpos])
+    if version >= 3:
+        header, layers_meta, palette, blob_paths = header_doc
+        _restore_blobs(header, blob_paths, blobs)
+        if layers_meta is not None:
+            header['layers'] = _decode_layers(layers_meta, palette, core, cpos)
+        return header
+
+    header = header_doc['map']
+    _restore_blobs(header, header_doc['blobs'], blobs)
+    layers = None
+    if header_doc['layers'] is not None:
+        layers = _decode_layers_v2(header_doc, core, cpos)
+    out = {}
+    for key in header_doc['keyOrder']:
+        if key == 'layers':
+            out[key] = layers if layers is not None else header.get('layers')
+        else:
+            out[key] = header[key]
+    return out
@@ -0,0 +1,138 @@
+"""
+Export en masse des cartes, en flux (NDJSON ou ZIP).
+
+Les cartes sont lues une par une sous `USERS_DIR/<user>/maps` et émises dès
+qu'elles sont prêtes : la mémoire reste celle d'une carte, quel que soit le
+nombre de cartes exportées (réponse `StreamingHttpResponse` ou fichier).
+
+  - NDJSON : une ligne `{"username", "id", "map"}` par carte ;
+  - ZIP : une entrée `<username>/<id>.json` par carte (voir `streaming_zip`).
+    Un fichier .json exporté tel quel est copié par morceaux, sans décodage.
+
+Filtres : utilisateurs, intervalle sur `metadata.modified` ; `exclude_images`
+retire les captures en data URL (`mission.mapImageDataUrl`), souvent la plus
+grosse partie d'une carte.
+"""
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+from . import json_codec
+from .map_manager import JSON_SUFFIX, iter_map_files, read_map_file
+from .streaming_zip import iter_zip
+from .user_manager import check_name
+
+FORMATS = ('ndjson', 'zip')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'zip': 'application/zip'}
+
+
+def parse_date(value):
+    """Date ISO 8601 (ex. '2025-01-31' ou '2025-01-31T12:00:00'), None si vide ; ValueError sinon."""
+    if not value:
+        return None
+    try:
+        date = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+    # metadata.modified est écrit en heure locale naïve
+    return date.astimezone().replace(tzinfo=None) if date.tzinfo else date
+
+
+def _map_modified(map_data):
+    metadata = map_data.get('metadata') if isinstance(map_data, dict) else None
+    try:
+        return parse_date((metadata or {}).get('modified'))
+    except ValueError:
+        return None
+
+
+def strip_images(map_data):
+    """Copie de la carte sans les captures en data URL (le reste est partagé, non copié)."""
+    mission = map_data.get('mission')
+    if not isinstance(mission, dict):
+        return map_data
+    images = [k for k, v in mission.items() if isinstance(v, str) and v.startswith('data:image/')]
+    if not images:
+        return map_data
+    return {**map_data, 'mission': {k: (None if k in images else v) for k, v in mission.items()}}
+
+
+class MapExporter:
+    """Sélection et sérialisation en flux des cartes à exporter"""
+
+    def __init__(self, users=None, since=None, until=None, exclude_images=False):
+        """users : liste de noms (None : tous) ; since / until : datetime ou chaîne ISO."""
+        # Noms utilisés comme segments de chemin sous USERS_DIR : pas de traversal
+        self.users = [check_name(u, 'username') for u in users] if users else None
+        self.since = parse_date(since) if isinstance(since, str) else since
+        self.until = parse_date(until) if isinstance(until, str) else until
+        self.exclude_images = exclude_images
+        self.exported = 0
+        self.errors = 0
+
+    def _usernames(self):
+        users_dir = Path(settings.USERS_DIR)
+        if self.users is not None:
+            root = users_dir.resolve()
+            return [
+                u for u in self.users
+                if (users_dir / u / 'maps').is_dir() and (users_dir / u).resolve().parent == root
+            ]
+        if not users_dir.exists():
+            return []
+        return sorted(p.name for p in users_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+    def _is_selected(self, map_data):
+        if self.since is None and self.until is None:
+            return True
+        modified = _map_modified(map_data)
+        if modified is None:
+            return False
+        if self.since is not None and modified < self.since:
+            return False
+        if self.until is not None and modified > self.until:
+            return False
+        return True
+
+    def iter_maps(self):
+        """(username, map_id, fichier, carte) des cartes sélectionnées, une à la fois."""
+        users_dir = Path(settings.USERS_DIR)
+        for username in self._usernames():
+            for map_file in sorted(iter_map_files(users_dir / username / 'maps')):
+                try:
+                    map_data = read_map_file(map_file)
+                except Exception as e:
+                    print(f"Error exporting map file {map_file}: {e}")
+                    self.errors += 1
+                    continue
+                if not self._is_selected(map_data):
+                    continue
+                if self.exclude_images:
+                    map_data = strip_images(map_data)
+                self.exported += 1
+                yield username, map_file.stem, map_file, map_data
+
+    def iter_ndjson(self):
+        """Lignes NDJSON (octets), une par carte."""
+        for username, map_id, _, map_data in self.iter_maps():
+            yield json_codec.dumps({'username': username, 'id': map_id, 'map': map_data}) + b'\n'
+
+    def _zip_entries(self):
+        for username, map_id, map_file, map_data in self.iter_maps():
+            name = f'{username}/{map_id}.json'
+            if map_file.suffix == JSON_SUFFIX and not self.exclude_images:
+                # Contenu inchangé : copie du fichier par morceaux
+                yield name, map_file
+            else:
+                yield name, json_codec.dumps(map_data)
+
+    def iter_zip(self):
+        """Archive ZIP (morceaux d'octets)."""
+        return (chunk for chunk in iter_zip(self._zip_entries()) if chunk)
+
+    def stream(self, fmt):
+        """Générateur d'octets au format 'ndjson' ou 'zip'."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+        return self.iter_zip() if fmt == 'zip' else self.iter_ndjson()
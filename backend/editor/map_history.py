@@ -0,0 +1,338 @@
+"""
+Historique des révisions des cartes, côté serveur, compressé par deltas.
+
+Chaque enregistrement par `MapManager` ajoute une révision dans
+`USERS_DIR/<user>/history/<map_id>/` :
+  - `<rev>.delta` : différence avec la révision précédente (JSON zlib) ;
+  - `<rev>.snap`  : carte complète (JSON zlib), toutes les
+    `MAP_HISTORY_SNAPSHOT_INTERVAL` révisions ou quand le delta n'est pas
+    nettement plus petit que la carte ;
+  - `index.json`  : liste des révisions (numéro, type, date, taille).
+
+Le delta est structurel : dictionnaires clé par clé, listes (éléments des
+couches) par blocs copiés de l'ancienne liste / éléments insérés, calculés
+par `difflib` sur l'empreinte de chaque élément. Une sauvegarde qui déplace
+quelques tuiles d'une carte de 2 Mo (capture en data URL comprise) coûte
+quelques centaines d'octets.
+
+Lire une révision : dernier snapshot <= rev, puis deltas successifs. La
+rétention (`MAP_HISTORY_MAX_REVISIONS`, `MAP_HISTORY_MAX_AGE_DAYS`,
+`MAP_HISTORY_MAX_BYTES` par carte) supprime les plus anciennes révisions
+après chaque ajout ; la plus ancienne conservée devient un snapshot.
+"""
+import difflib
+import os
+import shutil
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+
+from . import json_codec
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+_LIST_DELTA_MIN_LENGTH = 8
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'MAP_HISTORY_ENABLED', True)
+
+
+def _thread_lock(username, map_id):
+    with _locks_guard:
+        lock = _locks.get((username, map_id))
+        if lock is None:
+            lock = _locks[(username, map_id)] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def _lock(username, map_id):
+    """
+    Verrou exclusif de l'historique d'une carte : threads du processus puis
+    autres processus (flock sur `history/<map_id>/.lock`, dossier créé).
+    """
+    history_dir = get_history_dir(username, map_id)
+    with _thread_lock(username, map_id):
+        history_dir.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        lock_path = history_dir / '.lock'
+        while True:
+            lock_file = open(lock_path, 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # delete_history a pu supprimer le dossier pendant l'attente :
+            # le verrou obtenu porte alors sur un fichier qui n'existe plus
+            try:
+                current = os.stat(lock_path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(lock_file.fileno()).st_ino:
+                break
+            lock_file.close()
+            history_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+
+def get_history_dir(username, map_id):
+    return Path(settings.USERS_DIR) / username / 'history' / map_id
+
+
+# --- Deltas -------------------------------------------------------------------
+
+def _list_delta(old, new):
+    """Opérations ['c', début, fin] (copie de old) / ['i', [éléments]] (insertion)."""
+    old_keys = [json_codec.dumps(v) for v in old]
+    new_keys = [json_codec.dumps(v) for v in new]
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(['c', i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(['i', new[j1:j2]])
+    return {'l': ops}
+
+
+def compute_delta(old, new):
+    """Delta de old vers new (dictionnaires) : {'s': {clé: valeur}, 'd': [clés], 'p': {clé: delta}}."""
+    delta = {}
+    for key, value in new.items():
+        if key not in old:
+            delta.setdefault('s', {})[key] = value
+            continue
+        previous = old[key]
+        if previous == value:
+            continue
+        if isinstance(previous, dict) and isinstance(value, dict):
+            delta.setdefault('p', {})[key] = compute_delta(previous, value)
+        elif isinstance(previous, list) and isinstance(value, list) and len(previous) >= _LIST_DELTA_MIN_LENGTH:
+            delta.setdefault('p', {})[key] = _list_delta(previous, value)
+        else:
+            delta.setdefault('s', {})[key] = value
+    removed = [key for key in old if key not in new]
+    if removed:
+        delta['d'] = removed
+    return delta
+
+
+def apply_delta(old, delta):
+    """Applique un delta ; retourne un nouvel objet (old n'est pas modifié, les parties inchangées sont partagées)."""
+    if 'l' in delta:
+        result = []
+        for op in delta['l']:
+            if op[0] == 'c':
+                result.extend(old[op[1]:op[2]])
+            else:
+                result.extend(op[1])
+        return result
+    result = dict(old)
+    for key in delta.get('d', ()):
+        result.pop(key, None)
+    for key, sub_delta in delta.get('p', {}).items():
+        result[key] = apply_delta(old[key], sub_delta)
+    result.update(delta.get('s', {}))
+    return result
+
+
+# --- Stockage -----------------------------------------------------------------
+
+def _rev_file(history_dir, entry):
+    suffix = 'snap' if entry['kind'] == 'snapshot' else 'delta'
+    return history_dir / f"{entry['rev']:06d}.{suffix}"
+
+
+def _read_index(history_dir):
+    try:
+        return json_codec.load_file(history_dir / 'index.json')
+    except (OSError, ValueError):
+        return {'revisions': []}
+
+
+def _write_index(history_dir, index):
+    tmp = history_dir / 'index.json.tmp'
+    json_codec.dump_file(tmp, index)
+    os.replace(tmp, history_dir / 'index.json')
+
+
+def _write_blob(path, obj):
+    data = zlib.compress(json_codec.dumps(obj), 6)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def _read_blob(path):
+    return json_codec.loads(zlib.decompress(path.read_bytes()))
+
+
+def _materialize(history_dir, revisions, rev):
+    """Carte à la révision rev (dernier snapshot puis deltas)."""
+    position = next((i for i, e in enumerate(revisions) if e['rev'] == rev), None)
+    if position is None:
+        raise FileNotFoundError(f"Revision {rev} not found")
+    start = position
+    while revisions[start]['kind'] != 'snapshot':
+        start -= 1
+        if start < 0:
+            raise ValueError(f"History is missing a snapshot before revision {rev}")
+    map_data = _read_blob(_rev_file(history_dir, revisions[start]))
+    for entry in revisions[start + 1:position + 1]:
+        map_data = apply_delta(map_data, _read_blob(_rev_file(history_dir, entry)))
+    return map_data
+
+
+def _apply_retention(history_dir, index):
+    """Supprime les révisions les plus anciennes hors politique ; la première conservée devient snapshot."""
+    revisions = index['revisions']
+    max_revisions = getattr(settings, 'MAP_HISTORY_MAX_REVISIONS', 100)
+    max_age_days = getattr(settings, 'MAP_HISTORY_MAX_AGE_DAYS', None)
+    max_bytes = getattr(settings, 'MAP_HISTORY_MAX_BYTES', 20 * 1024 * 1024)
+
+    keep_from = 0
+    if max_revisions and len(revisions) > max_revisions:
+        keep_from = len(revisions) - max_revisions
+    if max_age_days:
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        while keep_from < len(revisions) - 1 and revisions[keep_from]['created'] < cutoff:
+            keep_from += 1
+    if max_bytes:
+        total = sum(e['size'] for e in revisions[keep_from:])
+        while keep_from < len(revisions) - 1 and total > max_bytes:
+            total -= revisions[keep_from]['size']
+            keep_from += 1
+    if keep_from == 0:
+        return
+
+    first = revisions[keep_from]
+    if first['kind'] != 'snapshot':
+        map_data = _materialize(history_dir, revisions, first['rev'])
+        delta_file = _rev_file(history_dir, first)
+        first['kind'] = 'snapshot'
+        first['size'] = _write_blob(_rev_file(history_dir, first), map_data)
+        delta_file.unlink(missing_ok=True)
+    for entry in revisions[:keep_from]:
+        _rev_file(history_dir, entry).unlink(missing_ok=True)
+    index['revisions'] = revisions[keep_from:]
+
+
+def record_revision(username, map_id, map_data):
+    """Ajoute la carte enregistrée comme nouvelle révision ; retourne son entrée (None si inchangée)."""
+    history_dir = get_history_dir(username, map_id)
+    with _lock(username, map_id):
+        index = _read_index(history_dir)
+        revisions = index['revisions']
+        entry = {
+            'rev': revisions[-1]['rev'] + 1 if revisions else 1,
+            'created': datetime.now().isoformat(),
+            'author': (map_data.get('metadata') or {}).get('author'),
+        }
+
+        delta = None
+        interval = getattr(settings, 'MAP_HISTORY_SNAPSHOT_INTERVAL', 20)
+        since_snapshot = next(
+            (i for i, e in enumerate(reversed(revisions)) if e['kind'] == 'snapshot'), None
+        )
+        if revisions and since_snapshot is not None and since_snapshot + 1 < interval:
+            try:
+                previous = _materialize(history_dir, revisions, revisions[-1]['rev'])
+            except (OSError, ValueError) as e:
+                print(f"Error reading history of map {map_id}: {e}")
+            else:
+                delta = compute_delta(previous, map_data)
+                if not delta:
+                    return None
+                # Delta pas nettement plus petit que la carte : snapshot
+                if len(json_codec.dumps(delta)) * 2 > len(json_codec.dumps(map_data)):
+                    delta = None
+
+        if delta is None:
+            entry['kind'] = 'snapshot'
+            entry['size'] = _write_blob(_rev_file(history_dir, entry), map_data)
+        else:
+            entry['kind'] = 'delta'
+            entry['size'] = _write_blob(_rev_file(history_dir, entry), delta)
+        revisions.append(entry)
+        _apply_retention(history_dir, index)
+        _write_index(history_dir, index)
+        return entry
+
+
+def delete_history(username, map_id):
+    """Supprime l'historique d'une carte supprimée."""
+    if not get_history_dir(username, map_id).exists():
+        return
+    with _lock(username, map_id):
+        shutil.rmtree(get_history_dir(username, map_id), ignore_errors=True)
+
+
+# --- Lecture --------------------------------------------------------------------
+
+def list_revisions(username, map_id):
+    """Révisions d'une carte, plus récentes d'abord : [{'rev', 'kind', 'created', 'author', 'size'}]."""
+    return list(reversed(_read_index(get_history_dir(username, map_id))['revisions']))
+
+
+def get_revision(username, map_id, rev):
+    """Carte complète à la révision rev (FileNotFoundError si inconnue ou supprimée)."""
+    history_dir = get_history_dir(username, map_id)
+    return _materialize(history_dir, _read_index(history_dir)['revisions'], rev)
+
+
+def _element_key(element, index):
+    if isinstance(element, dict) and element.get('id') is not None:
+        return element['id']
+    return f'#{index}'
+
+
+def summarize_changes(old, new):
+    """
+    Résumé lisible des différences : clés modifiées hors couches et, par
+    couche, ids des éléments ajoutés, supprimés et modifiés.
+    """
+    changed = sorted(
+        key for key in old.keys() | new.keys()
+        if key != 'layers' and old.get(key) != new.get(key)
+    )
+    old_layers = old.get('layers') if isinstance(old.get('layers'), dict) else {}
+    new_layers = new.get('layers') if isinstance(new.get('layers'), dict) else {}
+    layers = {}
+    for name in sorted(old_layers.keys() | new_layers.keys()):
+        before = {_element_key(e, i): e for i, e in enumerate(old_layers.get(name) or [])}
+        after = {_element_key(e, i): e for i, e in enumerate(new_layers.get(name) or [])}
+        summary = {
+            'added': [k for k in after if k not in before],
+            'removed': [k for k in before if k not in after],
+            'modified': [k for k in after if k in before and before[k] != after[k]],
+        }
+        if any(summary.values()):
+            layers[name] = summary
+    return {'changed': changed, 'layers': layers}
+
+
+def diff_revisions(username, map_id, from_rev, to_rev):
+    """Différences entre deux révisions : résumé et delta structurel."""
+    history_dir = get_history_dir(username, map_id)
+    revisions = _read_index(history_dir)['revisions']
+    old = _materialize(history_dir, revisions, from_rev)
+    new = _materialize(history_dir, revisions, to_rev)
+    result = {'from': from_rev, 'to': to_rev}
+    result.update(summarize_changes(old, new))
+    result['delta'] = compute_delta(old, new)
+    return result
@@ -0,0 +1,195 @@
+"""
+Import en masse de cartes (NDJSON ou ZIP), en parallèle et par lots.
+
+Entrées acceptées :
+  - NDJSON : une carte par ligne, soit la carte seule, soit l'enveloppe
+    `{"username", "id", "map"}` produite par `map_export` ;
+  - ZIP : fichiers `.json` ou `.zmap` ; `<username>/<id>.json` (forme de
+    l'export) donne l'utilisateur, sinon l'utilisateur par défaut est pris.
+
+Les éléments sont lus en flux et traités par fenêtres de `batch_size` :
+décodage, normalisation (id, métadonnées), validation des assets et
+encodage au format de stockage se font dans un pool de threads ; l'écriture
+(`MapManager.write_maps` : fichiers, index des utilisations en une transaction
+par lot, historique, événements) se fait ensuite dans le thread appelant. La
+mémoire reste bornée par un lot, et chaque élément reçoit son résultat
+(`created`, `replaced`, `skipped`, `invalid` ou `error`).
+"""
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import PurePosixPath
+
+from . import json_codec
+from .map_codec import FILE_SUFFIX as COMPACT_SUFFIX, decode_map, encode_map
+from .map_manager import MAP_SUFFIXES, MapManager, get_storage_format
+from .user_manager import UserManager, check_name
+
+ON_CONFLICT = ('skip', 'replace', 'new')
+VALIDATE_MODES = ('off', 'report', 'strict')
+_ZIP_MAGIC = b'PK\x03\x04'
+
+
+def is_zip(fileobj):
+    """True si le fichier (seekable) commence par une signature ZIP ; la position est restaurée."""
+    pos = fileobj.tell()
+    head = fileobj.read(4)
+    fileobj.seek(pos)
+    return head == _ZIP_MAGIC
+
+
+def iter_ndjson_items(fileobj):
+    """(source, username, id, kind, octets) par ligne non vide ; le JSON est décodé plus tard (workers)."""
+    for line_no, line in enumerate(fileobj, 1):
+        line = line.strip()
+        if line:
+            yield f'line {line_no}', None, None, 'ndjson', line
+
+
+def iter_zip_items(fileobj):
+    """(source, username, id, kind, octets) par fichier carte de l'archive, lu au fil de l'itération."""
+    with zipfile.ZipFile(fileobj) as zf:
+        for info in zf.infolist():
+            path = PurePosixPath(info.filename)
+            if info.is_dir() or path.suffix not in MAP_SUFFIXES or any(p.startswith('.') for p in path.parts):
+                continue
+            # users/<u>/maps/<id>.json (arborescence USERS_DIR) ou <u>/<id>.json (export)
+            parts = path.parts[:-1]
+            if len(parts) >= 3 and parts[-1] == 'maps':
+                username = parts[-2]
+            elif len(parts) == 1:
+                username = parts[0]
+            else:
+                username = None
+            kind = 'zmap' if path.suffix == COMPACT_SUFFIX else 'json'
+            yield info.filename, username, path.stem, kind, zf.read(info)
+
+
+class MapImporter:
+    """Import en masse : préparation parallèle, écriture par lots, résultat par élément"""
+
+    def __init__(self, default_user=UserManager.DEFAULT_USER, on_conflict='skip', validate='off',
+                 workers=8, batch_size=200, validator=None):
+        """
+        validator : fonction map_data -> rapport de validation ({'valid', …}),
+        obligatoire si validate n'est pas 'off' (ex. `api.map_validation.map_validator()`).
+        """
+        if on_conflict not in ON_CONFLICT:
+            raise ValueError(f"on_conflict must be one of {', '.join(ON_CONFLICT)}")
+        if validate not in VALIDATE_MODES:
+            raise ValueError(f"validate must be one of {', '.join(VALIDATE_MODES)}")
+        if validate != 'off' and validator is None:
+            raise ValueError("a validator is required unless validate is 'off'")
+        self.default_user = check_name(default_user, 'username')
+        self.on_conflict = on_conflict
+        self.validate = validate
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.compact = get_storage_format() == 'compact'
+        self._validator = validator if validate != 'off' else None
+        self._managers = {}
+
+    def _prepare(self, item):
+        """Décode, normalise, valide et encode un élément (exécuté dans le pool)."""
+        index, (source, username, map_id, kind, data) = item
+        result = {'index': index, 'source': source}
+        try:
+            if kind == 'zmap':
+                map_data = decode_map(data)
+            else:
+                map_data = json_codec.loads(data)
+            if kind == 'ndjson' and isinstance(map_data, dict) and isinstance(map_data.get('map'), dict):
+                username = map_data.get('username') or username
+                map_id = map_data.get('id') or map_id
+                map_data = map_data['map']
+            if not isinstance(map_data, dict):
+                raise ValueError("Map data must be an object")
+            if 'layers' in map_data and not isinstance(map_data['layers'], dict):
+                raise ValueError("layers must be an object")
+
+            username = check_name(username or self.default_user, 'username')
+            map_id = check_name(map_data.get('id') or map_id or f"map_{uuid.uuid4().hex[:12]}", 'map id')
+            now = datetime.now().isoformat()
+            metadata = map_data.get('metadata')
+            metadata = dict(metadata) if isinstance(metadata, dict) else {}
+            # Dates d'origine conservées (import depuis une autre instance)
+            metadata.setdefault('created', now)
+            metadata.setdefault('modified', metadata['created'])
+            metadata['author'] = username
+            map_data['id'] = map_id
+            map_data['metadata'] = metadata
+            result.update(username=username, id=map_id)
+
+            if self._validator is not None:
+                report = self._validator(map_data)
+                result['validation'] = report
+                if self.validate == 'strict' and not report['valid']:
+                    result['status'] = 'invalid'
+                    return result, None
+            encoded = encode_map(map_data) if self.compact else json_codec.dumps(map_data)
+            return result, (map_data, encoded)
+        except Exception as e:
+            result.update(status='error', error=str(e))
+            return result, None
+
+    def _manager(self, username):
+        manager = self._managers.get(username)
+        if manager is None:
+            UserManager.ensure_user(username)
+            manager = self._managers[username] = MapManager(username)
+        return manager
+
+    def _write_batch(self, prepared):
+        """Écrit un lot préparé (MapManager.write_maps par utilisateur) ; retourne les résultats dans l'ordre d'entrée."""
+        results = []
+        by_user = {}
+        for result, payload in prepared:
+            results.append(result)
+            if payload is not None:
+                by_user.setdefault(result['username'], []).append((result, *payload))
+        for username, items in by_user.items():
+            try:
+                manager = self._manager(username)
+            except Exception as e:
+                for result, _, _ in items:
+                    result.update(status='error', error=str(e))
+                continue
+            written = manager.write_maps(
+                [(result['id'], map_data, encoded) for result, map_data, encoded in items],
+                on_conflict=self.on_conflict,
+            )
+            for (result, _, _), (map_id, status, error) in zip(items, written):
+                result.update(id=map_id, status=status)
+                if error is not None:
+                    result['error'] = error
+        return results
+
+    def run(self, items):
+        """
+        Importe un itérable d'éléments (voir iter_ndjson_items / iter_zip_items).
+
+        Retourne {'created', 'replaced', 'skipped', 'invalid', 'errors', 'results'}.
+        """
+        results = []
+        batch = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for item in enumerate(items):
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    results.extend(self._write_batch(pool.map(self._prepare, batch)))
+                    batch = []
+            if batch:
+                results.extend(self._write_batch(pool.map(self._prepare, batch)))
+
+        summary = {'created': 0, 'replaced': 0, 'skipped': 0, 'invalid': 0, 'errors': 0}
+        for result in results:
+            key = 'errors' if result['status'] == 'error' else result['status']
+            summary[key] += 1
+        summary['results'] = results
+        return summary
+
+    def import_file(self, fileobj):
+        """Importe un fichier ouvert en binaire (seekable) : ZIP détecté par signature, NDJSON sinon."""
+        items = iter_zip_items(fileobj) if is_zip(fileobj) else iter_ndjson_items(fileobj)
+        return self.run(items)
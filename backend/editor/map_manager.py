@@ -1,23 +1,196 @@
 """
 Map manager for saving/loading maps as JSON files
 """
-import json
+import hashlib
 import os
 from pathlib import Path
 from django.conf import settings
 from .utils import ensure_directory
+from . import json_codec, map_history, map_usage_index
+from .map_codec import FILE_SUFFIX as COMPACT_SUFFIX, MapCodecError, decode_map, decode_map_header, encode_map
 import uuid
 from datetime import datetime
 
+JSON_SUFFIX = '.json'
+MAP_SUFFIXES = (JSON_SUFFIX, COMPACT_SUFFIX)
+
+
+def _ignore_map_change(username, map_id, version, action):
+    pass
+
+
+def _ignore_fs(component, op, count=1, bytes_read=0):
+    pass
+
+
+# Crochets par défaut, branchés par l'application qui sert l'éditeur
+# (api.apps.ApiConfig.ready : événements SSE et compteurs de métriques)
+_hooks = {'publish': _ignore_map_change, 'record_fs': _ignore_fs}
+
+
+def set_hooks(publish=None, record_fs=None):
+    """
+    Remplace les crochets par défaut : publish(username, map_id, version, action)
+    à chaque carte créée / modifiée / supprimée, record_fs(component, op, count,
+    bytes_read) à chaque accès disque.
+    """
+    if publish is not None:
+        _hooks['publish'] = publish
+    if record_fs is not None:
+        _hooks['record_fs'] = record_fs
+
+
+def record_fs(component, op, count=1, bytes_read=0):
+    """Compte un accès disque via le crochet courant."""
+    _hooks['record_fs'](component, op, count, bytes_read)
+
+
+def publish_map_change(username, map_id, version, action):
+    """Publie un changement de carte via le crochet courant."""
+    _hooks['publish'](username, map_id, version, action)
+
+
+def get_storage_format():
+    """Format d'écriture des cartes : 'json' (défaut) ou 'compact' (settings.MAP_STORAGE_FORMAT)."""
+    fmt = getattr(settings, 'MAP_STORAGE_FORMAT', 'json')
+    return 'compact' if fmt == 'compact' else 'json'
+
+
+def iter_map_files(maps_dir):
+    """Fichiers carte d'un dossier (.json et .zmap ; un seul fichier par id, .zmap prioritaire)."""
+    maps_dir = Path(maps_dir)
+    if not maps_dir.exists():
+        return []
+    record_fs('map_manager', 'listdir', len(MAP_SUFFIXES))
+    by_id = {}
+    for suffix in MAP_SUFFIXES:
+        for map_file in maps_dir.glob(f'*{suffix}'):
+            by_id[map_file.stem] = map_file
+    return list(by_id.values())
+
+
+def file_version(path):
+    """Version d'un fichier (mtime + taille, hexadécimal), ou None s'il n'existe pas."""
+    record_fs('map_manager', 'stat')
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def read_map_file(map_file):
+    """Lit un fichier carte, JSON ou conteneur compact."""
+    map_file = Path(map_file)
+    data = map_file.read_bytes()
+    record_fs('map_manager', 'open', bytes_read=len(data))
+    if map_file.suffix == COMPACT_SUFFIX:
+        return decode_map(data)
+    return json_codec.loads(data)
+
+
+def read_map_header(map_file, keys=('name', 'metadata')):
+    """
+    Champs d'en-tête d'une carte (hors couches). Un conteneur compact n'est
+    décompressé que jusqu'à son entête ; un JSON est décodé par json_codec
+    (orjson décode une carte entière plus vite qu'un scanner Python ne la saute).
+    """
+    map_file = Path(map_file)
+    if map_file.suffix == COMPACT_SUFFIX:
+        with open(map_file, 'rb') as f:
+            data = f.read(256 * 1024)
+            try:
+                header = decode_map_header(data)
+            except MapCodecError:
+                data += f.read()
+                header = decode_map_header(data)
+        record_fs('map_manager', 'open', bytes_read=len(data))
+    else:
+        header = read_map_file(map_file)
+    return {k: header[k] for k in keys if k in header}
+
 
 class MapManager:
     """Manage map files (JSON) for users"""
     
-    def __init__(self, username='temp'):
+    def __init__(self, username='temp', publish=None):
+        """publish : crochet de publication des changements (défaut : celui de set_hooks)."""
         self.username = username
         self.user_maps_dir = Path(settings.USERS_DIR) / username / 'maps'
+        self._publish = publish
         ensure_directory(self.user_maps_dir)
     
+    def _publish_change(self, map_id, version, action):
+        publish = self._publish or publish_map_change
+        try:
+            publish(self.username, map_id, version, action)
+        except Exception as e:
+            print(f"Error publishing change for map {map_id}: {e}")
+    
+    def _map_file(self, map_id):
+        """Fichier existant de la carte (compact prioritaire), sinon chemin au format courant."""
+        compact_file = self.user_maps_dir / f"{map_id}{COMPACT_SUFFIX}"
+        json_file = self.user_maps_dir / f"{map_id}{JSON_SUFFIX}"
+        record_fs('map_manager', 'stat')
+        if compact_file.exists():
+            return compact_file
+        record_fs('map_manager', 'stat')
+        if json_file.exists():
+            return json_file
+        return compact_file if get_storage_format() == 'compact' else json_file
+    
+    def _exists(self, map_id):
+        """True si la carte existe dans l'un des formats."""
+        record_fs('map_manager', 'stat', len(MAP_SUFFIXES))
+        return any((self.user_maps_dir / f"{map_id}{suffix}").exists() for suffix in MAP_SUFFIXES)
+    
+    def _write_map_file(self, map_id, map_data, encoded=None):
+        """
+        Écrit la carte au format courant (remplacement atomique) et supprime
+        l'éventuel fichier dans l'autre format. encoded : octets déjà encodés
+        au format courant (import en masse), sinon encodés ici.
+        """
+        if get_storage_format() == 'compact':
+            map_file = self.user_maps_dir / f"{map_id}{COMPACT_SUFFIX}"
+            stale_file = self.user_maps_dir / f"{map_id}{JSON_SUFFIX}"
+            if encoded is None:
+                encoded = encode_map(map_data)
+        else:
+            map_file = self.user_maps_dir / f"{map_id}{JSON_SUFFIX}"
+            stale_file = self.user_maps_dir / f"{map_id}{COMPACT_SUFFIX}"
+            if encoded is None:
+                encoded = json_codec.dumps(map_data)
+        tmp_file = map_file.with_name(f".{map_file.name}.tmp")
+        tmp_file.write_bytes(encoded)
+        os.replace(tmp_file, map_file)
+        record_fs('map_manager', 'write')
+        if stale_file.exists():
+            stale_file.unlink()
+        return map_file
+    
+    def _index_usage(self, map_id, map_data, version=None):
+        """Met à jour l'index inverse assets -> cartes (map_data None : carte supprimée)"""
+        try:
+            if map_data is None:
+                map_usage_index.remove_map(self.username, map_id)
+            else:
+                map_usage_index.index_map(self.username, map_id, map_data, version)
+        except Exception as e:
+            # L'index se rattrape via sync() ; l'écriture de la carte ne doit pas échouer
+            print(f"Error updating map usage index for {map_id}: {e}")
+    
+    def _record_history(self, map_id, map_data):
+        """Ajoute une révision à l'historique serveur (map_data None : carte supprimée)"""
+        if not map_history.is_enabled():
+            return
+        try:
+            if map_data is None:
+                map_history.delete_history(self.username, map_id)
+            else:
+                map_history.record_revision(self.username, map_id, map_data)
+        except Exception as e:
+            print(f"Error recording history for map {map_id}: {e}")
+    
     def create_map(self, map_data):
         """Create a new map"""
         map_id = map_data.get('id') or f"map_{uuid.uuid4().hex[:12]}"
@@ -31,15 +204,17 @@ class MapManager:
         map_data['metadata']['modified'] = datetime.now().isoformat()
         map_data['metadata']['author'] = self.username
         
-        map_file = self.user_maps_dir / f"{map_id}.json"
-        with open(map_file, 'w', encoding='utf-8') as f:
-            json.dump(map_data, f, indent=2, ensure_ascii=False)
+        map_file = self._write_map_file(map_id, map_data)
+        version = file_version(map_file)
+        self._index_usage(map_id, map_data, version)
+        self._record_history(map_id, map_data)
+        self._publish_change(map_id, version, 'created')
         
         return map_data
     
     def update_map(self, map_id, map_data):
         """Update an existing map"""
-        map_file = self.user_maps_dir / f"{map_id}.json"
+        map_file = self._map_file(map_id)
         
         if not map_file.exists():
             raise FileNotFoundError(f"Map {map_id} not found")
@@ -51,29 +226,101 @@ class MapManager:
         map_data['metadata']['modified'] = datetime.now().isoformat()
         map_data['metadata']['author'] = self.username
         
-        with open(map_file, 'w', encoding='utf-8') as f:
-            json.dump(map_data, f, indent=2, ensure_ascii=False)
+        map_file = self._write_map_file(map_id, map_data)
+        version = file_version(map_file)
+        self._index_usage(map_id, map_data, version)
+        self._record_history(map_id, map_data)
+        self._publish_change(map_id, version, 'updated')
         
         return map_data
     
+    def write_maps(self, entries, on_conflict='replace'):
+        """
+        Écrit un lot de cartes déjà normalisées (import en masse) :
+        entries = [(map_id, map_data, encoded)], encoded étant les octets au
+        format courant ou None. Une carte existante est remplacée
+        (on_conflict='replace'), laissée ('skip') ou la nouvelle reçoit un
+        autre id ('new'). Index des utilisations en une transaction pour le
+        lot, puis historique et événements comme create_map / update_map.
+        Retourne [(map_id, statut, erreur)] dans l'ordre, statut parmi
+        'created', 'replaced', 'skipped', 'error'.
+        """
+        results = []
+        written = []
+        for map_id, map_data, encoded in entries:
+            try:
+                exists = self._exists(map_id)
+                if exists and on_conflict == 'skip':
+                    results.append((map_id, 'skipped', None))
+                    continue
+                if exists and on_conflict == 'new':
+                    while exists:
+                        map_id = f"map_{uuid.uuid4().hex[:12]}"
+                        exists = self._exists(map_id)
+                    map_data['id'] = map_id
+                    encoded = None
+                map_file = self._write_map_file(map_id, map_data, encoded)
+                version = file_version(map_file)
+                written.append((map_id, map_data, version, 'updated' if exists else 'created'))
+                results.append((map_id, 'replaced' if exists else 'created', None))
+            except Exception as e:
+                results.append((map_id, 'error', str(e)))
+        
+        if written:
+            try:
+                map_usage_index.index_maps([
+                    (self.username, map_id, map_data, version) for map_id, map_data, version, _ in written
+                ])
+            except Exception as e:
+                # Rattrapé par map_usage_index.sync() ; les cartes sont écrites
+                print(f"Error updating map usage index for {self.username}: {e}")
+        for map_id, map_data, version, action in written:
+            self._record_history(map_id, map_data)
+            self._publish_change(map_id, version, action)
+        return results
+    
     def get_map(self, map_id):
         """Get a map by ID"""
-        map_file = self.user_maps_dir / f"{map_id}.json"
+        map_file = self._map_file(map_id)
+        
+        if not map_file.exists():
+            raise FileNotFoundError(f"Map {map_id} not found")
+        
+        return read_map_file(map_file)
+    
+    def get_map_version(self, map_id):
+        """Version courante du fichier carte (ETag), None si absente"""
+        return file_version(self._map_file(map_id))
+    
+    def get_map_compact(self, map_id):
+        """Get a map by ID as a compact container (bytes, sans ré-encodage si déjà stockée ainsi)"""
+        map_file = self._map_file(map_id)
         
         if not map_file.exists():
             raise FileNotFoundError(f"Map {map_id} not found")
         
-        with open(map_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        if map_file.suffix == COMPACT_SUFFIX:
+            return map_file.read_bytes()
+        return encode_map(read_map_file(map_file))
     
     def delete_map(self, map_id):
         """Delete a map"""
-        map_file = self.user_maps_dir / f"{map_id}.json"
-        
-        if map_file.exists():
-            map_file.unlink()
-            return True
-        return False
+        deleted = False
+        for suffix in MAP_SUFFIXES:
+            map_file = self.user_maps_dir / f"{map_id}{suffix}"
+            if map_file.exists():
+                map_file.unlink()
+                deleted = True
+        if deleted:
+            self._index_usage(map_id, None)
+            self._record_history(map_id, None)
+            try:
+                from .map_tiles import delete_pyramid
+                delete_pyramid(self.username, map_id)
+            except Exception as e:
+                print(f"Error deleting tile pyramid for map {map_id}: {e}")
+            self._publish_change(map_id, None, 'deleted')
+        return deleted
     
     def list_maps(self):
         """List all maps for this user"""
@@ -82,12 +329,11 @@ class MapManager:
         if not self.user_maps_dir.exists():
             return maps
         
-        for map_file in self.user_maps_dir.glob('*.json'):
+        for map_file in iter_map_files(self.user_maps_dir):
             try:
-                with open(map_file, 'r', encoding='utf-8') as f:
-                    map_data = json.load(f)
-                    map_data['id'] = map_file.stem
-                    maps.append(map_data)
+                map_data = read_map_file(map_file)
+                map_data['id'] = map_file.stem
+                maps.append(map_data)
             except Exception as e:
                 print(f"Error reading map file {map_file}: {e}")
         
@@ -99,6 +345,20 @@ class MapManager:
         
         return maps
     
+    @staticmethod
+    def public_maps_version():
+        """Version agrégée de toutes les cartes (stat seulement, aucune lecture)"""
+        h = hashlib.blake2b(digest_size=8)
+        users_dir = Path(settings.USERS_DIR)
+        if users_dir.exists():
+            for user_dir in sorted(users_dir.iterdir()):
+                maps_dir = user_dir / 'maps'
+                if not maps_dir.is_dir():
+                    continue
+                for map_file in sorted(iter_map_files(maps_dir)):
+                    h.update(f"{user_dir.name}/{map_file.name}:{file_version(map_file)};".encode('utf-8'))
+        return h.hexdigest()
+    
     @staticmethod
     def list_all_public_maps():
         """List all maps from all users (public)"""
@@ -112,12 +372,11 @@ class MapManager:
             if user_dir.is_dir():
                 maps_dir = user_dir / 'maps'
                 if maps_dir.exists():
-                    for map_file in maps_dir.glob('*.json'):
+                    for map_file in iter_map_files(maps_dir):
                         try:
-                            with open(map_file, 'r', encoding='utf-8') as f:
-                                map_data = json.load(f)
-                                map_data['id'] = map_file.stem
-                                all_maps.append(map_data)
+                            map_data = read_map_file(map_file)
+                            map_data['id'] = map_file.stem
+                            all_maps.append(map_data)
                         except Exception as e:
                             print(f"Error reading map file {map_file}: {e}")
         
@@ -0,0 +1,375 @@
+"""
+Pyramide de tuiles « deep zoom » (256 px) pour l'affichage en lecture seule
+des grandes cartes (galerie, aperçu).
+
+Géométrie identique à l'éditeur (`CanvasGrid.vue`) : un élément est dessiné
+à la taille native de son image en (x * grid.tileSize + gridOffsetX,
+y * grid.tileSize + gridOffsetY), tourné de `rotation` degrés autour de son
+centre ; couche `tiles` puis `objects` (puis les autres), dans l'ordre.
+
+Niveaux : le dernier (`maxLevel`) est à l'échelle 1, chaque niveau
+au-dessus divise par deux, jusqu'à ce que la carte tienne dans 256 px. Les
+tuiles sont alignées sur des multiples de 256 px du monde (le niveau 0 peut
+donc compter deux tuiles par axe), si bien qu'une tuile ne dépend que des
+éléments qui la recouvrent.
+
+Stockage (`MAP_TILES_DIR/<user>/<map_id>/`) :
+  - `manifests/<hash>.json` : manifeste par hash du contenu dessiné (couches,
+    grille, décalages, empreintes des images) ; chaque tuile y a son propre
+    hash (échelle, position, éléments qui la recouvrent) ;
+  - `tiles/<hash>.png` : tuiles rendues à la demande, par hash.
+Après une modification, seules les tuiles dont le hash a changé sont
+rendues de nouveau ; les autres sont reprises telles quelles. Les tuiles
+vides ne sont pas stockées (tuile transparente commune).
+"""
+import hashlib
+import io
+import math
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image
+
+from . import json_codec
+from .map_manager import MAP_SUFFIXES, file_version, read_map_file
+from .utils import normalize_asset_path
+
+TILE_SIZE = 256
+_LAYER_ORDER = ('tiles', 'objects')
+
+_locks = {}
+_locks_guard = threading.Lock()
+_empty_tile = None
+
+
+def _lock(username, map_id):
+    with _locks_guard:
+        lock = _locks.get((username, map_id))
+        if lock is None:
+            lock = _locks[(username, map_id)] = threading.Lock()
+        return lock
+
+
+def _manifest_cache():
+    from api.cache import get_cache
+    return get_cache('map_tiles_manifests', max_entries=32)
+
+
+def _image_cache():
+    from api.cache import get_cache
+    return get_cache('map_tiles_images', max_entries=4096, max_bytes=64 * 1024 * 1024)
+
+
+def get_tiles_dir(username, map_id):
+    root = getattr(settings, 'MAP_TILES_DIR', None) or Path(settings.MEDIA_ROOT) / 'map_tiles'
+    return Path(root) / username / map_id
+
+
+def _find_map_file(username, map_id):
+    maps_dir = Path(settings.USERS_DIR) / username / 'maps'
+    for suffix in reversed(MAP_SUFFIXES):
+        map_file = maps_dir / f'{map_id}{suffix}'
+        if map_file.exists():
+            return map_file
+    raise FileNotFoundError(f"Map {map_id} not found")
+
+
+def _asset_file(asset):
+    """Fichier image d'un chemin d'asset (ASSETS_DIR puis BG_MAPEDITOR_TILES_DIR), ou None."""
+    path = normalize_asset_path(asset)
+    for root in (settings.ASSETS_DIR, settings.BG_MAPEDITOR_TILES_DIR):
+        candidate = os.path.join(root, path)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _file_fingerprint(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f'{st.st_mtime_ns:x}-{st.st_size:x}'
+
+
+def _ordered_layers(layers):
+    names = [n for n in _LAYER_ORDER if n in layers] + [n for n in layers if n not in _LAYER_ORDER]
+    for name in names:
+        elements = layers[name]
+        if isinstance(elements, list):
+            yield from (e for e in elements if isinstance(e, dict))
+
+
+def _collect_elements(map_data):
+    """
+    Éléments dessinables : [asset, w, h, cx, cy, rotation] (centre en px monde)
+    et empreintes des images {fichier: empreinte}.
+    """
+    grid = map_data.get('grid') if isinstance(map_data.get('grid'), dict) else {}
+    # Même défaut que le chargement d'une carte côté éditeur (mapStore.loadMap : `|| 32`)
+    tile_size = grid.get('tileSize') or 32
+    offset_x = map_data.get('gridOffsetX') or 0
+    offset_y = map_data.get('gridOffsetY') or 0
+    layers = map_data.get('layers') if isinstance(map_data.get('layers'), dict) else {}
+
+    sizes = {}
+    assets = {}
+    elements = []
+    for element in _ordered_layers(layers):
+        asset = element.get('asset')
+        if not isinstance(asset, str) or not asset:
+            continue
+        if asset not in sizes:
+            path = _asset_file(asset)
+            size = None
+            if path is not None:
+                try:
+                    with Image.open(path) as img:
+                        size = img.size
+                    assets[path] = _file_fingerprint(path)
+                except OSError as e:
+                    print(f"Error reading map tile asset {path}: {e}")
+            sizes[asset] = (path, size)
+        path, size = sizes[asset]
+        if size is None:
+            continue
+        try:
+            x = float(element.get('x') or 0) * tile_size + offset_x
+            y = float(element.get('y') or 0) * tile_size + offset_y
+            rotation = float(element.get('rotation') or 0) % 360
+        except (TypeError, ValueError):
+            continue
+        w, h = size
+        elements.append([path, w, h, x + w / 2, y + h / 2, rotation])
+    return elements, assets
+
+
+def _bounds(element, scale=1.0):
+    """Boîte (x0, y0, x1, y1) de l'élément tourné, à l'échelle donnée."""
+    _, w, h, cx, cy, rotation = element
+    rad = math.radians(rotation)
+    cos, sin = abs(math.cos(rad)), abs(math.sin(rad))
+    half_w = (w * cos + h * sin) / 2 * scale
+    half_h = (w * sin + h * cos) / 2 * scale
+    return cx * scale - half_w, cy * scale - half_h, cx * scale + half_w, cy * scale + half_h
+
+
+def _tile_range(low, high):
+    return range(math.floor(low / TILE_SIZE), math.ceil(high / TILE_SIZE))
+
+
+def build_manifest(map_data):
+    """
+    Manifeste de la pyramide : hash du contenu, niveaux, et pour chaque tuile
+    non vide « z/x/y » -> [hash, indices des éléments dans l'ordre de dessin].
+    """
+    elements, assets = _collect_elements(map_data)
+    content = hashlib.sha256(json_codec.dumps({
+        'elements': elements,
+        'assets': sorted(assets.items()),
+    })).hexdigest()
+
+    manifest = {'hash': content, 'tileSize': TILE_SIZE, 'assets': assets, 'elements': elements}
+    if not elements:
+        manifest.update(maxLevel=0, bounds=[0, 0, 0, 0], levels=[], tiles={})
+        return manifest
+
+    boxes = [_bounds(e) for e in elements]
+    x0, y0 = min(b[0] for b in boxes), min(b[1] for b in boxes)
+    x1, y1 = max(b[2] for b in boxes), max(b[3] for b in boxes)
+    max_level = max(0, math.ceil(math.log2(max(x1 - x0, y1 - y0, 1) / TILE_SIZE)))
+
+    levels = []
+    tiles = {}
+    element_keys = [json_codec.dumps(e[1:] + [assets.get(e[0]), e[0]]) for e in elements]
+    for level in range(max_level + 1):
+        shrink = max_level - level
+        scale = 1.0 / (1 << shrink)
+        columns = _tile_range(x0 * scale, x1 * scale)
+        rows = _tile_range(y0 * scale, y1 * scale)
+        levels.append({
+            'level': level,
+            'scale': scale,
+            'columns': len(columns),
+            'rows': len(rows),
+            # Coin haut-gauche de la tuile (0, 0) en px monde
+            'x': columns.start * TILE_SIZE / scale,
+            'y': rows.start * TILE_SIZE / scale,
+        })
+        covering = {}
+        for index, element in enumerate(elements):
+            bx0, by0, bx1, by1 = _bounds(element, scale)
+            for ty in _tile_range(by0, by1):
+                for tx in _tile_range(bx0, bx1):
+                    covering.setdefault((tx, ty), []).append(index)
+        for (tx, ty), indices in covering.items():
+            h = hashlib.sha256(f'{shrink}/{tx}/{ty}'.encode())
+            for index in indices:
+                h.update(element_keys[index])
+            tiles[f'{level}/{tx - columns.start}/{ty - rows.start}'] = [h.hexdigest()[:32], indices]
+    manifest.update(maxLevel=max_level, bounds=[x0, y0, x1, y1], levels=levels, tiles=tiles)
+    return manifest
+
+
+def _assets_unchanged(manifest):
+    return all(_file_fingerprint(path) == fp for path, fp in manifest['assets'].items())
+
+
+def _collect_garbage(tiles_dir, manifest):
+    """Ne garde que le manifeste courant et ses tuiles déjà rendues."""
+    keep = {entry[0] for entry in manifest['tiles'].values()}
+    for path in (tiles_dir / 'manifests').glob('*.json'):
+        if path.stem != manifest['hash']:
+            path.unlink(missing_ok=True)
+    for path in (tiles_dir / 'tiles').glob('*.png'):
+        if path.stem not in keep:
+            path.unlink(missing_ok=True)
+
+
+def get_manifest(username, map_id):
+    """Manifeste courant de la carte (reconstruit si la carte ou ses images ont changé)."""
+    version = file_version(_find_map_file(username, map_id))
+    cache = _manifest_cache()
+    refresh = getattr(settings, 'MAP_TILES_REFRESH_SECONDS', 5)
+    cached = cache.get((username, map_id))
+    if cached and cached[0] == version:
+        # Carte inchangée : les images ne sont revérifiées (stat) qu'une fois par intervalle
+        if time.monotonic() - cached[1] < refresh:
+            return cached[2]
+        if _assets_unchanged(cached[2]):
+            cache.set((username, map_id), (version, time.monotonic(), cached[2]))
+            return cached[2]
+
+    tiles_dir = get_tiles_dir(username, map_id)
+    with _lock(username, map_id):
+        manifest = None
+        try:
+            state = json_codec.load_file(tiles_dir / 'state.json')
+            if state.get('version') == version:
+                manifest = json_codec.load_file(tiles_dir / 'manifests' / f"{state['hash']}.json")
+                if not _assets_unchanged(manifest):
+                    manifest = None
+        except (OSError, ValueError, KeyError):
+            manifest = None
+
+        if manifest is None:
+            map_file = _find_map_file(username, map_id)
+            version = file_version(map_file)
+            manifest = build_manifest(read_map_file(map_file))
+            (tiles_dir / 'manifests').mkdir(parents=True, exist_ok=True)
+            (tiles_dir / 'tiles').mkdir(exist_ok=True)
+            manifest_file = tiles_dir / 'manifests' / f"{manifest['hash']}.json"
+            if not manifest_file.exists():
+                json_codec.dump_file(manifest_file, manifest)
+            tmp = tiles_dir / 'state.json.tmp'
+            json_codec.dump_file(tmp, {'version': version, 'hash': manifest['hash']})
+            os.replace(tmp, tiles_dir / 'state.json')
+            _collect_garbage(tiles_dir, manifest)
+
+    cache.set((username, map_id), (version, time.monotonic(), manifest))
+    return manifest
+
+
+def public_manifest(manifest):
+    """Description de la pyramide pour le client (sans la liste des tuiles ni des éléments)."""
+    return {
+        'hash': manifest['hash'],
+        'tileSize': TILE_SIZE,
+        'format': 'png',
+        'maxLevel': manifest['maxLevel'],
+        'bounds': manifest['bounds'],
+        'levels': manifest['levels'],
+    }
+
+
+# --- Rendu ----------------------------------------------------------------------
+
+def _element_image(path, fingerprint, w, h, scale, rotation):
+    """Image de l'élément redimensionnée puis tournée (cache LRU borné en octets)."""
+    key = (path, fingerprint, scale, rotation)
+    cache = _image_cache()
+    img = cache.get(key)
+    if img is None:
+        with Image.open(path) as src:
+            img = src.convert('RGBA')
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        if size != img.size:
+            img = img.resize(size, Image.Resampling.LANCZOS)
+        if rotation:
+            # Canvas : rotation horaire (axe y vers le bas) ; PIL : anti-horaire
+            img = img.rotate(-rotation, resample=Image.Resampling.BICUBIC, expand=True)
+        cache.set(key, img, size=img.width * img.height * 4)
+    return img
+
+
+def render_tile(manifest, level, x, y):
+    """Rendu PNG (octets) d'une tuile, ou None si elle est vide."""
+    entry = manifest['tiles'].get(f'{level}/{x}/{y}')
+    if entry is None:
+        return None
+    info = manifest['levels'][level]
+    scale = info['scale']
+    # Origine de la tuile en px du niveau
+    left = info['x'] * scale + x * TILE_SIZE
+    top = info['y'] * scale + y * TILE_SIZE
+
+    canvas = Image.new('RGBA', (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0))
+    for index in entry[1]:
+        path, w, h, cx, cy, rotation = manifest['elements'][index]
+        try:
+            img = _element_image(path, manifest['assets'].get(path), w, h, scale, rotation)
+        except OSError as e:
+            print(f"Error rendering map tile asset {path}: {e}")
+            continue
+        dx = round(cx * scale - img.width / 2 - left)
+        dy = round(cy * scale - img.height / 2 - top)
+        # alpha_composite n'accepte pas de destination négative : découpe de la source
+        sx, sy = max(0, -dx), max(0, -dy)
+        ex, ey = min(img.width, TILE_SIZE - dx), min(img.height, TILE_SIZE - dy)
+        if sx < ex and sy < ey:
+            canvas.alpha_composite(img, dest=(dx + sx, dy + sy), source=(sx, sy, ex, ey))
+    out = io.BytesIO()
+    canvas.save(out, 'PNG', compress_level=6)
+    return out.getvalue()
+
+
+def empty_tile():
+    """Tuile transparente commune (tuiles sans élément)."""
+    global _empty_tile
+    if _empty_tile is None:
+        out = io.BytesIO()
+        Image.new('RGBA', (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0)).save(out, 'PNG')
+        _empty_tile = out.getvalue()
+    return _empty_tile
+
+
+def get_tile(username, map_id, level, x, y):
+    """
+    (hash, chemin du PNG) d'une tuile, rendue et stockée au premier accès ;
+    (None, None) si elle est vide. IndexError si le niveau n'existe pas.
+    """
+    manifest = get_manifest(username, map_id)
+    if not 0 <= level <= manifest['maxLevel'] or not manifest['levels']:
+        raise IndexError(f"Level {level} out of range")
+    entry = manifest['tiles'].get(f'{level}/{x}/{y}')
+    if entry is None:
+        return None, None
+    tile_hash = entry[0]
+    tile_file = get_tiles_dir(username, map_id) / 'tiles' / f'{tile_hash}.png'
+    if not tile_file.exists():
+        data = render_tile(manifest, level, x, y)
+        tmp = tile_file.with_name(f'.{tile_hash}.{threading.get_ident()}.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, tile_file)
+    return tile_hash, tile_file
+
+
+def delete_pyramid(username, map_id):
+    """Supprime la pyramide d'une carte supprimée."""
+    with _lock(username, map_id):
+        shutil.rmtree(get_tiles_dir(username, map_id), ignore_errors=True)
+    _manifest_cache().delete_where(lambda key: key == (username, map_id))
@@ -0,0 +1,214 @@
+"""
+Index inverse pack / asset -> cartes qui les utilisent (SQLite).
+
+Avant de supprimer ou remplacer un pack, savoir quelles cartes casseraient
+demandait d'ouvrir toutes les cartes sous `USERS_DIR`. Cet index persistant
+(`MAP_USAGE_INDEX_PATH`) garde pour chaque carte le nombre d'utilisations de
+chaque chemin d'asset (champ `asset` des couches), avec l'id du pack (premier
+segment du chemin). Il est tenu à jour par les écritures de `MapManager` ;
+`sync()` rattrape les cartes modifiées hors API (comparaison des versions de
+fichier, stat seulement) et `rebuild()` reconstruit tout.
+
+Une connexion SQLite par opération (mode WAL) : sûr entre threads et entre
+processus.
+"""
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import closing
+from pathlib import Path
+
+from django.conf import settings
+
+from .utils import normalize_asset_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS maps (
+    username TEXT NOT NULL,
+    map_id TEXT NOT NULL,
+    version TEXT,
+    PRIMARY KEY (username, map_id)
+);
+CREATE TABLE IF NOT EXISTS usage (
+    username TEXT NOT NULL,
+    map_id TEXT NOT NULL,
+    pack_id TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (username, map_id, asset)
+);
+CREATE INDEX IF NOT EXISTS usage_pack ON usage (pack_id);
+CREATE INDEX IF NOT EXISTS usage_asset ON usage (asset);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def get_index_path():
+    """Fichier SQLite (settings.MAP_USAGE_INDEX_PATH, défaut MEDIA_ROOT/map_usage.sqlite3)."""
+    return Path(getattr(settings, 'MAP_USAGE_INDEX_PATH', None) or Path(settings.MEDIA_ROOT) / 'map_usage.sqlite3')
+
+
+def _connect():
+    path = get_index_path()
+    with _init_lock:
+        # Dossier créé avant la connexion : sqlite3 ne crée pas les répertoires parents
+        if path not in _initialized:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        if path not in _initialized:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            _initialized.add(path)
+    return conn
+
+
+def count_map_assets(map_data):
+    """Counter {chemin d'asset normalisé: utilisations} d'une carte (un seul parcours des couches)."""
+    counts = Counter()
+    layers = map_data.get('layers') if isinstance(map_data, dict) else None
+    for elements in (layers.values() if isinstance(layers, dict) else ()):
+        if not isinstance(elements, list):
+            continue
+        for element in elements:
+            if isinstance(element, dict):
+                asset = element.get('asset')
+                if isinstance(asset, str) and asset:
+                    counts[normalize_asset_path(asset)] += 1
+    return counts
+
+
+def _replace_map(conn, username, map_id, map_data, version):
+    conn.execute('DELETE FROM usage WHERE username = ? AND map_id = ?', (username, map_id))
+    conn.executemany(
+        'INSERT INTO usage (username, map_id, pack_id, asset, count) VALUES (?, ?, ?, ?, ?)',
+        [
+            (username, map_id, asset.split('/', 1)[0], asset, count)
+            for asset, count in count_map_assets(map_data).items()
+        ],
+    )
+    conn.execute(
+        'INSERT OR REPLACE INTO maps (username, map_id, version) VALUES (?, ?, ?)',
+        (username, map_id, version),
+    )
+
+
+def index_map(username, map_id, map_data, version=None):
+    """Remplace les utilisations d'une carte (appelé après chaque écriture)."""
+    with closing(_connect()) as conn, conn:
+        _replace_map(conn, username, map_id, map_data, version)
+
+
+def index_maps(entries):
+    """Indexe un lot de cartes [(username, map_id, map_data, version)] en une transaction (import en masse)."""
+    with closing(_connect()) as conn, conn:
+        for username, map_id, map_data, version in entries:
+            _replace_map(conn, username, map_id, map_data, version)
+
+
+def remove_map(username, map_id):
+    """Retire une carte supprimée de l'index."""
+    with closing(_connect()) as conn, conn:
+        conn.execute('DELETE FROM usage WHERE username = ? AND map_id = ?', (username, map_id))
+        conn.execute('DELETE FROM maps WHERE username = ? AND map_id = ?', (username, map_id))
+
+
+def sync(full=False):
+    """
+    Met l'index en accord avec les fichiers : ré-indexe les cartes dont la
+    version de fichier a changé (ou toutes si full), retire les cartes
+    disparues. Retourne (cartes indexées, cartes retirées).
+    """
+    from .map_manager import file_version, iter_map_files, read_map_file
+    users_dir = Path(settings.USERS_DIR)
+    on_disk = {}
+    if users_dir.exists():
+        for user_dir in users_dir.iterdir():
+            if user_dir.is_dir() and not user_dir.name.startswith('.'):
+                for map_file in iter_map_files(user_dir / 'maps'):
+                    on_disk[(user_dir.name, map_file.stem)] = map_file
+
+    indexed = removed = 0
+    with closing(_connect()) as conn:
+        known = {(u, m): v for u, m, v in conn.execute('SELECT username, map_id, version FROM maps')}
+        with conn:
+            for key in known.keys() - on_disk.keys():
+                conn.execute('DELETE FROM usage WHERE username = ? AND map_id = ?', key)
+                conn.execute('DELETE FROM maps WHERE username = ? AND map_id = ?', key)
+                removed += 1
+        for key, map_file in on_disk.items():
+            version = file_version(map_file)
+            if not full and key in known and known[key] == version:
+                continue
+            try:
+                map_data = read_map_file(map_file)
+            except Exception as e:
+                print(f"Error indexing map file {map_file}: {e}")
+                continue
+            with conn:
+                _replace_map(conn, key[0], key[1], map_data, version)
+            indexed += 1
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('synced', '1')")
+    return indexed, removed
+
+
+def rebuild():
+    """Reconstruit tout l'index depuis les fichiers cartes."""
+    return sync(full=True)
+
+
+def ensure_built():
+    """Construit l'index au premier usage (installation existante, avant tout enregistrement)."""
+    with closing(_connect()) as conn:
+        row = conn.execute("SELECT value FROM state WHERE key = 'synced'").fetchone()
+    if row is None:
+        sync()
+
+
+def maps_using_pack(pack_id):
+    """Cartes utilisant un pack : [{'username', 'mapId', 'uses', 'assets'}], plus utilisées d'abord."""
+    ensure_built()
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            'SELECT username, map_id, SUM(count), COUNT(*) FROM usage WHERE pack_id = ? '
+            'GROUP BY username, map_id ORDER BY SUM(count) DESC, username, map_id',
+            (pack_id,),
+        ).fetchall()
+    return [{'username': u, 'mapId': m, 'uses': uses, 'assets': n} for u, m, uses, n in rows]
+
+
+def maps_using_asset(asset_path):
+    """Cartes utilisant un chemin d'asset : [{'username', 'mapId', 'uses'}]."""
+    ensure_built()
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            'SELECT username, map_id, count FROM usage WHERE asset = ? ORDER BY count DESC, username, map_id',
+            (normalize_asset_path(asset_path),),
+        ).fetchall()
+    return [{'username': u, 'mapId': m, 'uses': uses} for u, m, uses in rows]
+
+
+def pack_usage_stats():
+    """Utilisation par pack : [{'packId', 'maps', 'uses', 'assets'}]."""
+    ensure_built()
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            "SELECT pack_id, COUNT(DISTINCT username || '/' || map_id), SUM(count), COUNT(DISTINCT asset) "
+            'FROM usage GROUP BY pack_id ORDER BY SUM(count) DESC, pack_id'
+        ).fetchall()
+    return [{'packId': p, 'maps': maps, 'uses': uses, 'assets': assets} for p, maps, uses, assets in rows]
+
+
+def asset_usage_stats(pack_id):
+    """Utilisation des assets d'un pack : [{'asset', 'maps', 'uses'}]."""
+    ensure_built()
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            'SELECT asset, COUNT(*), SUM(count) FROM usage WHERE pack_id = ? '
+            'GROUP BY asset ORDER BY SUM(count) DESC, asset',
+            (pack_id,),
+        ).fetchall()
+    return [{'asset': a, 'maps': maps, 'uses': uses} for a, maps, uses in rows]
@@ -0,0 +1,289 @@
+"""
+Synchronisation différentielle d'un pack.
+
+Le client récupère le manifeste du pack (chemin relatif -> sha256 + taille de
+chaque fichier, plus la `version` de l'arborescence), le compare à sa copie
+locale, puis n'envoie qu'un ZIP des fichiers ajoutés / modifiés et la liste
+des fichiers supprimés. Le coût d'une mise à jour est proportionnel au
+changement, pas à la taille du pack.
+
+Application atomique : la nouvelle arborescence est construite dans un dossier
+de préparation caché à côté du pack (`ASSETS_DIR/.sync-<pack>-…`, même
+volume), peuplée par liens physiques depuis le pack actuel (aucune copie),
+modifiée, validée par `PackParser`, puis échangée avec l'ancien dossier en
+une opération (`renameat2(RENAME_EXCHANGE)` sous Linux) : un lecteur voit
+l'ancien pack ou le nouveau, jamais un mélange ni un dossier absent. Ailleurs
+(autre OS, système de fichiers sans cet appel), repli sur deux renommages :
+le pack est alors absent pendant l'intervalle entre les deux.
+Les fichiers repris de l'ancien pack ne sont jamais réécrits en place
+(suppression puis écriture), comme l'exige `blob_store`.
+
+Deux mises à jour du même pack sont sérialisées par un verrou de fichier
+(`ASSETS_DIR/.sync-<pack>.lock`, `flock`), valable entre workers.
+"""
+import ctypes
+import ctypes.util
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+
+from . import blob_store
+from .pack_zip_uploader import PackZipUploader
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+# Fichiers sans extension autorisée mais faisant partie d'un pack
+_PACK_FILE_NAMES = {'cfg', 'editor_pack_meta.json'}
+
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+_renameat2 = None
+
+_pack_locks = {}
+_pack_locks_guard = threading.Lock()
+
+
+class PackSyncConflict(ValueError):
+    """La version de base annoncée par le client ne correspond plus au pack."""
+
+
+def _thread_lock(pack_id):
+    with _pack_locks_guard:
+        lock = _pack_locks.get(pack_id)
+        if lock is None:
+            lock = _pack_locks[pack_id] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def _pack_lock(pack_dir):
+    """Verrou exclusif d'un pack : threads du processus puis autres processus (flock)."""
+    with _thread_lock(pack_dir.name):
+        if fcntl is None:
+            yield
+            return
+        lock_path = pack_dir.parent / f'.sync-{pack_dir.name}.lock'
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _exchange(a, b):
+    """Échange atomiquement deux chemins ; False si le système ne le permet pas."""
+    global _renameat2
+    if not sys.platform.startswith('linux'):
+        return False
+    if _renameat2 is None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        _renameat2 = getattr(libc, 'renameat2', False)
+        if _renameat2:
+            _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    if not _renameat2:
+        return False
+    if _renameat2(_AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE) == 0:
+        return True
+    errno = ctypes.get_errno()
+    if errno in (22, 38, 95):  # EINVAL / ENOSYS / EOPNOTSUPP : non supporté ici
+        return False
+    raise OSError(errno, os.strerror(errno), os.fspath(a))
+
+
+def _hash_cache():
+    # chemin absolu -> ((st_ino, mtime_ns, size), sha256), borné
+    from api.cache import get_cache
+    return get_cache('pack_sync_hashes', max_entries=65536)
+
+
+def _file_digest(path, st):
+    """sha256 d'un fichier : blob lié, cache (inode, mtime, taille), ou lecture."""
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cache = _hash_cache()
+    cached = cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    digest = blob_store.digest_for_path(path) or blob_store.hash_file(path)
+    cache.set(path, (key, digest))
+    return digest
+
+
+def iter_pack_files(pack_dir):
+    """(chemin relatif posix, chemin absolu, stat) de chaque fichier du pack, hors fichiers cachés."""
+    pack_dir = os.fspath(pack_dir)
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(pack_dir, rel_dir)) as it:
+                entries = sorted((e for e in it if not e.name.startswith('.')), key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(rel_path)
+            elif entry.is_file():
+                yield rel_path, entry.path, entry.stat()
+
+
+def build_pack_manifest(pack_dir):
+    """
+    Manifeste d'un pack : {'packId', 'version', 'files': {chemin: {'hash', 'size'}}}.
+
+    Seuls les fichiers nouveaux ou modifiés depuis le dernier appel sont relus.
+    """
+    from api.parsers.pack_fingerprint import pack_tree_fingerprint
+    pack_dir = Path(pack_dir)
+    files = {}
+    for rel_path, abs_path, st in iter_pack_files(pack_dir):
+        files[rel_path] = {'hash': _file_digest(abs_path, st), 'size': st.st_size}
+    return {
+        'packId': pack_dir.name,
+        'version': pack_tree_fingerprint(pack_dir),
+        'files': files,
+    }
+
+
+def _safe_relative_path(name):
+    """Chemin relatif posix validé (pas d'absolu, pas de `..`, pas de fichier caché)."""
+    path = PurePosixPath(name.replace('\\', '/'))
+    if not name or path.is_absolute() or any(part in ('', '.', '..') for part in path.parts):
+        raise ValueError(f"Invalid path in delta: {name}")
+    if any(part.startswith('.') for part in path.parts):
+        raise ValueError(f"Hidden files are not allowed in delta: {name}")
+    return path
+
+
+def _populate_staging(pack_dir, staging_dir):
+    """Recrée l'arborescence du pack dans staging_dir par liens physiques (copie à défaut)."""
+    for rel_path, abs_path, _ in iter_pack_files(pack_dir):
+        dest = staging_dir / rel_path
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(abs_path, dest)
+        except OSError:
+            shutil.copy2(abs_path, dest)
+
+
+def _prune_empty_dirs(path, root):
+    """Supprime les dossiers vides de path jusqu'à root (exclu)."""
+    while path != root:
+        try:
+            path.rmdir()
+        except OSError:
+            return
+        path = path.parent
+
+
+def apply_pack_delta(pack_id, delta_zip=None, deleted=(), base_version=None):
+    """
+    Applique une mise à jour différentielle au pack `pack_id`.
+
+    delta_zip : fichier ZIP des fichiers ajoutés / modifiés, chemins relatifs au
+    dossier du pack (comme dans le manifeste) ; deleted : chemins à supprimer ;
+    base_version : `version` du manifeste sur lequel le client a calculé le
+    delta (PackSyncConflict si le pack a changé depuis).
+
+    Retourne {'id', 'version', 'written', 'deleted', 'categories'}.
+    """
+    from api.pack_cache import invalidate_pack
+    from api.parsers.asset_indexer import AssetIndexer
+    from api.parsers.pack_fingerprint import pack_tree_fingerprint
+    from api.parsers.pack_parser import PackParser
+
+    pack_dir = AssetIndexer.find_pack_dir(pack_id)
+    if pack_dir is None:
+        raise FileNotFoundError(f"Pack not found: {pack_id}")
+    deleted = [_safe_relative_path(name) for name in deleted]
+
+    with _pack_lock(pack_dir):
+        if base_version and pack_tree_fingerprint(pack_dir) != base_version:
+            raise PackSyncConflict("Pack changed since the manifest was fetched; fetch it again")
+
+        staging_dir = Path(tempfile.mkdtemp(prefix=f'.sync-{pack_id}-', dir=pack_dir.parent))
+        old_dir = None
+        try:
+            # mkdtemp crée le dossier en 0700 : il reprend les droits du pack qu'il remplace
+            os.chmod(staging_dir, pack_dir.stat().st_mode & 0o7777)
+            _populate_staging(pack_dir, staging_dir)
+
+            for rel_path in deleted:
+                target = staging_dir / rel_path
+                if not target.is_file():
+                    raise ValueError(f"Cannot delete missing file: {rel_path}")
+                target.unlink()
+                _prune_empty_dirs(target.parent, staging_dir)
+
+            written = []
+            if delta_zip is not None:
+                delta_zip.seek(0, os.SEEK_END)
+                if delta_zip.tell() > PackZipUploader.MAX_ZIP_SIZE:
+                    raise ValueError(
+                        f"Delta ZIP too large (max {PackZipUploader.MAX_ZIP_SIZE / 1024 / 1024}MB)"
+                    )
+                delta_zip.seek(0)
+                with zipfile.ZipFile(delta_zip, 'r') as zip_ref:
+                    for info in zip_ref.infolist():
+                        if info.is_dir():
+                            continue
+                        rel_path = _safe_relative_path(info.filename)
+                        if rel_path.suffix.lower() not in PackZipUploader.ALLOWED_EXTENSIONS and rel_path.name not in _PACK_FILE_NAMES:
+                            raise ValueError(f"File type not allowed in delta: {info.filename}")
+                        target = staging_dir / rel_path
+                        if target.is_dir():
+                            raise ValueError(f"Path is a directory in the pack: {info.filename}")
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        # Le fichier repris peut être lié à l'ancien pack / au blob : jamais d'écriture en place
+                        blob_store.replace_file(target)
+                        with zip_ref.open(info) as src, open(target, 'wb') as out:
+                            shutil.copyfileobj(src, out, 1024 * 1024)
+                        written.append(str(rel_path))
+
+            try:
+                pack_info = PackParser(staging_dir).parse_pack()
+            except Exception as e:
+                raise ValueError(f"Invalid pack structure: {str(e)}")
+
+            if blob_store.is_enabled():
+                for rel_path in written:
+                    if blob_store.is_blob_candidate(rel_path):
+                        blob_store.link_into_place(staging_dir / rel_path)
+
+            # Échange atomique : la préparation devient le pack, l'ancien pack prend sa place
+            if _exchange(staging_dir, pack_dir):
+                old_dir, staging_dir = staging_dir, None
+            else:
+                # Repli : l'ancien dossier est mis de côté puis remplacé par la préparation
+                old_dir = staging_dir.with_name(staging_dir.name.replace('.sync-', '.sync-old-', 1))
+                os.rename(pack_dir, old_dir)
+                try:
+                    os.rename(staging_dir, pack_dir)
+                except OSError:
+                    os.rename(old_dir, pack_dir)
+                    old_dir = None
+                    raise
+        except BaseException:
+            if staging_dir is not None:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+        invalidate_pack(pack_id)
+        return {
+            'id': pack_id,
+            'version': pack_tree_fingerprint(pack_dir),
+            'written': written,
+            'deleted': [str(p) for p in deleted],
+            'categories': list(pack_info['categories'].keys()),
+        }
@@ -6,6 +6,7 @@ import shutil
 from pathlib import Path
 from PIL import Image
 from django.conf import settings
+from . import blob_store
 from .utils import ensure_directory
 
 
@@ -32,6 +33,17 @@ def sanitize_path_segment(seg, field_name):
     return s
 
 
+def save_thumbnail(img, thumb_path, thumb_max=64):
+    """Enregistre une vignette PNG tenant dans un carré thumb_max (ratio conservé)."""
+    w, h = img.size
+    scale = min(thumb_max / w, thumb_max / h, 1.0)
+    t_w = max(1, int(round(w * scale)))
+    t_h = max(1, int(round(h * scale)))
+    thumb = img.resize((t_w, t_h), Image.Resampling.LANCZOS)
+    thumb.save(thumb_path, 'PNG')
+    return thumb_path
+
+
 class PackUploader:
     """Handle upload and normalization of custom pack assets"""
     
@@ -85,6 +97,10 @@ class PackUploader:
 
         rotations = {}
         r0_path = asset_dir / 'r_0.png'
+        # Les fichiers existants peuvent être des liens vers le stockage partagé :
+        # on les supprime avant d'écrire pour ne jamais réécrire un blob en place.
+        for name in ('r_0.png', 'r_90.png', 'r_180.png', 'r_270.png', 'r_thumb.png'):
+            blob_store.replace_file(asset_dir / name)
         img_resized.save(r0_path, 'PNG')
         try:
             rotations[0] = str(r0_path.relative_to(settings.ASSETS_DIR))
@@ -110,16 +126,16 @@ class PackUploader:
                     rotations[angle] = str(rot_path.relative_to(settings.PACKS_DIR))
 
         # Thumbnail: fit inside ~64px box, keep aspect ratio
-        thumb_max = 64
-        scale = min(thumb_max / tw, thumb_max / th, 1.0)
-        t_w = max(1, int(round(tw * scale)))
-        t_h = max(1, int(round(th * scale)))
-        thumb = img_resized.resize((t_w, t_h), Image.Resampling.LANCZOS)
-        thumb_path = asset_dir / 'r_thumb.png'
-        thumb.save(thumb_path, 'PNG')
+        thumb_path = save_thumbnail(img_resized, asset_dir / 'r_thumb.png')
+        if blob_store.is_enabled():
+            # Rotations copiées (non carré) et images déjà connues : une seule copie disque
+            blob_store.link_tree(asset_dir)
         
         # Update cfg file
         self._update_category_cfg(category, asset_name)
+
+        from api.pack_cache import invalidate_pack
+        invalidate_pack(self.pack_name)
         
         # Get relative paths (prefer assets directory)
         main_path = asset_dir / 'r_0.png'
@@ -17,15 +17,22 @@ class PackZipUploader:
     ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.cfg', '.txt', '.licence', '.license'}
     
     @staticmethod
-    def upload_and_extract(zip_file, destination='assets', replace_existing=False, game_type=None):
-        """Upload and extract a ZIP pack"""
+    def upload_and_extract(zip_file, destination='assets', replace_existing=False, game_type=None, max_size=None):
+        """
+        Upload and extract a ZIP pack
+        
+        max_size : taille maximale acceptée (défaut MAX_ZIP_SIZE ; les uploads
+        par morceaux, déjà sur disque, passent leur propre limite).
+        """
+        if max_size is None:
+            max_size = PackZipUploader.MAX_ZIP_SIZE
         # Validate file size
         zip_file.seek(0, os.SEEK_END)
         file_size = zip_file.tell()
         zip_file.seek(0)
         
-        if file_size > PackZipUploader.MAX_ZIP_SIZE:
-            raise ValueError(f"ZIP file too large (max {PackZipUploader.MAX_ZIP_SIZE / 1024 / 1024}MB)")
+        if file_size > max_size:
+            raise ValueError(f"ZIP file too large (max {max_size / 1024 / 1024}MB)")
         
         # Always extract to assets directory (unified location)
         dest_dir = Path(settings.ASSETS_DIR)
@@ -101,6 +108,13 @@ class PackZipUploader:
             if game_type:
                 from editor.pack_meta import write_pack_game_type
                 write_pack_game_type(pack_name, game_type)
+
+            from editor import blob_store
+            if blob_store.is_enabled():
+                blob_store.link_tree(final_pack_dir)
+
+            from api.pack_cache import invalidate_pack
+            invalidate_pack(pack_name)
             
             return {
                 'id': pack_name,
@@ -122,7 +136,7 @@ class PackZipUploader:
             if pack_dir.is_dir() and not pack_dir.name.startswith('.'):
                 try:
                     parser = PackParser(pack_dir)
-                    pack_info = parser.parse_pack()
+                    pack_info = parser.parse_pack(PackParser.DEPTH_META)
                     packs.append({
                         'id': pack_info['id'],
                         'name': pack_info['name'],
@@ -141,5 +155,7 @@ class PackZipUploader:
         
         if pack_dir.exists() and pack_dir.is_dir():
             shutil.rmtree(pack_dir)
+            from api.pack_cache import invalidate_pack
+            invalidate_pack(pack_id)
             return True
         return False
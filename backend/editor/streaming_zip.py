@@ -0,0 +1,86 @@
+"""
+Écriture d'archives ZIP en flux (générateur d'octets).
+
+`zipfile` écrit dans un puits non « seekable » : les tailles et CRC de chaque
+entrée partent dans un descripteur de données après son contenu, rien n'est
+réécrit. `iter_zip()` vide le puits après chaque morceau écrit, si bien qu'une
+réponse `StreamingHttpResponse` envoie l'archive au fil de l'eau avec une
+mémoire bornée par la taille d'un morceau, quel que soit le nombre d'entrées.
+
+Les images (PNG / JPEG, déjà compressées) sont stockées sans compression :
+deflate n'y gagnerait presque rien et coûterait du CPU.
+"""
+import os
+import time
+import zipfile
+from pathlib import Path
+
+CHUNK_SIZE = 256 * 1024
+STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.zip', '.zmap')
+
+
+class _Sink:
+    """Puits d'écriture : accumule les octets jusqu'au prochain drain()."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def should_store(name):
+    """True si l'entrée doit être stockée sans compression (format déjà compressé)."""
+    return os.path.splitext(name)[1].lower() in STORED_EXTENSIONS
+
+
+def iter_zip(entries, compresslevel=6):
+    """
+    Génère une archive ZIP entrée par entrée.
+
+    entries : itérable de (nom dans l'archive, source) où source est des
+    octets, un chemin de fichier (lu par morceaux) ou un itérable d'octets.
+    Le type de compression est choisi par `should_store()`.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED,
+                         compresslevel=compresslevel, allowZip64=True) as zf:
+        for name, source in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED if should_store(name) else zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            if isinstance(source, (str, Path)):
+                path = Path(source)
+                st = path.stat()
+                info.date_time = time.localtime(st.st_mtime)[:6]
+                info.file_size = st.st_size
+                with open(path, 'rb') as f, zf.open(info, 'w', force_zip64=st.st_size > 0x7FFFFFFF) as dest:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        dest.write(chunk)
+                        yield sink.drain()
+            elif isinstance(source, (bytes, bytearray, memoryview)):
+                info.file_size = len(source)
+                with zf.open(info, 'w') as dest:
+                    dest.write(source)
+            else:
+                # Taille inconnue : zip64 d'office pour ne pas échouer au-delà de 2 Go
+                with zf.open(info, 'w', force_zip64=True) as dest:
+                    for chunk in source:
+                        dest.write(chunk)
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
@@ -2,10 +2,21 @@
 User manager for temporary users
 """
 import os
+import re
 from pathlib import Path
 from django.conf import settings
 from .utils import ensure_directory
 
+# Noms d'utilisateur / ids de carte sûrs comme segment de chemin (pas de '/', pas de '..')
+_NAME_RE = re.compile(r'^[A-Za-z0-9_][A-Za-z0-9_.@-]{0,127}$')
+
+
+def check_name(value, what):
+    """Retourne value si c'est un nom de dossier sûr, sinon ValueError."""
+    if not isinstance(value, str) or not _NAME_RE.match(value):
+        raise ValueError(f"Invalid {what}: {value!r}")
+    return value
+
 
 class UserManager:
     """Manage temporary users"""
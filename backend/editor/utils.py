@@ -4,7 +4,23 @@ Utility functions for the editor module.
 import os
 from pathlib import Path
 
+_ASSET_URL_PREFIXES = ('/api/assets/', 'api/assets/', 'assets/', 'bgmapeditor_tiles/')
+
+
 def ensure_directory(path):
     """Create directory if it doesn't exist."""
     os.makedirs(path, exist_ok=True)
     return path
+
+
+def normalize_asset_path(path):
+    """Chemin d'asset relatif au dossier assets (slashes avant, sans préfixe d'URL)."""
+    path = path.replace('\\', '/').split('?', 1)[0]
+    marker = path.find('/api/assets/')
+    if marker > 0:
+        path = path[marker:]
+    for prefix in _ASSET_URL_PREFIXES:
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+            break
+    return path.lstrip('/')
@@ -30,7 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,7 +88,12 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [],
 }
@@ -101,12 +108,75 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# JSON codec (editor.json_codec): 'auto' uses orjson when installed, 'stdlib' forces json
+JSON_CODEC = 'auto'
+
+# API response compression (api.middleware.CompressionMiddleware)
+# gzip always; brotli when the optional `brotli` package is installed.
+# Compressed bodies of versioned responses (ETag) are cached in memory.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Cache warmup (api.warmup, `manage.py warmup`)
+# WARMUP_ON_STARTUP runs it in ApiConfig.ready(), before the server accepts traffic.
+WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', '') == '1'
+WARMUP_RECENT_MAPS = 50
+# Generate missing r_thumb.png during the startup warmup (writes into pack dirs; off by default)
+WARMUP_THUMBNAILS = os.environ.get('WARMUP_THUMBNAILS', '') == '1'
+
+# Pack file watcher (editor.file_watcher): events are batched per pack and delivered
+# after QUIET seconds without events (at most MAX_DELAY after the first one).
+PACK_WATCHER_QUIET_SECONDS = 0.5
+PACK_WATCHER_MAX_DELAY_SECONDS = 5.0
+# Start the pack watcher with the server (ApiConfig.ready); its change sets feed /api/events/
+PACK_WATCHER_ENABLED = os.environ.get('PACK_WATCHER_ENABLED', '') == '1'
+
+# Server-sent events (/api/events/, ASGI): keep-alive comment interval
+EVENTS_HEARTBEAT_SECONDS = 15
+
+# Content-addressed image store (editor.blob_store, /api/blobs/<sha256>):
+# pack images are hardlinked to one copy per content. Off by default: any tool that rewrites a pack
+# file in place would then rewrite the shared blob. Set BLOB_STORE_ENABLED=1 to opt in.
+BLOB_STORE_ENABLED = os.environ.get('BLOB_STORE_ENABLED', '') == '1'
+
+# Resumable chunked pack uploads (/api/packs/uploads/): sessions live in CHUNKED_UPLOAD_DIR
+CHUNKED_UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRE_HOURS = 24
+
+# Bulk map import (/api/maps/import/, manage.py import_maps): worker threads and write batch size
+MAP_IMPORT_WORKERS = 8
+MAP_IMPORT_BATCH_SIZE = 200
+
+# Server-side map revision history (editor.map_history): deltas + periodic snapshots, per-map retention
+MAP_HISTORY_ENABLED = os.environ.get('MAP_HISTORY_ENABLED', '1') != '0'
+MAP_HISTORY_SNAPSHOT_INTERVAL = 20
+MAP_HISTORY_MAX_REVISIONS = 100
+MAP_HISTORY_MAX_AGE_DAYS = None
+MAP_HISTORY_MAX_BYTES = 20 * 1024 * 1024
+
 # Paths for Zombicide assets
 # Unified assets directory - all packs go here (uploaded ZIPs and existing bgmapeditor_tiles)
 ASSETS_DIR = BASE_DIR / 'assets'
 BG_MAPEDITOR_TILES_DIR = BASE_DIR / 'assets'  # Legacy,bgmapeditor_tiles will be migrated to assets/
 PACKS_DIR = MEDIA_ROOT / 'packs'
 USERS_DIR = MEDIA_ROOT / 'users'
+# Must be on the same filesystem as ASSETS_DIR for hardlinks (falls back to copies otherwise)
+BLOB_STORE_DIR = MEDIA_ROOT / 'blobs'
+CHUNKED_UPLOAD_DIR = MEDIA_ROOT / 'uploads'
+# Reverse index pack/asset -> maps (editor.map_usage_index), maintained by MapManager
+MAP_USAGE_INDEX_PATH = MEDIA_ROOT / 'map_usage.sqlite3'
+# Deep-zoom tile pyramids of maps (editor.map_tiles), rendered on demand and keyed by content hash
+MAP_TILES_DIR = MEDIA_ROOT / 'map_tiles'
+MAP_TILES_REFRESH_SECONDS = 5
+# Pack index shared by all worker processes (api.parsers.pack_index): parsed packs, static game types, generations
+PACK_INDEX_PATH = MEDIA_ROOT / 'pack_index.sqlite3'
+
+# Map storage format: 'json' (compact JSON via editor.json_codec, default) or 'compact' (.zmap binary container).
+# Both formats are always readable; a map is rewritten in the current format on save.
+MAP_STORAGE_FORMAT = 'json'
 
 # Create directories if they don't exist
 os.makedirs(MEDIA_ROOT, exist_ok=True)
@@ -104,7 +104,7 @@ def main():
             continue
 
         try:
-            info = PackParser(item).parse_pack()
+            info = PackParser(item).parse_pack(PackParser.DEPTH_META)
         except Exception as e:
             print(f'{pack_id}: erreur parse {e}')
             errors += 1
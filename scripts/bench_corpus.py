@@ -0,0 +1,203 @@
+"""
+Générateurs de corpus synthétiques (packs + cartes) pour les benchmarks.
+
+Les packs reproduisent la structure Mapeditor : cfg racine, dossiers catégorie
+numérotés (`01.tiles`, `02.doors`, `04.1.objectives`…) avec leur cfg
+(`max=`, `pairs=`), assets en fichier simple ou en dossier de rotations
+(`r_0.png` … `r_270.png`, `r_thumb.png`). Les cartes ont des couches
+`tiles` / `objects` de la taille voulue et, en option, une capture
+`mission.mapImageDataUrl` embarquée.
+
+Usage (racine du dépôt) :
+  python scripts/bench_corpus.py /tmp/corpus --packs 20 --maps 5 --tiles 10000
+"""
+import argparse
+import base64
+import io
+import json
+import random
+import string
+import time
+from pathlib import Path
+
+CATEGORY_NAMES = [
+    ('01.tiles', 'Tiles', 1),
+    ('02.doors', 'Doors', 3),
+    ('03.zombies', 'Zombies', 5),
+    ('04.1.objectives', 'Objectives', 4),
+    ('04.other tokens', 'Other tokens', 4),
+    ('05.1.survivors', 'Survivors', 6),
+    ('01B.vaults', 'Vaults', 2),
+]
+ROTATIONS = (0, 90, 180, 270)
+
+
+def _png_bytes(width=8, height=8, noise=False, seed=0):
+    """PNG valide : uni (petit) ou bruit aléatoire (incompressible, pour les captures)."""
+    from PIL import Image
+    if noise:
+        rng = random.Random(seed)
+        img = Image.frombytes('RGB', (width, height), rng.randbytes(width * height * 3))
+    else:
+        img = Image.new('RGBA', (width, height), (128, 64, 32, 255))
+    buf = io.BytesIO()
+    img.save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def generate_pack(root, pack_id, categories=5, assets_per_category=40, rotation_ratio=0.5, seed=0):
+    """Crée un pack Mapeditor synthétique sous root/pack_id ; retourne son chemin."""
+    rng = random.Random(f'{seed}:{pack_id}')
+    png = _png_bytes()
+    thumb = _png_bytes(4, 4)
+    pack_dir = Path(root) / pack_id
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    (pack_dir / 'cfg').write_text(
+        f"name={pack_id.replace('-', ' ')}\nimage=guillotine.png\nalign=25\n"
+        f"gameType={rng.choice(['classic', 'modern', 'fantasy', 'western', 'scifi', 'night'])}\n",
+        encoding='utf-8',
+    )
+    for cat_id, cat_name, z_index in CATEGORY_NAMES[:categories]:
+        cat_dir = pack_dir / cat_id
+        cat_dir.mkdir(exist_ok=True)
+        names = []
+        for i in range(assets_per_category):
+            name = f"{i + 1}{rng.choice('VRS')}.png"
+            if name in names:
+                name = f"{i + 1}{''.join(rng.choices(string.ascii_uppercase, k=3))}.png"
+            names.append(name)
+            if rng.random() < rotation_ratio:
+                asset_dir = cat_dir / name
+                asset_dir.mkdir(exist_ok=True)
+                for angle in ROTATIONS:
+                    (asset_dir / f'r_{angle}.png').write_bytes(png)
+                (asset_dir / 'r_thumb.png').write_bytes(thumb)
+            else:
+                (cat_dir / name).write_bytes(png)
+        max_str = ';'.join(f'{n}:{rng.randint(1, 4)}' for n in names)
+        pairs = ';'.join(f'{a}:{b}' for a, b in zip(names[0::2], names[1::2]))
+        (cat_dir / 'cfg').write_text(
+            f"name={cat_name}\nz-index={z_index}\nalign=0\nmax={max_str}\npairs={pairs}\n",
+            encoding='utf-8',
+        )
+    return pack_dir
+
+
+def generate_packs(root, count=10, **kwargs):
+    """Crée `count` packs (`G-Zombicide-SYNxxx`) ; retourne la liste des chemins."""
+    return [generate_pack(root, f'G-Zombicide-SYN{i:03d}', **kwargs) for i in range(count)]
+
+
+def collect_asset_paths(root):
+    """Chemins relatifs (format carte) des assets principaux présents sous root."""
+    root = Path(root)
+    paths = []
+    for pack_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        for cat_dir in sorted(p for p in pack_dir.iterdir() if p.is_dir()):
+            for item in sorted(cat_dir.iterdir()):
+                if item.is_dir():
+                    paths.append((cat_dir.name, f'{pack_dir.name}/{cat_dir.name}/{item.name}/r_0.png'))
+                elif item.suffix == '.png':
+                    paths.append((cat_dir.name, f'{pack_dir.name}/{cat_dir.name}/{item.name}'))
+    return paths
+
+
+def generate_map(asset_paths, tiles=1000, objects=1000, image_size=None, seed=0, name='Synthetic map'):
+    """Dict carte au format éditeur ; image_size=(w, h) ajoute une capture PNG embarquée."""
+    rng = random.Random(seed)
+    now_ms = int(time.time() * 1000)
+    tile_assets = [p for c, p in asset_paths if c == '01.tiles'] or [p for _, p in asset_paths]
+    object_assets = [(c, p) for c, p in asset_paths if c != '01.tiles'] or asset_paths
+
+    def rid():
+        return ''.join(rng.choices(string.ascii_lowercase + string.digits, k=9))
+
+    layer_tiles = [
+        {
+            'id': f'tile_{now_ms + i}_{rid()}',
+            'x': rng.randint(0, 2000),
+            'y': rng.randint(0, 2000),
+            'asset': rng.choice(tile_assets),
+            'rotation': rng.choice(ROTATIONS),
+        }
+        for i in range(tiles)
+    ]
+    layer_objects = []
+    for i in range(objects):
+        category, asset = rng.choice(object_assets)
+        layer_objects.append({
+            'type': category,
+            'asset': asset,
+            'x': rng.randint(0, 2000),
+            'y': rng.randint(0, 2000),
+            'rotation': rng.choice(ROTATIONS),
+            'id': f'obj_{now_ms + i}_{rid()}',
+        })
+    image = None
+    if image_size:
+        image = 'data:image/png;base64,' + base64.b64encode(
+            _png_bytes(image_size[0], image_size[1], noise=True, seed=seed)
+        ).decode('ascii')
+    return {
+        'name': name,
+        'pack': None,
+        'grid': {'width': 10, 'height': 10, 'tileSize': 10},
+        'layers': {'tiles': layer_tiles, 'objects': layer_objects},
+        'gridOffsetX': -1854,
+        'gridOffsetY': -1398,
+        'mission': {
+            'questCode': 'S01', 'title': name, 'authors': ['bench'], 'difficulty': 'medium',
+            'playerCount': '6', 'estimatedDuration': '90', 'synopsis': 'Synthetic ' * 50,
+            'objectives': [], 'specialRules': [], 'tilesUsed': [], 'pageTheme': 'classic',
+            'mapImageDataUrl': image,
+        },
+    }
+
+
+def generate_maps(users_dir, asset_paths, count=5, users=2, tiles=10000, objects=10000, image_size=(700, 700), seed=0):
+    """Écrit `count` cartes JSON réparties sur `users` utilisateurs ; retourne [(user, map_id)]."""
+    created = []
+    for i in range(count):
+        username = f'bench{i % users}'
+        maps_dir = Path(users_dir) / username / 'maps'
+        maps_dir.mkdir(parents=True, exist_ok=True)
+        map_id = f'map_bench{i:07d}'
+        data = generate_map(asset_paths, tiles, objects, image_size, seed=seed + i, name=f'Bench {i}')
+        data['id'] = map_id
+        data['metadata'] = {
+            'created': f'2026-01-01T00:00:{i % 60:02d}',
+            'modified': f'2026-01-02T00:00:{i % 60:02d}',
+            'author': username,
+        }
+        with open(maps_dir / f'{map_id}.json', 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        created.append((username, map_id))
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Génère un corpus synthétique packs + cartes')
+    parser.add_argument('root', help='Dossier de sortie (assets/ et users/ y sont créés)')
+    parser.add_argument('--packs', type=int, default=10)
+    parser.add_argument('--categories', type=int, default=5)
+    parser.add_argument('--assets', type=int, default=40, help='Assets par catégorie')
+    parser.add_argument('--maps', type=int, default=5)
+    parser.add_argument('--tiles', type=int, default=10000)
+    parser.add_argument('--objects', type=int, default=10000)
+    parser.add_argument('--image', type=int, default=700, help='Côté de la capture embarquée (0 = aucune)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    assets_dir = root / 'assets'
+    generate_packs(assets_dir, args.packs, categories=args.categories,
+                   assets_per_category=args.assets, seed=args.seed)
+    image = (args.image, args.image) if args.image else None
+    created = generate_maps(root / 'users', collect_asset_paths(assets_dir), args.maps,
+                            tiles=args.tiles, objects=args.objects, image_size=image, seed=args.seed)
+    print(f'{args.packs} packs -> {assets_dir}')
+    print(f'{len(created)} cartes -> {root / "users"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark du codec JSON (editor.json_codec) sur les cartes réelles du dépôt.
+
+Compare, pour chaque carte, l'ancien chemin (`json.load` / `json.dump(indent=2)`)
+au codec partagé (orjson si installé, sortie compacte) : temps de lecture,
+temps d'écriture et taille sur disque.
+
+Usage (racine du dépôt) :
+  python scripts/bench_json_codec.py               # tableau lisible
+  python scripts/bench_json_codec.py --json        # sortie machine (JSON)
+  python scripts/bench_json_codec.py maps/*.json   # fichiers choisis
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+
+from editor import json_codec  # noqa: E402
+
+
+def _best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_file(path, repeat):
+    """Mesures (ms, octets) pour un fichier carte."""
+    raw = path.read_bytes()
+    data = json.loads(raw.decode('utf-8'))
+    legacy_out = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    codec_out = json_codec.dumps(data)
+    return {
+        'file': str(path.relative_to(ROOT)) if path.is_relative_to(ROOT) else str(path),
+        'input_bytes': len(raw),
+        'legacy_bytes': len(legacy_out),
+        'codec_bytes': len(codec_out),
+        'legacy_load_ms': _best_of(lambda: json.loads(raw.decode('utf-8')), repeat) * 1000,
+        'codec_load_ms': _best_of(lambda: json_codec.loads(raw), repeat) * 1000,
+        'legacy_dump_ms': _best_of(
+            lambda: json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'), repeat
+        ) * 1000,
+        'codec_dump_ms': _best_of(lambda: json_codec.dumps(data), repeat) * 1000,
+    }
+
+
+def default_files():
+    """Cartes du dépôt : maps/ et media/users/*/maps/."""
+    files = sorted((ROOT / 'maps').glob('*.json'))
+    files += sorted((ROOT / 'media' / 'users').glob('*/maps/*.json'))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark editor.json_codec vs stdlib json')
+    parser.add_argument('files', nargs='*', help='Fichiers JSON (défaut : cartes du dépôt)')
+    parser.add_argument('--repeat', type=int, default=20, help='Répétitions (meilleur temps retenu)')
+    parser.add_argument('--json', action='store_true', help='Sortie JSON machine-readable')
+    args = parser.parse_args()
+
+    files = [Path(f).resolve() for f in args.files] if args.files else default_files()
+    results = [bench_file(f, args.repeat) for f in files]
+    totals = {
+        key: sum(r[key] for r in results)
+        for key in ('input_bytes', 'legacy_bytes', 'codec_bytes', 'legacy_load_ms',
+                    'codec_load_ms', 'legacy_dump_ms', 'codec_dump_ms')
+    }
+    report = {'backend': json_codec.backend_name(), 'repeat': args.repeat, 'files': results, 'totals': totals}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Backend codec : {report['backend']} (meilleur de {args.repeat})")
+    header = f"{'fichier':<40} {'taille':>10} {'compact':>10} {'load ms':>15} {'dump ms':>15}"
+    print(header)
+    print('-' * len(header))
+    for r in results + [dict(totals, file='TOTAL')]:
+        print(
+            f"{Path(r['file']).name:<40} {r['legacy_bytes']:>10} {r['codec_bytes']:>10} "
+            f"{r['legacy_load_ms']:>6.2f} → {r['codec_load_ms']:<6.2f} "
+            f"{r['legacy_dump_ms']:>6.2f} → {r['codec_dump_ms']:<6.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,26 @@
 """
 Script to generate a static maps index JSON file
 This allows the frontend to work without Django backend
+
+Export incrémental : un manifeste (`.build-cache/maps-index-manifest.json`,
+ignoré par git) garde pour chaque carte (clé `<username>/<id>`) la version de son fichier source
+(mtime + taille), son entrée d'index et les fichiers produits dans
+`frontend/public/maps`. À la relance, seules les cartes modifiées sont relues
+(en-tête seulement : nom, métadonnées) et recopiées ; les fichiers produits
+pour des cartes disparues sont supprimés.
+
+Options :
+  --link            hardlink au lieu de copier les cartes JSON (même volume)
+  --split-images    écrit la capture `mission.mapImageDataUrl` dans un fichier
+                    image à côté de la carte (`maps/<id>.png`) et remplace la
+                    data URL par son chemin relatif : le JSON exporté reste léger
+  --force           ignore le manifeste et ré-exporte tout
 """
-import json
+import argparse
+import base64
+import binascii
+import os
+import shutil
 import sys
 from pathlib import Path
 
@@ -10,7 +28,6 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
 
 from django.conf import settings
-import os
 
 # Setup Django settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zombicide_editor.settings')
@@ -19,18 +36,160 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zombicide_editor.settings')
 import django
 django.setup()
 
-from editor.map_manager import MapManager
+from editor import json_codec
+from editor.map_manager import file_version, iter_map_files, read_map_file, read_map_header
+
+ROOT = Path(__file__).parent.parent
+PUBLIC_DIR = ROOT / 'frontend' / 'public'
+DEFAULT_MANIFEST = ROOT / '.build-cache' / 'maps-index-manifest.json'
+MANIFEST_VERSION = 2
+
+_IMAGE_EXTENSIONS = {
+    'data:image/png': 'png',
+    'data:image/jpeg': 'jpg',
+    'data:image/jpg': 'jpg',
+    'data:image/webp': 'webp',
+}
+
+
+def load_manifest(manifest_path):
+    """
+    (entrées {"<username>/<map_id>": {...}}, options) du manifeste ; ({}, None)
+    s'il est absent. Un manifeste d'une version antérieure (clé map_id seule)
+    est rendu sans options : rien n'est réutilisé, mais ses fichiers produits
+    restent connus pour le nettoyage des orphelins.
+    """
+    try:
+        manifest = json_codec.load_file(manifest_path)
+    except (OSError, ValueError):
+        return {}, None
+    if not isinstance(manifest, dict) or manifest.get('version') not in (1, MANIFEST_VERSION):
+        return {}, None
+    maps = manifest.get('maps')
+    options = manifest.get('options') if manifest.get('version') == MANIFEST_VERSION else None
+    return (maps if isinstance(maps, dict) else {}), options
+
+
+def split_map_image(map_data, maps_public_dir, map_id):
+    """Extrait la capture base64 dans un fichier image ; retourne son nom ou None."""
+    mission = map_data.get('mission')
+    if not isinstance(mission, dict):
+        return None
+    url = mission.get('mapImageDataUrl')
+    if not isinstance(url, str):
+        return None
+    head, sep, payload = url.partition(';base64,')
+    ext = _IMAGE_EXTENSIONS.get(head.lower())
+    if not sep or not ext:
+        return None
+    try:
+        raw = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    image_name = f"{map_id}.{ext}"
+    (maps_public_dir / image_name).write_bytes(raw)
+    # Chemin relatif à editor.html, comme ./maps/<id>.json côté frontend
+    mission['mapImageDataUrl'] = f"./maps/{image_name}"
+    return image_name
+
+
+def export_map(map_file, maps_public_dir, link=False, split_images=False):
+    """Écrit la carte dans public/maps ; retourne la liste des fichiers produits."""
+    map_id = map_file.stem
+    dest_file = maps_public_dir / f"{map_id}.json"
+    outputs = [dest_file.name]
+    if map_file.suffix == '.json' and not split_images:
+        if dest_file.exists() or dest_file.is_symlink():
+            dest_file.unlink()
+        if link:
+            try:
+                os.link(map_file, dest_file)
+                return outputs
+            except OSError:
+                pass
+        shutil.copy2(map_file, dest_file)
+        return outputs
+    # Compact maps are exported as JSON; split images need a rewrite too
+    map_data = read_map_file(map_file)
+    if split_images:
+        image_name = split_map_image(map_data, maps_public_dir, map_id)
+        if image_name:
+            outputs.append(image_name)
+    json_codec.dump_file(dest_file, map_data)
+    return outputs
 
 
-def generate_maps_index():
-    """Generate a static JSON file with all maps from all users"""
+def generate_maps_index(manifest_path=DEFAULT_MANIFEST, link=False, split_images=False, force=False):
+    """Generate a static JSON file with all maps from all users (incremental)"""
+    options = {'splitImages': bool(split_images)}
+    previous_maps, previous_options = load_manifest(manifest_path)
+    # Entrées réutilisables seulement si produites avec les mêmes options ;
+    # l'ancien manifeste sert dans tous les cas à retrouver les fichiers orphelins.
+    cached = previous_maps if not force and previous_options == options else {}
+    maps_public_dir = PUBLIC_DIR / 'maps'
+    maps_public_dir.mkdir(parents=True, exist_ok=True)
     
     print("Indexing maps...")
     
-    # Get all maps from all users
-    all_maps = MapManager.list_all_public_maps()
+    entries = {}
+    owners = {}
+    exported = reused = 0
+    users_dir = Path(settings.USERS_DIR)
+    if users_dir.exists():
+        for user_dir in users_dir.iterdir():
+            if not user_dir.is_dir():
+                continue
+            maps_dir = user_dir / 'maps'
+            if not maps_dir.exists():
+                continue
+            for map_file in iter_map_files(maps_dir):
+                map_id = map_file.stem
+                # Ids uniques par utilisateur seulement : la clé du manifeste inclut l'utilisateur
+                key = f"{user_dir.name}/{map_id}"
+                if map_id in owners:
+                    print(f"Warning: map id {map_id} exists for {owners[map_id]} and {user_dir.name}; "
+                          f"public/maps/{map_id}.json keeps the last export")
+                owners[map_id] = user_dir.name
+                version = file_version(map_file)
+                previous = cached.get(key)
+                if (
+                    previous
+                    and previous.get('source') == str(map_file)
+                    and previous.get('version') == version
+                    and all((maps_public_dir / name).exists() for name in previous.get('outputs', []))
+                ):
+                    entries[key] = previous
+                    reused += 1
+                    continue
+                try:
+                    header = read_map_header(map_file)
+                    outputs = export_map(map_file, maps_public_dir, link=link, split_images=split_images)
+                except Exception as e:
+                    print(f"Error exporting map file {map_file}: {e}")
+                    continue
+                # Extract only necessary metadata for the index
+                entries[key] = {
+                    'source': str(map_file),
+                    'version': version,
+                    'outputs': outputs,
+                    'entry': {
+                        "id": map_id,
+                        "name": header.get('name', 'Untitled'),
+                        "metadata": header.get('metadata', {})
+                    },
+                }
+                exported += 1
     
-    print(f"Found {len(all_maps)} maps")
+    # Fichiers produits pour des cartes supprimées (ou qui ne produisent plus d'image)
+    produced = {name for entry in entries.values() for name in entry['outputs']}
+    removed = 0
+    for previous in previous_maps.values():
+        for name in previous.get('outputs', []):
+            if name not in produced and (maps_public_dir / name).exists():
+                (maps_public_dir / name).unlink()
+                removed += 1
+    
+    print(f"Found {len(entries)} maps ({exported} exported, {reused} unchanged, {removed} orphan files removed)")
     
     # Build the index structure
     index = {
@@ -41,56 +200,39 @@ def generate_maps_index():
     from datetime import datetime
     index["generated_at"] = datetime.now().isoformat()
     
-    for map_data in all_maps:
-        # Extract only necessary metadata for the index
-        map_entry = {
-            "id": map_data.get('id'),
-            "name": map_data.get('name', 'Untitled'),
-            "metadata": map_data.get('metadata', {})
-        }
-        index["maps"].append(map_entry)
+    index["maps"] = [entry['entry'] for entry in entries.values()]
+    # Sort by modified date (most recent first)
+    index["maps"].sort(
+        key=lambda m: (m.get('metadata') or {}).get('modified', ''),
+        reverse=True
+    )
     
     # Write to frontend public directory
-    output_path = Path(__file__).parent.parent / 'frontend' / 'public' / 'maps-index.json'
+    output_path = PUBLIC_DIR / 'maps-index.json'
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(index, f, indent=2, ensure_ascii=False)
+    json_codec.dump_file(output_path, index)
+    
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    json_codec.dump_file(manifest_path, {'version': MANIFEST_VERSION, 'options': options, 'maps': entries})
     
     print(f"Index generated successfully: {output_path}")
     print(f"Total maps: {len(index['maps'])}")
     
-    # Also copy individual map files to public directory for static access
-    maps_public_dir = Path(__file__).parent.parent / 'frontend' / 'public' / 'maps'
-    maps_public_dir.mkdir(parents=True, exist_ok=True)
-    
-    print("\nCopying map files to public directory...")
-    users_dir = Path(settings.USERS_DIR)
-    copied_count = 0
-    
-    if users_dir.exists():
-        for user_dir in users_dir.iterdir():
-            if user_dir.is_dir():
-                maps_dir = user_dir / 'maps'
-                if maps_dir.exists():
-                    for map_file in maps_dir.glob('*.json'):
-                        try:
-                            # Copy map file to public/maps/
-                            import shutil
-                            dest_file = maps_public_dir / map_file.name
-                            shutil.copy2(map_file, dest_file)
-                            copied_count += 1
-                        except Exception as e:
-                            print(f"Error copying map file {map_file}: {e}")
-    
-    print(f"Copied {copied_count} map files to {maps_public_dir}")
-    
     return output_path
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Génère maps-index.json et public/maps (incrémental)')
+    parser.add_argument('--link', action='store_true', help='Hardlink des cartes JSON au lieu de les copier')
+    parser.add_argument('--split-images', action='store_true',
+                        help='Capture mission exportée en fichier image séparé')
+    parser.add_argument('--force', action='store_true', help='Ignorer le manifeste et tout ré-exporter')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='Manifeste de build (cache)')
+    args = parser.parse_args()
     try:
-        generate_maps_index()
+        generate_maps_index(args.manifest, link=args.link, split_images=args.split_images, force=args.force)
     except Exception as e:
         print(f"Error: {e}")
         import traceback
@@ -8,8 +8,13 @@ Le champ gameType pour chaque pack provient de :
 
 Pour pré-remplir les cfg sans type (déduction depuis le nom du dossier pack) :
   py scripts/backfill_cfg_game_type.py
+
+Build incrémental : un manifeste (`.build-cache/packs-index-manifest.json`,
+ignoré par git) garde pour chaque pack son empreinte complète (chemins, mtimes,
+tailles) et sa sortie déjà calculée. Seuls les packs modifiés sont re-parsés,
+les packs disparus sont retirés, les autres sont repris du manifeste. Le
+manifeste est invalidé si le code du parser change ; `--force` reconstruit tout.
 """
-import json
 import sys
 from pathlib import Path
 
@@ -26,14 +31,62 @@ import django
 django.setup()
 
 from api.parsers.asset_indexer import AssetIndexer
+from api.parsers.pack_fingerprint import pack_tree_fingerprint
+from api.parsers.pack_parser import PackParser
+from editor import json_codec
+
+ROOT = Path(__file__).parent.parent
+DEFAULT_OUTPUT = ROOT / 'frontend' / 'public' / 'packs-index.json'
+DEFAULT_MANIFEST = ROOT / '.build-cache' / 'packs-index-manifest.json'
+MANIFEST_VERSION = 1
+
+
+def _code_version():
+    """Empreinte du code qui produit la sortie d'un pack (parser + types de jeu)."""
+    import hashlib
+    from api.parsers import editor_game_types, pack_parser
+    h = hashlib.blake2b(digest_size=8)
+    h.update(str(MANIFEST_VERSION).encode())
+    for module in (pack_parser, editor_game_types):
+        h.update(Path(module.__file__).read_bytes())
+    return h.hexdigest()
+
+
+def load_manifest(manifest_path, code_version):
+    """Entrées {pack_id: {dir, fingerprint, data}} du manifeste, {} s'il est absent ou périmé."""
+    try:
+        manifest = json_codec.load_file(manifest_path)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('code') != code_version:
+        return {}
+    packs = manifest.get('packs')
+    return packs if isinstance(packs, dict) else {}
 
-def generate_packs_index():
-    """Generate a static JSON file with all packs and their assets"""
+
+def build_pack_data(pack_dir):
+    """Entrée packs-index d'un pack (un seul parse)."""
+    pack = PackParser(pack_dir).parse_pack()
+    assets = {
+        category_name: category_data['assets']
+        for category_name, category_data in pack['categories'].items()
+    }
+    return {
+        "id": pack['id'],
+        "name": pack.get('name', pack['id']),
+        "image": pack.get('image'),
+        "align": pack.get('align', 25),
+        "gameType": pack.get('gameType') or 'fantasy',
+        "assets": assets
+    }
+
+
+def generate_packs_index(output_path=DEFAULT_OUTPUT, manifest_path=DEFAULT_MANIFEST, force=False):
+    """Generate a static JSON file with all packs and their assets (incremental)"""
+    code_version = _code_version()
+    cached = {} if force else load_manifest(manifest_path, code_version)
     
     print("Indexing packs...")
-    packs = AssetIndexer.index_all_packs()
-    
-    print(f"Found {len(packs)} packs")
     
     # Build the index structure
     index = {
@@ -44,33 +97,44 @@ def generate_packs_index():
     from datetime import datetime
     index["generated_at"] = datetime.now().isoformat()
     
-    for pack in packs:
-        print(f"Processing pack: {pack['id']}")
-        
-        # Get assets for this pack
-        try:
-            assets = AssetIndexer.get_pack_assets(pack['id'])
-        except Exception as e:
-            print(f"Error getting assets for {pack['id']}: {e}")
-            assets = {}
-        
-        pack_data = {
-            "id": pack['id'],
-            "name": pack.get('name', pack['id']),
-            "image": pack.get('image'),
-            "align": pack.get('align', 25),
-            "gameType": pack.get('gameType') or 'fantasy',
-            "assets": assets
-        }
-        
-        index["packs"].append(pack_data)
+    entries = {}
+    reused = rebuilt = 0
+    for pack_dir in AssetIndexer.iter_pack_dirs():
+        pack_id = pack_dir.name
+        fingerprint = pack_tree_fingerprint(pack_dir)
+        entry = cached.get(pack_id)
+        if (
+            entry
+            and fingerprint is not None
+            and entry.get('fingerprint') == fingerprint
+            and entry.get('dir') == str(pack_dir)
+        ):
+            reused += 1
+        else:
+            print(f"Processing pack: {pack_id}")
+            try:
+                pack_data = build_pack_data(pack_dir)
+            except Exception as e:
+                print(f"Error indexing pack {pack_id}: {e}")
+                continue
+            entry = {'dir': str(pack_dir), 'fingerprint': fingerprint, 'data': pack_data}
+            rebuilt += 1
+        entries[pack_id] = entry
+        index["packs"].append(entry['data'])
+    removed = sorted(set(cached) - set(entries))
+    for pack_id in removed:
+        print(f"Removed pack: {pack_id}")
+    
+    print(f"Found {len(entries)} packs ({rebuilt} re-parsed, {reused} from cache, {len(removed)} removed)")
     
     # Write to frontend public directory
-    output_path = Path(__file__).parent.parent / 'frontend' / 'public' / 'packs-index.json'
+    output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    json_codec.dump_file(output_path, index)
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(index, f, indent=2, ensure_ascii=False)
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    json_codec.dump_file(manifest_path, {'version': MANIFEST_VERSION, 'code': code_version, 'packs': entries})
     
     print(f"Index generated successfully: {output_path}")
     print(f"Total packs: {len(index['packs'])}")
@@ -78,8 +142,14 @@ def generate_packs_index():
     return output_path
 
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Génère frontend/public/packs-index.json (incrémental)')
+    parser.add_argument('--force', action='store_true', help='Ignorer le manifeste et tout re-parser')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT), help='Fichier index de sortie')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='Manifeste de build (cache)')
+    args = parser.parse_args()
     try:
-        generate_packs_index()
+        generate_packs_index(args.output, args.manifest, force=args.force)
     except Exception as e:
         print(f"Error: {e}")
         import traceback
@@ -0,0 +1,225 @@
+"""
+Harnais de benchmarks backend (parsing packs, index, cartes, endpoints API).
+
+Génère un corpus synthétique (voir bench_corpus.py) dans un dossier temporaire,
+redirige ASSETS_DIR / USERS_DIR dessus, puis chronomètre :
+  - PackParser.parse_pack, AssetIndexer.index_all_packs, index de recherche ;
+  - MapManager : list_maps, list_all_public_maps, get_map, update_map ;
+  - les endpoints principaux via le client de test Django (à froid et à chaud).
+
+La sortie `--json` est stable et comparable entre commits :
+  python scripts/run_benchmarks.py --json > bench_before.json
+  ... (changement) ...
+  python scripts/run_benchmarks.py --json --compare bench_before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zombicide_editor.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import Client  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+import bench_corpus  # noqa: E402
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _reset_caches():
+    """Vide les caches de processus pour les mesures « à froid »."""
+    from api.cache import iter_caches
+    from api.parsers.asset_search import get_search_index
+    for cache in iter_caches():
+        cache.clear()
+    get_search_index().invalidate()
+
+
+def measure(fn, repeat, setup=None):
+    """Temps (ms) de `repeat` exécutions de fn ; setup() est appelé avant chacune, hors chrono."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        'n': len(samples),
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def run_suite(root, args):
+    """Construit le corpus sous root et exécute tous les benchmarks ; retourne {nom: stats}."""
+    assets_dir = root / 'assets'
+    users_dir = root / 'media' / 'users'
+    t0 = time.perf_counter()
+    pack_dirs = bench_corpus.generate_packs(
+        assets_dir, args.packs, categories=args.categories, assets_per_category=args.assets, seed=args.seed
+    )
+    image = (args.image, args.image) if args.image else None
+    maps = bench_corpus.generate_maps(
+        users_dir, bench_corpus.collect_asset_paths(assets_dir), args.maps,
+        tiles=args.tiles, objects=args.objects, image_size=image, seed=args.seed,
+    )
+    corpus_s = time.perf_counter() - t0
+
+    results = {}
+    repeat = args.repeat
+    with override_settings(
+        ASSETS_DIR=assets_dir,
+        BG_MAPEDITOR_TILES_DIR=assets_dir,
+        MEDIA_ROOT=root / 'media',
+        PACKS_DIR=root / 'media' / 'packs',
+        USERS_DIR=users_dir,
+        BASE_DIR=root,
+        # Chemins dérivés de MEDIA_ROOT une seule fois dans settings.py
+        BLOB_STORE_DIR=root / 'media' / 'blobs',
+        CHUNKED_UPLOAD_DIR=root / 'media' / 'uploads',
+        MAP_USAGE_INDEX_PATH=root / 'media' / 'map_usage.sqlite3',
+        MAP_TILES_DIR=root / 'media' / 'map_tiles',
+        PACK_INDEX_PATH=root / 'media' / 'pack_index.sqlite3',
+    ):
+        from api.parsers.asset_indexer import AssetIndexer
+        from api.parsers.asset_search import AssetSearchIndex
+        from api.parsers.pack_parser import PackParser
+        from editor.map_manager import MapManager
+
+        pack_id = pack_dirs[0].name
+        username, map_id = maps[0]
+        manager = MapManager(username)
+        map_data = manager.get_map(map_id)
+
+        results['pack.parse'] = measure(lambda: PackParser(pack_dirs[0]).parse_pack(), repeat)
+        results['pack.index_all'] = measure(AssetIndexer.index_all_packs, repeat)
+        results['search.build'] = measure(lambda: AssetSearchIndex().refresh(force=True), max(1, repeat // 2))
+        search_index = AssetSearchIndex()
+        search_index.refresh(force=True)
+        results['search.query'] = measure(lambda: search_index.search('12 tiles'), repeat * 10)
+        results['map.list_user'] = measure(manager.list_maps, repeat)
+        results['map.list_public'] = measure(MapManager.list_all_public_maps, repeat)
+        results['map.get'] = measure(lambda: manager.get_map(map_id), repeat)
+        results['map.update'] = measure(lambda: manager.update_map(map_id, dict(map_data)), repeat)
+
+        client = Client()
+        endpoints = {
+            'api.packs': '/api/packs/',
+            'api.pack_detail': f'/api/packs/{pack_id}/',
+            'api.pack_assets': f'/api/packs/{pack_id}/assets/',
+            'api.asset_search': '/api/assets/search/?q=12+tiles',
+            'api.user_maps': f'/api/users/{username}/maps/',
+            'api.map_get': f'/api/users/{username}/maps/{map_id}/',
+            'api.maps_public': '/api/maps/public/',
+        }
+        for name, url in endpoints.items():
+            results[f'{name}.cold'] = measure(lambda: client.get(url), repeat, setup=_reset_caches)
+            client.get(url)
+            results[f'{name}.hot'] = measure(lambda: client.get(url, HTTP_ACCEPT_ENCODING='gzip'), repeat)
+        body = json.dumps(map_data)
+        results['api.map_put'] = measure(
+            lambda: client.put(f'/api/users/{username}/maps/{map_id}/', data=body, content_type='application/json'),
+            repeat,
+        )
+
+    return results, corpus_s
+
+
+def compare(current, baseline):
+    """Lignes texte « nom : avant → après (delta %) » sur la médiane."""
+    lines = []
+    for name, stats in current.items():
+        old = baseline.get(name)
+        if not old:
+            lines.append(f'{name:<28} {"(nouveau)":>12} → {stats["median_ms"]:>10.3f} ms')
+            continue
+        delta = (stats['median_ms'] - old['median_ms']) / old['median_ms'] * 100 if old['median_ms'] else 0
+        lines.append(f'{name:<28} {old["median_ms"]:>10.3f} ms → {stats["median_ms"]:>10.3f} ms ({delta:+.1f}%)')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks backend sur corpus synthétique')
+    parser.add_argument('--packs', type=int, default=10)
+    parser.add_argument('--categories', type=int, default=5)
+    parser.add_argument('--assets', type=int, default=40, help='Assets par catégorie')
+    parser.add_argument('--maps', type=int, default=4)
+    parser.add_argument('--tiles', type=int, default=10000)
+    parser.add_argument('--objects', type=int, default=10000)
+    parser.add_argument('--image', type=int, default=700, help='Côté de la capture embarquée (0 = aucune)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', metavar='DIR', help='Générer le corpus dans DIR (conservé)')
+    parser.add_argument('--json', action='store_true', help='Sortie JSON machine-readable')
+    parser.add_argument('--compare', metavar='FILE', help='Rapport JSON de référence à comparer')
+    args = parser.parse_args()
+
+    if args.keep:
+        root = Path(args.keep).resolve()
+        root.mkdir(parents=True, exist_ok=True)
+    else:
+        root = Path(tempfile.mkdtemp(prefix='zbench_'))
+    try:
+        results, corpus_s = run_suite(root, args)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    params = {k: getattr(args, k) for k in ('packs', 'categories', 'assets', 'maps', 'tiles', 'objects',
+                                            'image', 'repeat', 'seed')}
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': params,
+            'corpus_build_s': round(corpus_s, 2),
+        },
+        'results': results,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    elif not args.compare:
+        print(f"Commit {report['meta']['commit']} — corpus {params} ({corpus_s:.1f}s)")
+        for name, stats in results.items():
+            print(f"{name:<28} median {stats['median_ms']:>10.3f} ms   p95 {stats['p95_ms']:>10.3f} ms")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        out = sys.stderr if args.json else sys.stdout
+        print(f"Comparaison avec {baseline['meta'].get('commit')} (médianes)", file=out)
+        for line in compare(results, baseline.get('results', {})):
+            print(line, file=out)
+
+
+if __name__ == '__main__':
+    main()